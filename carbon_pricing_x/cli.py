@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import argparse
+import os
 import subprocess
 import sys
 from pathlib import Path
@@ -18,6 +19,35 @@ def _build_parser() -> argparse.ArgumentParser:
     run_parser.add_argument("--port", type=int, default=None, help="Port for Streamlit server")
     run_parser.add_argument("--headless", action="store_true", help="Run Streamlit headless")
 
+    ingest_parser = subparsers.add_parser("ingest", help="Merge a folder or glob of site CSV/XLSX files")
+    ingest_parser.add_argument("path", help="Directory or glob pattern of input files")
+    ingest_parser.add_argument(
+        "--output",
+        required=True,
+        help="File for the merged activities: CSV, Arrow IPC/Feather for .arrow, .feather and .ipc, or a SQLite database for .db, .sqlite and .sqlite3",
+    )
+    ingest_parser.add_argument("--append", action="store_true", help="Add rows to a SQLite database that already holds activities")
+    ingest_parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+
+    baseline_parser = subparsers.add_parser("baseline", help="Compute baseline emissions through the persistent activity store")
+    baseline_parser.add_argument("path", help="Input CSV or XLSX file, or a SQLite activity database (.db, .sqlite, .sqlite3)")
+    baseline_parser.add_argument("--store-dir", default=None, help="Activity store directory (default: $CARBONPRICINGX_STORE_DIR)")
+    baseline_parser.add_argument("--keep", type=int, default=8, help="Store entries to keep after this run")
+    baseline_parser.add_argument("--top", type=int, default=5, help="Departments to list for a SQLite database")
+
+    serve_parser = subparsers.add_parser("serve", help="Run the local HTTP/JSON simulation service")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: localhost only)")
+    serve_parser.add_argument("--port", type=int, default=8765, help="Port for the service")
+    serve_parser.add_argument("--batch-window-ms", type=float, default=2.0, help="Micro-batching window in milliseconds")
+    serve_parser.add_argument("--cache-dir", default=None, help="Persist engine results to this directory (default: $CARBONPRICINGX_CACHE_DIR)")
+    serve_parser.add_argument("--cache-mb", type=float, default=256.0, help="In-memory engine cache budget in MB")
+
+    bench_parser = subparsers.add_parser("bench-service", help="Load-test the simulation service in-process")
+    bench_parser.add_argument("--activities", default=None, help="Activities CSV (default: bundled sample data)")
+    bench_parser.add_argument("--requests", type=int, default=2_000, help="Total requests to issue")
+    bench_parser.add_argument("--concurrency", type=int, default=64, help="Concurrent keep-alive clients")
+    bench_parser.add_argument("--batch-window-ms", type=float, default=2.0, help="Micro-batching window in milliseconds")
+
     return parser
 
 
@@ -33,5 +63,105 @@ def main(argv: list[str] | None = None) -> int:
             cmd += ["--server.headless", "true"]
         return subprocess.call(cmd)
 
+    if args.command == "ingest":
+        from modules.arrow_io import ARROW_SUFFIXES, write_ipc
+        from modules.excel_parser import parse_paths
+        from modules.sql_backend import SQL_SUFFIXES, SQLiteActivityBackend
+
+        suffix = Path(args.output).suffix.lower()
+        backend = SQLiteActivityBackend(args.output) if suffix in SQL_SUFFIXES else None
+        if backend is not None:
+            # Re-running an ingest into the same database would count every row twice.
+            if len(backend) and not args.append:
+                backend.close()
+                parser.error(f"{args.output} already holds activities; pass --append to add to them")
+            # Files are streamed into the database; nothing is merged in memory.
+            files = backend.append_files(args.path, max_workers=args.workers)
+            backend.close()
+            failures = files[files["status"] != "ok"]
+            print(f"Appended {int(files['activity_rows'].sum())} activity rows from {len(files) - len(failures)} files to {args.output}.")
+            for _, failure in failures.iterrows():
+                print(f"Failed: {failure['path']}: {failure['error']}", file=sys.stderr)
+            return 1 if not failures.empty else 0
+
+        batch = parse_paths(args.path, max_workers=args.workers)
+        if suffix in ARROW_SUFFIXES:
+            write_ipc(batch.parsed.activities, args.output)
+        else:
+            batch.parsed.activities.to_csv(args.output, index=False)
+        print(f"Merged {len(batch.parsed.activities)} activity rows from {int((batch.files['status'] == 'ok').sum())} files.")
+        for _, failure in batch.failures.iterrows():
+            print(f"Failed: {failure['file']}: {failure['error']}", file=sys.stderr)
+        return 1 if not batch.failures.empty else 0
+
+    if args.command == "baseline":
+        from modules.activity_store import STORE_DIR_ENV, ActivityStore
+        from modules.emissions_engine import calculate_emissions
+        from modules.sql_backend import SQL_SUFFIXES, SQLiteActivityBackend
+
+        if Path(args.path).suffix.lower() in SQL_SUFFIXES:
+            # Aggregates are computed inside the database; only summary rows are loaded.
+            backend = SQLiteActivityBackend(args.path)
+            result = calculate_emissions(backend)
+            print(f"{len(backend):,} activity rows in {args.path}.")
+            print(f"Total emissions: {result['total_emissions']:,.2f} tCO2e")
+            for scope, value in result["scope_totals"].items():
+                print(f"  {scope}: {value:,.2f}")
+            print(f"Top {args.top} departments:")
+            for _, row in backend.top_n("department", args.top, other=True).iterrows():
+                print(f"  {row['department']}: {row['emissions_tonnes']:,.2f}")
+            backend.close()
+            return 0
+
+        root = args.store_dir or os.environ.get(STORE_DIR_ENV)
+        if not root:
+            parser.error(f"baseline needs --store-dir or ${STORE_DIR_ENV}")
+        store = ActivityStore(root)
+        stored = store.load_or_build(args.path)
+        store.prune(args.keep)
+        print(f"{'Mapped' if stored.from_store else 'Built'} store entry {stored.key} ({len(stored.activities)} activity rows).")
+        if stored.baseline is None:
+            print("No activity rows; nothing to compute.")
+            return 0
+        print(f"Total emissions: {stored.baseline['total_emissions']:,.2f} tCO2e")
+        for scope, value in stored.baseline["scope_totals"].items():
+            print(f"  {scope}: {value:,.2f}")
+        return 0
+
+    if args.command == "serve":
+        import asyncio
+
+        from modules.memo import CACHE_DIR_ENV, configure_engine_cache
+        from modules.simulation_service import ServiceConfig, SimulationService
+
+        configure_engine_cache(max_bytes=int(args.cache_mb * 1024 * 1024), directory=args.cache_dir or os.environ.get(CACHE_DIR_ENV))
+        service = SimulationService(ServiceConfig(host=args.host, port=args.port, batch_window=args.batch_window_ms / 1_000.0))
+        print(f"CarbonPricingX simulation service on http://{args.host}:{args.port}")
+        try:
+            asyncio.run(service.serve_forever())
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if args.command == "bench-service":
+        import asyncio
+
+        import pandas as pd
+
+        from modules.simulation_service import ServiceConfig, run_load_test
+
+        source = Path(args.activities) if args.activities else Path(__file__).resolve().parents[1] / "data" / "sample_departments.csv"
+        result = asyncio.run(
+            run_load_test(
+                pd.read_csv(source),
+                requests=args.requests,
+                concurrency=args.concurrency,
+                config=ServiceConfig(port=0, batch_window=args.batch_window_ms / 1_000.0),
+            )
+        )
+        for name, value in result.items():
+            print(f"{name}: {value:,.2f}")
+        return 1 if result["failures"] else 0
+
     parser.print_help()
     return 0
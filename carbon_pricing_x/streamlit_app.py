@@ -13,20 +13,45 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
 from modules.abatement import evaluate_abatement
-from modules.cap_and_trade import CapTradeConfig, simulate_cap_and_trade
-from modules.carbon_pricing import CarbonPricingConfig, recommend_carbon_price, run_price_scenarios
+from modules.abatement_timeline import adoption_timeline
+from modules.activity_store import StoredInput, default_store
+from modules.arrow_io import HAS_PYARROW, build_arrow_report, enable_arrow_strings
+from modules.cap_and_trade import (
+    CapTradeConfig,
+    MarketStabilityReserve,
+    StochasticETSConfig,
+    simulate_cap_and_trade,
+    simulate_ets_paths,
+)
+from modules.carbon_pricing import (
+    CarbonPricingConfig,
+    recommend_carbon_price,
+    run_price_scenarios,
+    run_segment_price_scenarios,
+    segment_detail_at_price,
+)
+from modules.compliance import build_compliance_curve, solve_compliance
+from modules.dataset_registry import DatasetLease, default_registry
+from modules.emissions_cube import EmissionsCube
 from modules.emissions_engine import calculate_emissions
+from modules.emissions_timeseries import rolling_12_month, year_over_year
 from modules.excel_parser import parse_uploaded_file
 from modules.export_excel import build_excel_report
 from modules.export_pdf import build_pdf_report
-from modules.internal_market import InternalFeeConfig, simulate_internal_fee
-from modules.offset_engine import simulate_offsets
+from modules.internal_market import RESPONSE_CURVES, InternalFeeConfig, fee_table_at_rate, sweep_internal_fees
+from modules.jobs import Job, JobContext, default_executor, job_key
+from modules.offset_engine import procure_offsets, simulate_offsets
+from modules.revenue_recycling import RecyclingConfig, simulate_revenue_recycling
 from modules.storage import compare_runs, list_runs, load_run, save_run
+from modules.target_pricing import build_target_price_curve, solve_target_prices
+from modules.utils import enable_copy_on_write
 from modules.visualization import (
     behavior_response,
     cumulative_reduction,
+    emissions_over_time,
     emissions_vs_price,
     fee_distribution,
+    fee_revenue_curve,
     macc_curve,
     npv_by_initiative,
     pricing_cost_curve,
@@ -36,32 +61,56 @@ from modules.visualization import (
 
 DATA_DIR = PROJECT_ROOT / "data"
 RUNS_DIR = PROJECT_ROOT / "runs"
+JOB_POLL_SECONDS = 0.5
+JOB_TIMEOUT_SECONDS = 300.0
+
+
+SAMPLE_DATASETS = {
+    "activities_df": (
+        DATA_DIR / "sample_departments.csv",
+        ["department", "scope", "activity", "amount", "unit", "emission_factor", "source", "factor_unit"],
+    ),
+    "abatement_df": (
+        DATA_DIR / "abatement_template.csv",
+        ["initiative_name", "max_reduction_pct", "cost_per_tonne", "capex", "target_scope", "department"],
+    ),
+    "allowances_df": (
+        DATA_DIR / "market" / "sample_allowances.csv",
+        ["year", "allocated_allowances", "initial_cap", "offset_limit_pct"],
+    ),
+    "offset_lots_df": (
+        DATA_DIR / "market" / "sample_offset_lots.csv",
+        ["project", "registry", "vintage", "project_type", "volume", "price", "integrity_score", "quality_discount_factor"],
+    ),
+}
+
+
+def _lease_sample(path: Path, fallback_columns: list[str]) -> DatasetLease:
+    if path.exists():
+        return default_registry().lease_file(path)
+    return default_registry().lease(pd.DataFrame(columns=fallback_columns))
 
 
-def _safe_read_csv(path: Path, fallback_columns: list[str]) -> pd.DataFrame:
-    if path.exists():
-        return pd.read_csv(path)
-    return pd.DataFrame(columns=fallback_columns)
+def _set_dataset(name: str, lease: DatasetLease) -> None:
+    # Sessions hold registry references, not copies; replacing a lease releases the old one.
+    st.session_state.dataset_leases[name] = lease
+    st.session_state[name] = lease.frame
 
 
 def _init_state() -> None:
+    if "dataset_leases" not in st.session_state:
+        st.session_state.dataset_leases = {}
+    for name, (path, fallback_columns) in SAMPLE_DATASETS.items():
+        if name not in st.session_state:
+            _set_dataset(name, _lease_sample(path, fallback_columns))
+
     defaults = {
-        "activities_df": _safe_read_csv(
-            DATA_DIR / "sample_departments.csv",
-            ["department", "scope", "activity", "amount", "unit", "emission_factor", "source"],
-        ),
-        "abatement_df": _safe_read_csv(
-            DATA_DIR / "abatement_template.csv",
-            ["initiative_name", "max_reduction_pct", "cost_per_tonne", "capex", "target_scope", "department"],
-        ),
-        "allowances_df": _safe_read_csv(
-            DATA_DIR / "market" / "sample_allowances.csv",
-            ["year", "allocated_allowances", "initial_cap", "offset_limit_pct"],
-        ),
         "last_saved_run": "",
         "pending_upload": None,
         "pending_upload_sig": "",
         "active_data_source": "sample_data",
+        "jobs": {},
+        "upload_job_sig": "",
     }
     for key, value in defaults.items():
         if key not in st.session_state:
@@ -342,7 +391,592 @@ def _styled_table(df: pd.DataFrame):
     )
 
 
+def _shared_baseline(activities_df: pd.DataFrame) -> dict:
+    # Sessions on identical activity data share one baseline held by the process-wide registry.
+    lease = st.session_state.dataset_leases.get("activities_df")
+    if lease is None or lease.frame is not activities_df:
+        lease = default_registry().lease(activities_df)
+        _set_dataset("activities_df", lease)
+    return lease.derived("emissions", calculate_emissions)
+
+
+def _track_job(slot: str, job: Job) -> Job:
+    # Session state keeps the job each panel is showing; a superseded unfinished job is cancelled.
+    previous = st.session_state.jobs.get(slot)
+    if previous is not None and previous is not job and not previous.done:
+        previous.cancel()
+    st.session_state.jobs[slot] = job
+    return job
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def _job_poller(slot: str) -> None:
+    job = st.session_state.jobs.get(slot)
+    if job is None or job.done:
+        # Finished jobs refresh the whole page once; the inputs have not changed.
+        st.session_state.job_rerun = True
+        st.rerun()
+    st.progress(job.progress, text=f"{job.label}: {job.message or job.state} ({job.elapsed:,.0f}s)")
+    if st.button("Cancel", key=f"cancel_job_{slot}"):
+        job.cancel()
+        st.rerun()
+
+
+def _job_status(slot: str) -> Job | None:
+    # Shows progress while the slot's job runs and returns it once it has finished successfully.
+    job = st.session_state.jobs.get(slot)
+    if job is None:
+        return None
+    if not job.done:
+        _job_poller(slot)
+        return None
+    if job.state == "failed":
+        st.error(f"{job.label} failed: {job.error}")
+    elif job.state == "timed_out":
+        st.error(f"{job.label} timed out ({job.error}).")
+    elif job.state == "cancelled":
+        st.info(f"{job.label} cancelled.")
+    return job if job.state == "done" else None
+
+
+def _finished_result(slot: str, name: str):
+    job = st.session_state.jobs.get(slot)
+    return job.result[name] if job is not None and job.state == "done" else None
+
+
+# Each tab is a fragment: its own widgets rerun only the tab body, while the
+# arguments below are the shared baseline state it depends on and are refreshed
+# on full reruns (sidebar, upload, global pricing sliders).
+@st.fragment
+def _dashboard_tab(
+    emissions_result: dict,
+    selected_carbon_price: float,
+    selected_cost: float,
+    recommended_price: float,
+    abatement_result: dict,
+) -> None:
+    st.subheader("Dashboard")
+    baseline_total = emissions_result["total_emissions"]
+    emissions_cube = emissions_result["cube"]
+    top3 = emissions_result["by_department"].head(3).copy()
+    top3["cost_exposure"] = top3["emissions_tonnes"] * selected_carbon_price
+
+    _kpi_cards(
+        [
+            ("Total emissions", f"{baseline_total:,.2f} tCO2e"),
+            ("Total carbon cost", f"${selected_cost:,.2f}"),
+            ("Recommended price", f"${recommended_price:,.2f}/tCO2e"),
+            (
+                "Portfolio NPV",
+                f"${abatement_result['total_npv']:,.2f}",
+            ),
+        ]
+    )
+
+    t1, t2 = st.columns([1.2, 1])
+    with t1:
+        st.markdown("Top 3 departments by exposure")
+        st.table(_styled_table(top3))
+    with t2:
+        dept_chart = px.bar(
+            top3,
+            x="department",
+            y="cost_exposure",
+            title="Department Exposure",
+            color="cost_exposure",
+            color_continuous_scale="Tealgrn",
+        )
+        st.plotly_chart(style_figure(dept_chart), use_container_width=True)
+
+    st.markdown("Baseline emissions by scope")
+    st.dataframe(_styled_table(emissions_result["by_scope"]), use_container_width=True)
+
+    if not emissions_result["by_period"].empty:
+        st.markdown("Emissions over time")
+        ts_col1, ts_col2 = st.columns(2)
+        period_freq = ts_col1.selectbox("Period", ["M", "Q", "Y"], format_func={"M": "Monthly", "Q": "Quarterly", "Y": "Annual"}.get)
+        period_split = ts_col2.selectbox("Split by", ["scope", "department"])
+        period_view = year_over_year(emissions_cube, period_freq, by=[period_split])
+        st.plotly_chart(emissions_over_time(period_view, period_split), use_container_width=True)
+        if period_freq == "M":
+            rolling_view = rolling_12_month(emissions_cube, by=[period_split])
+            st.plotly_chart(
+                emissions_over_time(rolling_view, period_split, value="rolling_12m_emissions"),
+                use_container_width=True,
+            )
+        st.dataframe(_styled_table(period_view), use_container_width=True)
+
+
+@st.fragment
+def _pricing_tab(
+    emissions_cube: EmissionsCube,
+    pricing_df: pd.DataFrame,
+    pricing_config: CarbonPricingConfig,
+    selected_carbon_price: float,
+) -> None:
+    st.subheader("Carbon Pricing Simulator")
+    st.plotly_chart(pricing_cost_curve(pricing_df), use_container_width=True)
+    st.plotly_chart(emissions_vs_price(pricing_df), use_container_width=True)
+    st.dataframe(_styled_table(pricing_df), use_container_width=True)
+
+    with st.expander("Segment elasticities (scope / department)"):
+        st.caption("Rows override the global sliders; blank or 'all' keys act as wildcards. Most specific match wins.")
+        elasticity_table = st.data_editor(
+            pd.DataFrame(
+                {
+                    "scope": sorted(emissions_cube.labels["scope"]),
+                    "department": "all",
+                    "elasticity": pricing_config.elasticity,
+                    "fuel_switching_factor": pricing_config.fuel_switching_factor,
+                    "energy_efficiency_factor": pricing_config.energy_efficiency_factor,
+                }
+            ),
+            num_rows="dynamic",
+            key="segment_elasticity_table",
+        )
+        segment_pricing = run_segment_price_scenarios(
+            emissions_cube,
+            range(0, 251),
+            pricing_config,
+            elasticity_table=elasticity_table,
+        )
+        segment_chart = px.line(
+            segment_pricing["totals"],
+            x="carbon_price",
+            y="adjusted_emissions",
+            markers=True,
+            title="Segment-Level Emissions vs Carbon Price",
+        )
+        st.plotly_chart(style_figure(segment_chart), use_container_width=True)
+        st.dataframe(
+            _styled_table(segment_detail_at_price(segment_pricing, selected_carbon_price)),
+            use_container_width=True,
+        )
+
+
+@st.fragment
+def _internal_tab(baseline_dept: pd.DataFrame, emissions_cube: EmissionsCube, abatement_df: pd.DataFrame) -> None:
+    st.subheader("Internal Carbon Fee System")
+    fee_col1, fee_col2, fee_col3 = st.columns(3)
+    internal_fee_rate = fee_col1.slider("Internal fee rate (USD/tCO2e)", 0, 300, 60)
+    response_factor = fee_col2.slider("Response factor", 0.0, 1.0, 0.15, 0.01)
+    response_curve = fee_col3.selectbox("Response curve", list(RESPONSE_CURVES))
+
+    # Full departments x fee-rate grid in one call; the slider only selects a column.
+    fee_sweep = sweep_internal_fees(
+        baseline_dept,
+        range(0, 301),
+        response_factors=response_factor,
+        response_curve=response_curve,
+    )
+    fee_table = fee_table_at_rate(fee_sweep, internal_fee_rate)
+    m1, m2, m3 = st.columns(3)
+    m1.metric("Total fee burden", f"${fee_table['fee_cost'].sum():,.2f}")
+    m2.metric("Total emissions reduction", f"{fee_table['emissions_reduction'].sum():,.2f} tCO2e")
+    m3.metric("Revenue-maximizing fee", f"${fee_sweep['revenue_maximizing_fee_rate']:,.0f}/tCO2e")
+    st.dataframe(_styled_table(fee_table), use_container_width=True)
+    st.plotly_chart(fee_distribution(fee_table), use_container_width=True)
+    st.plotly_chart(behavior_response(fee_table), use_container_width=True)
+    st.plotly_chart(fee_revenue_curve(fee_sweep["totals"]), use_container_width=True)
+
+    with st.expander("Fee revenue recycling into abatement"):
+        rec_col1, rec_col2 = st.columns(2)
+        recycling_share_pct = rec_col1.slider("Recycled share of fee revenue (%)", 0, 100, 100)
+        recycling_years = rec_col2.slider("Recycling horizon (years)", 1, 20, 5)
+        recycling = simulate_revenue_recycling(
+            abatement_df,
+            emissions_cube,
+            InternalFeeConfig(internal_fee_rate=internal_fee_rate, response_factor=response_factor),
+            RecyclingConfig(recycling_share=recycling_share_pct / 100.0, years=recycling_years),
+        )
+        diagnostics = recycling["diagnostics"]
+        if not diagnostics["converged"]:
+            st.warning(f"Recycling loop stopped after {diagnostics['iterations']} iterations without converging.")
+        st.dataframe(_styled_table(recycling["totals"]), use_container_width=True)
+        st.dataframe(_styled_table(recycling["funding"]), use_container_width=True)
+
+
+@st.fragment
+def _abatement_tab(
+    abatement_result: dict,
+    abatement_df: pd.DataFrame,
+    emissions_cube: EmissionsCube,
+    selected_carbon_price: float,
+    discount_rate_pct: float,
+    analysis_years: int,
+    annual_savings_growth_pct: float,
+) -> None:
+    st.subheader("Marginal Abatement Cost Curve (MACC)")
+    st.caption("Initiatives are adopted when carbon_price >= cost_per_tonne.")
+    macc_df = abatement_result["macc"]
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Total adopted reduction", f"{abatement_result['total_reduction']:,.2f} tCO2e")
+    m2.metric("Total abatement cost", f"${abatement_result['total_cost']:,.2f}")
+    m3.metric("Portfolio NPV", f"${abatement_result['total_npv']:,.2f}")
+    portfolio_irr = abatement_result.get("portfolio_irr")
+    m4.metric("Portfolio IRR", f"{portfolio_irr * 100:,.2f}%" if portfolio_irr is not None else "N/A")
+
+    st.dataframe(_styled_table(macc_df), use_container_width=True)
+    if macc_df.empty:
+        return
+    st.plotly_chart(macc_curve(macc_df), use_container_width=True)
+    st.plotly_chart(cumulative_reduction(macc_df), use_container_width=True)
+    st.plotly_chart(roi_timeline(macc_df), use_container_width=True)
+    st.plotly_chart(npv_by_initiative(macc_df), use_container_width=True)
+
+    st.markdown("Target-driven carbon price")
+    target_curve = build_target_price_curve(
+        abatement_df,
+        emissions_cube,
+        discount_rate=discount_rate_pct / 100.0,
+        analysis_years=analysis_years,
+        annual_savings_growth=annual_savings_growth_pct / 100.0,
+    )
+    reduction_target_pct = st.slider("Reduction target (%)", 0.0, 100.0, 10.0, 0.5)
+    total_target = solve_target_prices(target_curve, [reduction_target_pct]).iloc[0]
+    st.metric(
+        "Minimum price for target",
+        f"${total_target['required_price']:,.2f}/tCO2e" if total_target["attainable"] else "Not attainable",
+    )
+    segment_targets = pd.concat(
+        [
+            solve_target_prices(target_curve, [reduction_target_pct], level="department"),
+            solve_target_prices(target_curve, [reduction_target_pct], level="scope"),
+        ],
+        ignore_index=True,
+    )
+    st.dataframe(_styled_table(segment_targets), use_container_width=True)
+    st.dataframe(_styled_table(target_curve.break_even), use_container_width=True)
+
+    st.markdown("Price trajectory adoption timeline")
+    path_col1, path_col2 = st.columns(2)
+    price_growth_pct = path_col1.slider("Annual carbon price growth (%)", 0.0, 20.0, 5.0, 0.5)
+    cost_decline_pct = path_col2.slider("Annual abatement cost decline (%)", 0.0, 15.0, 2.0, 0.5)
+    price_path = pd.Series(
+        [selected_carbon_price * (1.0 + price_growth_pct / 100.0) ** year for year in range(analysis_years)],
+        index=range(1, analysis_years + 1),
+    )
+    timeline_result = adoption_timeline(
+        abatement_df,
+        emissions_cube,
+        price_path,
+        cost_decline_rates=cost_decline_pct / 100.0,
+        discount_rate=discount_rate_pct / 100.0,
+    )
+    st.metric("Trajectory portfolio NPV", f"${timeline_result['total_npv']:,.2f}")
+    timeline_chart = px.line(
+        timeline_result["timeline"],
+        x="year",
+        y="emissions_tonnes",
+        markers=True,
+        title="Emissions Along Price Trajectory",
+    )
+    st.plotly_chart(style_figure(timeline_chart), use_container_width=True)
+    st.dataframe(_styled_table(timeline_result["initiatives"]), use_container_width=True)
+
+
+@st.fragment
+def _captrade_tab(
+    baseline_total: float,
+    emissions_cube: EmissionsCube,
+    abatement_df: pd.DataFrame,
+    allowances_df: pd.DataFrame,
+    offset_lots_df: pd.DataFrame,
+    discount_rate_pct: float,
+    analysis_years: int,
+    sequential_abatement: bool,
+) -> None:
+    st.subheader("Cap-and-Trade Market Simulator")
+    defaults = allowances_df.iloc[0].to_dict() if not allowances_df.empty else {}
+
+    cap_col1, cap_col2, cap_col3, cap_col4 = st.columns(4)
+    annual_cap = cap_col1.number_input(
+        "Annual cap",
+        min_value=0.0,
+        value=float(defaults.get("initial_cap", baseline_total * 0.9)),
+    )
+    free_allocations = cap_col2.number_input(
+        "Free allocations",
+        min_value=0.0,
+        value=float(defaults.get("allocated_allowances", baseline_total * 0.7)),
+    )
+    trading_limit_pct = cap_col3.slider("Trading limit pct", 0.0, 1.5, 1.0, 0.05)
+    scarcity_factor = cap_col4.slider("Scarcity factor", 0.1, 3.0, 1.0, 0.1)
+
+    cap_col5, cap_col6, cap_col7 = st.columns(3)
+    offset_limit_pct = cap_col5.slider(
+        "Offset limit pct",
+        0.0,
+        1.0,
+        float(defaults.get("offset_limit_pct", 0.15)),
+        0.01,
+    )
+    base_price = cap_col6.number_input("Base market price", min_value=1.0, value=45.0)
+    bank_balance = cap_col7.number_input("Allowance bank balance", min_value=0.0, value=0.0)
+
+    captrade_config = CapTradeConfig(
+        annual_cap=annual_cap,
+        free_allocations=free_allocations,
+        trading_limit_pct=trading_limit_pct,
+        offset_limit_pct=offset_limit_pct,
+        base_price=base_price,
+        scarcity_factor=scarcity_factor,
+        bank_balance=bank_balance,
+    )
+    captrade_result = simulate_cap_and_trade(
+        emissions_tonnes=baseline_total,
+        config=captrade_config,
+        offsets_used=0.0,
+    )
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Clearing price", f"${captrade_result['clearing_price']:,.2f}")
+    c2.metric("Compliance cost", f"${captrade_result['compliance_cost']:,.2f}")
+    c3.metric("Net position", f"{captrade_result['net_position']:,.2f} allowances")
+    c4.metric("Bank balance", f"{captrade_result['bank_balance']:,.2f}")
+    st.json(captrade_result)
+
+    st.markdown("Least-cost compliance plan (abatement + offsets + allowances)")
+    compliance_curve = build_compliance_curve(
+        baseline_total,
+        initiatives=abatement_df,
+        baseline_detailed=emissions_cube,
+        offset_lots=offset_lots_df,
+        offset_limit_pct=offset_limit_pct,
+        discount_rate=discount_rate_pct / 100.0,
+        analysis_years=analysis_years,
+        sequential=sequential_abatement,
+    )
+    compliance_plan = solve_compliance(compliance_curve, baseline_total, captrade_config)
+    p1, p2, p3 = st.columns(3)
+    p1.metric("Plan compliance cost", f"${compliance_plan['total_compliance_cost']:,.2f}")
+    p2.metric("Marginal compliance price", f"${compliance_plan['marginal_compliance_price']:,.2f}/tCO2e")
+    p3.metric("Unmet after plan", f"{compliance_plan['unmet_after_plan']:,.2f} tCO2e")
+    st.dataframe(_styled_table(compliance_plan["mix"]), use_container_width=True)
+
+    if allowances_df.empty:
+        return
+    with st.expander("Stochastic allowance price paths"):
+        ets_col1, ets_col2, ets_col3, ets_col4, ets_col5 = st.columns(5)
+        n_paths = ets_col1.select_slider("Paths", options=[1_000, 10_000, 50_000, 100_000], value=10_000)
+        emissions_volatility = ets_col2.slider("Emissions volatility", 0.0, 0.5, 0.05, 0.01)
+        supply_volatility = ets_col3.slider("Supply volatility", 0.0, 0.5, 0.02, 0.01)
+        market_bank = ets_col4.number_input("Market-wide bank", min_value=0.0, value=0.0)
+        ets_seed = ets_col5.number_input("Seed", min_value=0, value=42, step=1)
+        msr_col1, msr_col2, msr_col3, msr_col4 = st.columns(4)
+        use_reserve = msr_col1.checkbox("Market stability reserve", value=True)
+        msr_upper = msr_col2.number_input("Withdraw above bank", min_value=0.0, value=float(annual_cap) * 0.5)
+        msr_lower = msr_col3.number_input("Release below bank", min_value=0.0, value=float(annual_cap) * 0.1)
+        msr_intake = msr_col4.slider("Intake rate", 0.0, 1.0, 0.24, 0.01)
+
+        # Large path counts run in the background; unchanged settings reuse the finished simulation.
+        _track_job(
+            "ets",
+            default_executor().submit(
+                simulate_ets_paths,
+                baseline_total,
+                allowances_df,
+                captrade_config,
+                StochasticETSConfig(
+                    n_paths=n_paths,
+                    emissions_volatility=emissions_volatility,
+                    supply_volatility=supply_volatility,
+                    initial_market_bank=market_bank,
+                    seed=int(ets_seed),
+                ),
+                MarketStabilityReserve(
+                    upper_threshold=msr_upper,
+                    lower_threshold=msr_lower,
+                    intake_rate=msr_intake,
+                    release_volume=msr_lower,
+                )
+                if use_reserve
+                else None,
+                label="Allowance price simulation",
+                timeout=JOB_TIMEOUT_SECONDS,
+            ),
+        )
+        ets_job = _job_status("ets")
+        if ets_job is None:
+            return
+        ets_result = ets_job.result
+        price_bands = ets_result["yearly"].melt(
+            id_vars="year",
+            value_vars=["price_p05", "price_p50", "price_p95"],
+            var_name="quantile",
+            value_name="price",
+        )
+        st.plotly_chart(
+            style_figure(px.line(price_bands, x="year", y="price", color="quantile", title="Allowance Price Quantiles")),
+            use_container_width=True,
+        )
+        st.json(ets_result["compliance_cost_quantiles"])
+        st.dataframe(_styled_table(ets_result["yearly"]), use_container_width=True)
+
+
+@st.fragment
+def _offsets_tab(baseline_total: float, offset_lots_df: pd.DataFrame) -> None:
+    st.subheader("Offset Purchasing Model")
+    off_col1, off_col2, off_col3, off_col4 = st.columns(4)
+    offset_price = off_col1.number_input("Offset price", min_value=0.0, value=18.0)
+    integrity_score = off_col2.slider("Integrity score", 0.0, 100.0, 80.0, 1.0)
+    quality_discount_factor = off_col3.slider("Quality discount factor", 0.0, 1.5, 0.9, 0.05)
+    offset_limit_pct_for_offsets = off_col4.slider("Max offset usage pct", 0.0, 1.0, 0.15, 0.01)
+
+    offset_result = simulate_offsets(
+        total_emissions=baseline_total,
+        offset_price=offset_price,
+        integrity_score=integrity_score,
+        offset_limit_pct=offset_limit_pct_for_offsets,
+        quality_discount_factor=quality_discount_factor,
+    )
+
+    o1, o2, o3 = st.columns(3)
+    o1.metric("Eligible offsets", f"{offset_result['eligible_offsets']:,.2f} tCO2e")
+    o2.metric("Total offset cost", f"${offset_result['total_offset_cost']:,.2f}")
+    o3.metric("Residual emissions", f"{offset_result['residual_emissions']:,.2f} tCO2e")
+    st.json(offset_result)
+
+    if not offset_lots_df.empty:
+        st.markdown("Offset portfolio (merit-order procurement)")
+        portfolio_result = procure_offsets(
+            baseline_total,
+            offset_lots_df,
+            offset_limit_pct_for_offsets,
+        )
+        p1, p2, p3 = st.columns(3)
+        p1.metric("Procured (integrity-adjusted)", f"{portfolio_result['procured_adjusted_tonnes']:,.2f} tCO2e")
+        p2.metric("Portfolio cost", f"${portfolio_result['total_offset_cost']:,.2f}")
+        p3.metric("Marginal offset price", f"${portfolio_result['marginal_offset_price']:,.2f}/tCO2e")
+        st.dataframe(_styled_table(portfolio_result["schedule"]), use_container_width=True)
+
+
+def _run_payload(report_inputs: dict) -> dict:
+    return {
+        "summary": report_inputs["summary"],
+        "settings": report_inputs["settings"],
+        "sections": {
+            "Scope totals": report_inputs["scope_totals"],
+            "Abatement": report_inputs["abatement_totals"],
+        },
+        "data": {
+            "activities": _to_json_records(report_inputs["activities"]),
+            "pricing": _to_json_records(report_inputs["pricing"]),
+            "department_emissions": _to_json_records(report_inputs["dept_emissions"]),
+            "macc": _to_json_records(report_inputs["macc"]),
+        },
+    }
+
+
+def _build_reports(context: JobContext, report_inputs: dict) -> dict:
+    context.progress(0.05, "Collecting run data")
+    run_payload = _run_payload(report_inputs)
+    context.progress(0.35, "Rendering PDF")
+    # Charts and the MACC appendix are drawn from the frames rather than the JSON records.
+    pdf_bytes = build_pdf_report(
+        {
+            **run_payload,
+            "data": {
+                "pricing": report_inputs["pricing"],
+                "department_emissions": report_inputs["dept_emissions"],
+                "macc": report_inputs["macc"],
+                "ets_yearly": report_inputs.get("ets_yearly"),
+            },
+        }
+    )
+    context.progress(0.7, "Writing Excel workbook")
+    tables = {name: report_inputs[name] for name in ("activities", "pricing", "dept_emissions", "macc")}
+    excel_bytes = build_excel_report(tables)
+    arrow_bytes = None
+    if HAS_PYARROW:
+        context.progress(0.9, "Writing Arrow tables")
+        arrow_bytes = build_arrow_report({**tables, "ets_yearly": report_inputs.get("ets_yearly")})
+    return {"payload": run_payload, "pdf": pdf_bytes, "excel": excel_bytes, "arrow": arrow_bytes}
+
+
+@st.fragment
+def _export_tab(report_inputs: dict) -> None:
+    st.subheader("Export Center")
+    # Reports build in the background, keyed by their inputs: rebuilding an
+    # unchanged run returns the finished reports immediately.
+    if st.button("Build reports"):
+        _track_job(
+            "reports",
+            default_executor().submit(
+                _build_reports,
+                report_inputs,
+                label="Report build",
+                timeout=JOB_TIMEOUT_SECONDS,
+                pass_context=True,
+            ),
+        )
+
+    reports_job = _job_status("reports")
+    if reports_job is None:
+        st.caption("Build reports to download the current run as PDF, Excel or JSON.")
+    else:
+        bundle = reports_job.result
+        st.download_button(
+            "Download PDF report",
+            data=bundle["pdf"],
+            file_name="carbonpricingx_report.pdf",
+            mime="application/pdf",
+        )
+        st.download_button(
+            "Download Excel report",
+            data=bundle["excel"],
+            file_name="carbonpricingx_report.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+        if bundle["arrow"] is not None:
+            st.download_button(
+                "Download Arrow tables",
+                data=bundle["arrow"],
+                file_name="carbonpricingx_tables.zip",
+                mime="application/zip",
+            )
+        st.download_button(
+            "Download JSON simulation",
+            data=json.dumps(bundle["payload"], indent=2),
+            file_name="carbonpricingx_run.json",
+            mime="application/json",
+        )
+
+    if st.button("Save run to history"):
+        run_payload = reports_job.result["payload"] if reports_job is not None else _run_payload(report_inputs)
+        run_path = save_run(run_payload, RUNS_DIR)
+        st.session_state.last_saved_run = str(run_path)
+        st.success(f"Saved: {run_path.name}")
+
+    if st.session_state.last_saved_run:
+        st.caption(f"Last saved run: {st.session_state.last_saved_run}")
+
+
+@st.fragment
+def _history_tab() -> None:
+    st.subheader("Historical Runs")
+    runs = list_runs(RUNS_DIR)
+    if not runs:
+        st.info("No historical runs yet. Save one from Export Center.")
+        return
+    run_map = {run.name: run for run in runs}
+    selected = st.selectbox("Load run", list(run_map.keys()))
+    loaded = load_run(run_map[selected])
+    st.json(loaded.get("summary", {}))
+
+    if len(runs) >= 2:
+        names = list(run_map.keys())
+        c_a, c_b = st.columns(2)
+        run_a = c_a.selectbox("Run A", names, key="run_a")
+        run_b = c_b.selectbox("Run B", names, index=1, key="run_b")
+        if st.button("Compare selected runs"):
+            diff = compare_runs(run_map[run_a], run_map[run_b])
+            st.json(diff)
+
+
 def run_app() -> None:
+    enable_copy_on_write()
+    enable_arrow_strings()
     st.set_page_config(page_title="CarbonPricingX", page_icon="🌿", layout="wide")
     _inject_styles()
     _render_hero()
@@ -354,17 +988,34 @@ def run_app() -> None:
     if uploaded is not None:
         upload_sig = f"{uploaded.name}:{getattr(uploaded, 'size', 0)}"
         if st.session_state.pending_upload_sig != upload_sig:
-            try:
-                parsed = parse_uploaded_file(uploaded)
-            except Exception as exc:
-                st.sidebar.error(f"Upload parsing failed: {exc}")
-            else:
+            # Parsing runs in the background; resubmitting identical bytes reuses the finished result.
+            # With an activity store configured, uploads seen before are memory-mapped from disk.
+            store = default_store()
+            parse = store.load_or_build if store is not None else parse_uploaded_file
+            if st.session_state.upload_job_sig != upload_sig:
+                _track_job(
+                    "upload",
+                    default_executor().submit(
+                        parse,
+                        uploaded,
+                        key=job_key(parse, uploaded.name, uploaded),
+                        label="Upload parsing",
+                        timeout=JOB_TIMEOUT_SECONDS,
+                    ),
+                )
+                st.session_state.upload_job_sig = upload_sig
+            with st.sidebar:
+                parse_job = _job_status("upload")
+            if parse_job is not None:
+                stored = parse_job.result if isinstance(parse_job.result, StoredInput) else None
+                parsed = stored.parsed if stored is not None else parse_job.result
                 st.session_state.pending_upload = {
                     "name": uploaded.name,
                     "activities": parsed.activities,
                     "departments": parsed.departments,
                     "abatement": parsed.abatement,
                     "allowances": parsed.allowances,
+                    "stored": stored,
                 }
                 st.session_state.pending_upload_sig = upload_sig
                 st.sidebar.success("Input file parsed. Click Start Analyze Uploaded Data.")
@@ -391,12 +1042,18 @@ def run_app() -> None:
                     "No recognized rows found. Add at least one valid sheet: activities, abatement, or allowances."
                 )
             else:
-                if not candidate_activities.empty:
-                    st.session_state.activities_df = candidate_activities.copy()
+                stored = pending_upload.get("stored")
+                if stored is not None and stored.baseline is not None:
+                    # The stored baseline seeds the shared registry entry, so analysis skips recomputing it.
+                    lease = default_registry().lease(candidate_activities, key=f"store:{stored.key}")
+                    lease.derived("emissions", lambda _: stored.baseline)
+                    _set_dataset("activities_df", lease)
+                elif not candidate_activities.empty:
+                    _set_dataset("activities_df", default_registry().lease(candidate_activities))
                 if not candidate_abatement.empty:
-                    st.session_state.abatement_df = candidate_abatement.copy()
+                    _set_dataset("abatement_df", default_registry().lease(candidate_abatement))
                 if not candidate_allowances.empty:
-                    st.session_state.allowances_df = candidate_allowances.copy()
+                    _set_dataset("allowances_df", default_registry().lease(candidate_allowances))
 
                 st.session_state.active_data_source = f"uploaded:{pending_upload['name']}"
                 if candidate_activities.empty:
@@ -412,6 +1069,7 @@ def run_app() -> None:
             "activities_df",
             "abatement_df",
             "allowances_df",
+            "offset_lots_df",
             "pending_upload",
             "pending_upload_sig",
             "active_data_source",
@@ -420,24 +1078,56 @@ def run_app() -> None:
                 del st.session_state[key]
         _init_state()
 
+    registry = default_registry()
+    st.sidebar.caption(
+        f"Shared datasets in memory: {len(registry.stats())} ({registry.total_bytes / 1024 ** 2:,.1f} MB across all sessions)"
+    )
+
     st.sidebar.header("Abatement Finance")
     discount_rate_pct = st.sidebar.slider("Discount rate (%)", 0.0, 20.0, 8.0, 0.5)
     analysis_years = st.sidebar.slider("Analysis horizon (years)", 3, 25, 10)
     annual_savings_growth_pct = st.sidebar.slider("Annual savings growth (%)", -5.0, 10.0, 0.0, 0.5)
+    sequential_abatement = st.sidebar.checkbox(
+        "Sequential reductions on shared segments",
+        value=False,
+        help="Apply adopted initiatives in cost order on the emissions left in each department/scope segment.",
+    )
 
     activities_df = st.session_state.activities_df
     abatement_df = st.session_state.abatement_df
     allowances_df = st.session_state.allowances_df
 
+    # Full reruns may change any shared input, so the reports panel stops showing the
+    # previous build, unless the rerun only delivers a finished job.
+    if not st.session_state.pop("job_rerun", False):
+        st.session_state.jobs.pop("reports", None)
     try:
-        emissions_result = calculate_emissions(activities_df)
+        emissions_result = _shared_baseline(activities_df)
     except Exception as exc:
         st.error(f"Input validation error: {exc}")
         st.stop()
 
+    unit_issues = emissions_result["unit_issues"]
+    if not unit_issues.empty:
+        st.warning(
+            f"{int(unit_issues['rows'].sum()):,} activity rows have no factor_unit or use a unit that cannot be "
+            "converted to it; their amounts are used as reported."
+        )
+        with st.expander("Unconvertible units"):
+            st.dataframe(_styled_table(unit_issues), use_container_width=True)
+
+    period_issues = emissions_result["period_issues"]
+    if not period_issues.empty:
+        st.warning(
+            f"{int(period_issues['rows'].sum()):,} activity rows have dates that cannot be read as a month; "
+            "they count toward totals but not toward the timeline."
+        )
+        with st.expander("Unreadable dates"):
+            st.dataframe(_styled_table(period_issues), use_container_width=True)
+
     baseline_total = emissions_result["total_emissions"]
-    baseline_dept = emissions_result["by_department"]
-    baseline_detailed = emissions_result["detailed"]
+    # Engines share the pre-aggregated cube instead of re-scanning row-level activities.
+    emissions_cube = emissions_result["cube"]
 
     (
         tab_dashboard,
@@ -480,247 +1170,73 @@ def run_app() -> None:
 
     abatement_result = evaluate_abatement(
         abatement_df,
-        baseline_detailed,
+        emissions_cube,
         selected_carbon_price,
         discount_rate=discount_rate_pct / 100.0,
         analysis_years=analysis_years,
         annual_savings_growth=annual_savings_growth_pct / 100.0,
+        sequential=sequential_abatement,
     )
-    macc_df = abatement_result["macc"]
-    recommended_price = recommend_carbon_price(macc_df)
+    recommended_price = recommend_carbon_price(abatement_result["macc"])
 
     with tab_dashboard:
-        st.subheader("Dashboard")
-        top3 = baseline_dept.head(3).copy()
-        top3["cost_exposure"] = top3["emissions_tonnes"] * selected_carbon_price
-
-        _kpi_cards(
-            [
-                ("Total emissions", f"{baseline_total:,.2f} tCO2e"),
-                ("Total carbon cost", f"${selected_cost:,.2f}"),
-                ("Recommended price", f"${recommended_price:,.2f}/tCO2e"),
-                (
-                    "Portfolio NPV",
-                    f"${abatement_result['total_npv']:,.2f}",
-                ),
-            ]
-        )
-
-        t1, t2 = st.columns([1.2, 1])
-        with t1:
-            st.markdown("Top 3 departments by exposure")
-            st.table(_styled_table(top3))
-        with t2:
-            dept_chart = px.bar(
-                top3,
-                x="department",
-                y="cost_exposure",
-                title="Department Exposure",
-                color="cost_exposure",
-                color_continuous_scale="Tealgrn",
-            )
-            st.plotly_chart(style_figure(dept_chart), use_container_width=True)
-
-        st.markdown("Baseline emissions by scope")
-        st.dataframe(_styled_table(emissions_result["by_scope"]), use_container_width=True)
-
+        _dashboard_tab(emissions_result, selected_carbon_price, selected_cost, recommended_price, abatement_result)
     with tab_pricing:
-        st.subheader("Carbon Pricing Simulator")
-        st.plotly_chart(pricing_cost_curve(pricing_df), use_container_width=True)
-        st.plotly_chart(emissions_vs_price(pricing_df), use_container_width=True)
-        st.dataframe(_styled_table(pricing_df), use_container_width=True)
-
+        _pricing_tab(emissions_cube, pricing_df, pricing_config, selected_carbon_price)
     with tab_internal:
-        st.subheader("Internal Carbon Fee System")
-        fee_col1, fee_col2 = st.columns(2)
-        internal_fee_rate = fee_col1.slider("Internal fee rate (USD/tCO2e)", 0, 300, 60)
-        response_factor = fee_col2.slider("Response factor", 0.0, 1.0, 0.15, 0.01)
-
-        internal_result = simulate_internal_fee(
-            baseline_dept,
-            InternalFeeConfig(internal_fee_rate=internal_fee_rate, response_factor=response_factor),
-        )
-        m1, m2 = st.columns(2)
-        m1.metric("Total fee burden", f"${internal_result['total_fee_cost']:,.2f}")
-        m2.metric("Total emissions reduction", f"{internal_result['total_reduction']:,.2f} tCO2e")
-        st.dataframe(_styled_table(internal_result["table"]), use_container_width=True)
-        st.plotly_chart(fee_distribution(internal_result["table"]), use_container_width=True)
-        st.plotly_chart(behavior_response(internal_result["table"]), use_container_width=True)
-
+        _internal_tab(emissions_result["by_department"], emissions_cube, abatement_df)
     with tab_abatement:
-        st.subheader("Marginal Abatement Cost Curve (MACC)")
-        st.caption("Initiatives are adopted when carbon_price >= cost_per_tonne.")
-        m1, m2, m3, m4 = st.columns(4)
-        m1.metric("Total adopted reduction", f"{abatement_result['total_reduction']:,.2f} tCO2e")
-        m2.metric("Total abatement cost", f"${abatement_result['total_cost']:,.2f}")
-        m3.metric("Portfolio NPV", f"${abatement_result['total_npv']:,.2f}")
-        portfolio_irr = abatement_result.get("portfolio_irr")
-        m4.metric("Portfolio IRR", f"{portfolio_irr * 100:,.2f}%" if portfolio_irr is not None else "N/A")
-
-        st.dataframe(_styled_table(macc_df), use_container_width=True)
-        if not macc_df.empty:
-            st.plotly_chart(macc_curve(macc_df), use_container_width=True)
-            st.plotly_chart(cumulative_reduction(macc_df), use_container_width=True)
-            st.plotly_chart(roi_timeline(macc_df), use_container_width=True)
-            st.plotly_chart(npv_by_initiative(macc_df), use_container_width=True)
-
-    with tab_captrade:
-        st.subheader("Cap-and-Trade Market Simulator")
-        defaults = allowances_df.iloc[0].to_dict() if not allowances_df.empty else {}
-
-        cap_col1, cap_col2, cap_col3, cap_col4 = st.columns(4)
-        annual_cap = cap_col1.number_input(
-            "Annual cap",
-            min_value=0.0,
-            value=float(defaults.get("initial_cap", baseline_total * 0.9)),
-        )
-        free_allocations = cap_col2.number_input(
-            "Free allocations",
-            min_value=0.0,
-            value=float(defaults.get("allocated_allowances", baseline_total * 0.7)),
-        )
-        trading_limit_pct = cap_col3.slider("Trading limit pct", 0.0, 1.5, 1.0, 0.05)
-        scarcity_factor = cap_col4.slider("Scarcity factor", 0.1, 3.0, 1.0, 0.1)
-
-        cap_col5, cap_col6, cap_col7 = st.columns(3)
-        offset_limit_pct = cap_col5.slider(
-            "Offset limit pct",
-            0.0,
-            1.0,
-            float(defaults.get("offset_limit_pct", 0.15)),
-            0.01,
+        _abatement_tab(
+            abatement_result,
+            abatement_df,
+            emissions_cube,
+            selected_carbon_price,
+            discount_rate_pct,
+            analysis_years,
+            annual_savings_growth_pct,
         )
-        base_price = cap_col6.number_input("Base market price", min_value=1.0, value=45.0)
-        bank_balance = cap_col7.number_input("Allowance bank balance", min_value=0.0, value=0.0)
-
-        captrade_result = simulate_cap_and_trade(
-            emissions_tonnes=baseline_total,
-            config=CapTradeConfig(
-                annual_cap=annual_cap,
-                free_allocations=free_allocations,
-                trading_limit_pct=trading_limit_pct,
-                offset_limit_pct=offset_limit_pct,
-                base_price=base_price,
-                scarcity_factor=scarcity_factor,
-                bank_balance=bank_balance,
-            ),
-            offsets_used=0.0,
+    with tab_captrade:
+        _captrade_tab(
+            baseline_total,
+            emissions_cube,
+            abatement_df,
+            allowances_df,
+            st.session_state.offset_lots_df,
+            discount_rate_pct,
+            analysis_years,
+            sequential_abatement,
         )
-
-        c1, c2, c3, c4 = st.columns(4)
-        c1.metric("Clearing price", f"${captrade_result['clearing_price']:,.2f}")
-        c2.metric("Compliance cost", f"${captrade_result['compliance_cost']:,.2f}")
-        c3.metric("Net position", f"{captrade_result['net_position']:,.2f} allowances")
-        c4.metric("Bank balance", f"{captrade_result['bank_balance']:,.2f}")
-        st.json(captrade_result)
-
     with tab_offsets:
-        st.subheader("Offset Purchasing Model")
-        off_col1, off_col2, off_col3, off_col4 = st.columns(4)
-        offset_price = off_col1.number_input("Offset price", min_value=0.0, value=18.0)
-        integrity_score = off_col2.slider("Integrity score", 0.0, 100.0, 80.0, 1.0)
-        quality_discount_factor = off_col3.slider("Quality discount factor", 0.0, 1.5, 0.9, 0.05)
-        offset_limit_pct_for_offsets = off_col4.slider("Max offset usage pct", 0.0, 1.0, 0.15, 0.01)
-
-        offset_result = simulate_offsets(
-            total_emissions=baseline_total,
-            offset_price=offset_price,
-            integrity_score=integrity_score,
-            offset_limit_pct=offset_limit_pct_for_offsets,
-            quality_discount_factor=quality_discount_factor,
-        )
-
-        o1, o2, o3 = st.columns(3)
-        o1.metric("Eligible offsets", f"{offset_result['eligible_offsets']:,.2f} tCO2e")
-        o2.metric("Total offset cost", f"${offset_result['total_offset_cost']:,.2f}")
-        o3.metric("Residual emissions", f"{offset_result['residual_emissions']:,.2f} tCO2e")
-        st.json(offset_result)
-
+        _offsets_tab(baseline_total, st.session_state.offset_lots_df)
     with tab_export:
-        st.subheader("Export Center")
-        run_payload = {
-            "summary": {
-                "total_emissions": baseline_total,
-                "total_carbon_cost": selected_cost,
-                "recommended_carbon_price": recommended_price,
-                "selected_carbon_price": selected_carbon_price,
-                "abatement_total_npv": abatement_result["total_npv"],
-                "abatement_portfolio_irr": abatement_result.get("portfolio_irr"),
-            },
-            "settings": {
-                "discount_rate_pct": discount_rate_pct,
-                "analysis_years": analysis_years,
-                "annual_savings_growth_pct": annual_savings_growth_pct,
-            },
-            "sections": {
-                "Scope totals": emissions_result["scope_totals"],
-                "Abatement": {
+        _export_tab(
+            {
+                "activities": activities_df,
+                "pricing": pricing_df,
+                "dept_emissions": emissions_result["by_department"],
+                "macc": abatement_result["macc"],
+                "ets_yearly": _finished_result("ets", "yearly"),
+                "scope_totals": emissions_result["scope_totals"],
+                "abatement_totals": {
                     "total_reduction": abatement_result["total_reduction"],
                     "total_cost": abatement_result["total_cost"],
                     "total_net_value": abatement_result["total_net_value"],
                 },
-            },
-            "data": {
-                "activities": _to_json_records(activities_df),
-                "pricing": _to_json_records(pricing_df),
-                "department_emissions": _to_json_records(baseline_dept),
-                "macc": _to_json_records(macc_df),
-            },
-        }
-
-        pdf_bytes = build_pdf_report(run_payload)
-        excel_bytes = build_excel_report(
-            {
-                "activities": activities_df,
-                "pricing": pricing_df,
-                "dept_emissions": baseline_dept,
-                "macc": macc_df,
+                "summary": {
+                    "total_emissions": baseline_total,
+                    "total_carbon_cost": selected_cost,
+                    "recommended_carbon_price": recommended_price,
+                    "selected_carbon_price": selected_carbon_price,
+                    "abatement_total_npv": abatement_result["total_npv"],
+                    "abatement_portfolio_irr": abatement_result.get("portfolio_irr"),
+                },
+                "settings": {
+                    "discount_rate_pct": discount_rate_pct,
+                    "analysis_years": analysis_years,
+                    "annual_savings_growth_pct": annual_savings_growth_pct,
+                    "sequential_abatement": sequential_abatement,
+                },
             }
         )
-
-        st.download_button(
-            "Download PDF report",
-            data=pdf_bytes,
-            file_name="carbonpricingx_report.pdf",
-            mime="application/pdf",
-        )
-        st.download_button(
-            "Download Excel report",
-            data=excel_bytes,
-            file_name="carbonpricingx_report.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        )
-        st.download_button(
-            "Download JSON simulation",
-            data=json.dumps(run_payload, indent=2),
-            file_name="carbonpricingx_run.json",
-            mime="application/json",
-        )
-
-        if st.button("Save run to history"):
-            run_path = save_run(run_payload, RUNS_DIR)
-            st.session_state.last_saved_run = str(run_path)
-            st.success(f"Saved: {run_path.name}")
-
-        if st.session_state.last_saved_run:
-            st.caption(f"Last saved run: {st.session_state.last_saved_run}")
-
     with tab_history:
-        st.subheader("Historical Runs")
-        runs = list_runs(RUNS_DIR)
-        if not runs:
-            st.info("No historical runs yet. Save one from Export Center.")
-        else:
-            run_map = {run.name: run for run in runs}
-            selected = st.selectbox("Load run", list(run_map.keys()))
-            loaded = load_run(run_map[selected])
-            st.json(loaded.get("summary", {}))
-
-            if len(runs) >= 2:
-                names = list(run_map.keys())
-                c_a, c_b = st.columns(2)
-                run_a = c_a.selectbox("Run A", names, key="run_a")
-                run_b = c_b.selectbox("Run B", names, index=1, key="run_b")
-                if st.button("Compare selected runs"):
-                    diff = compare_runs(run_map[run_a], run_map[run_b])
-                    st.json(diff)
+        _history_tab()
@@ -1,10 +1,14 @@
 from __future__ import annotations
 
-from typing import Dict
+from typing import Dict, List, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
 
-from modules.finance import irr, npv
+from modules.arrow_io import arrow_inputs
+from modules.emissions_cube import EmissionsCube, as_emissions_cube
+from modules.finance import irr_rows, npv_rows
+from modules.memo import memoize
 from modules.utils import coerce_numeric, ensure_required_columns, normalize_columns
 
 REQUIRED_ABATEMENT_COLUMNS = {
@@ -17,31 +21,128 @@ REQUIRED_ABATEMENT_COLUMNS = {
 }
 
 
-def _build_cash_flows(
-    *,
-    capex: float,
-    annual_carbon_savings: float,
-    annual_variable_cost: float,
-    years: int,
-    annual_savings_growth: float,
-) -> list[float]:
-    cash_flows = [-capex]
-    for year in range(1, years + 1):
-        growth = (1.0 + annual_savings_growth) ** (year - 1)
-        net_benefit = (annual_carbon_savings - annual_variable_cost) * growth
-        cash_flows.append(net_benefit)
-    return cash_flows
+def prepare_initiatives(initiatives: pd.DataFrame) -> pd.DataFrame:
+    work = normalize_columns(initiatives)
+    ensure_required_columns(work, REQUIRED_ABATEMENT_COLUMNS, "Abatement initiatives")
+    return coerce_numeric(work, ["max_reduction_pct", "cost_per_tonne", "capex"])
+
+
+def segment_emissions(baseline_detailed: pd.DataFrame | EmissionsCube) -> pd.DataFrame:
+    return as_emissions_cube(baseline_detailed).segments()
+
+
+def initiative_segment_pairs(work: pd.DataFrame, segments: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    # Map every initiative to the concrete (department, scope) segments it targets.
+    # Masks are built once per distinct target combination, then expanded with
+    # index arithmetic so the cost does not grow with per-row filtering.
+    scope_keys = work["target_scope"].astype(str).str.strip().str.lower().to_numpy()
+    dept_keys = work["department"].astype(str).str.strip().str.lower().to_numpy()
+    codes, uniques = pd.factorize(pd.Series(scope_keys) + "\x1f" + pd.Series(dept_keys))
+
+    segment_scopes = segments["scope"].to_numpy()
+    segment_depts = segments["department"].to_numpy()
+    matched = []
+    for combo in uniques:
+        target_scope, target_department = combo.split("\x1f")
+        mask = np.ones(len(segments), dtype=bool)
+        if target_scope and target_scope != "all":
+            mask &= segment_scopes == target_scope
+        if target_department and target_department != "all":
+            mask &= segment_depts == target_department
+        matched.append(np.flatnonzero(mask))
+
+    combo_counts = np.array([len(cells) for cells in matched], dtype=np.int64)
+    if not len(codes) or not combo_counts.sum():
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    combo_starts = np.cumsum(combo_counts) - combo_counts
+    flat_cells = np.concatenate(matched)
+
+    per_initiative = combo_counts[codes]
+    initiative_idx = np.repeat(np.arange(len(codes)), per_initiative)
+    within = np.arange(len(initiative_idx)) - np.repeat(np.cumsum(per_initiative) - per_initiative, per_initiative)
+    segment_idx = flat_cells[np.repeat(combo_starts[codes], per_initiative) + within]
+    return initiative_idx, segment_idx
+
+
+def initiative_baseline_emissions(work: pd.DataFrame, baseline_detailed: pd.DataFrame | EmissionsCube) -> np.ndarray:
+    segments = segment_emissions(baseline_detailed)
+    initiative_idx, segment_idx = initiative_segment_pairs(work, segments)
+    return np.bincount(
+        initiative_idx,
+        weights=segments["emissions_tonnes"].to_numpy()[segment_idx],
+        minlength=len(work),
+    )
+
+
+def sequential_reductions(
+    work: pd.DataFrame,
+    baseline_detailed: pd.DataFrame | EmissionsCube,
+    adopted: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Adopted initiatives act in cost order on what is left of each concrete
+    # segment: share_available = prod(1 - pct) over cheaper initiatives on that
+    # segment, computed as a grouped exclusive cumulative product.
+    segments = segment_emissions(baseline_detailed)
+    initiative_idx, segment_idx = initiative_segment_pairs(work, segments)
+    segment_values = segments["emissions_tonnes"].to_numpy()
+
+    pct = np.clip(work["max_reduction_pct"].fillna(0.0).to_numpy() / 100.0, 0.0, 1.0)
+    applied_share = np.where(adopted, pct, 0.0)
+    rank = np.empty(len(work), dtype=np.int64)
+    rank[np.argsort(work["cost_per_tonne"].to_numpy(), kind="stable")] = np.arange(len(work))
+
+    order = np.lexsort((rank[initiative_idx], segment_idx))
+    pair_initiative = initiative_idx[order]
+    pair_segment = segment_idx[order]
+    remaining = pd.Series(1.0 - applied_share[pair_initiative])
+    available_share = (
+        remaining.groupby(pair_segment).cumprod().groupby(pair_segment).shift(1, fill_value=1.0).to_numpy()
+    )
+
+    available = segment_values[pair_segment] * available_share
+    reduction = np.bincount(pair_initiative, weights=available * applied_share[pair_initiative], minlength=len(work))
+    available_total = np.bincount(pair_initiative, weights=available, minlength=len(work))
+    return reduction, available_total
 
 
+@arrow_inputs
+@memoize
 def evaluate_abatement(
     initiatives: pd.DataFrame,
-    baseline_detailed: pd.DataFrame,
+    baseline_detailed: pd.DataFrame | EmissionsCube,
     carbon_price: float,
     *,
     discount_rate: float = 0.08,
     analysis_years: int = 10,
     annual_savings_growth: float = 0.0,
+    sequential: bool = False,
 ) -> Dict[str, pd.DataFrame | float | None]:
+    return evaluate_abatement_prices(
+        initiatives,
+        baseline_detailed,
+        [carbon_price],
+        discount_rate=discount_rate,
+        analysis_years=analysis_years,
+        annual_savings_growth=annual_savings_growth,
+        sequential=sequential,
+    )[0]
+
+
+@arrow_inputs
+def evaluate_abatement_prices(
+    initiatives: pd.DataFrame,
+    baseline_detailed: pd.DataFrame | EmissionsCube,
+    carbon_prices: Sequence[float],
+    *,
+    discount_rate: float = 0.08,
+    analysis_years: int = 10,
+    annual_savings_growth: float = 0.0,
+    sequential: bool = False,
+) -> List[Dict[str, pd.DataFrame | float | None]]:
+    # One evaluate_abatement result per price, computed as prices x initiatives
+    # (x cash-flow years) arrays instead of one pass per price and initiative.
+    prices = np.asarray(carbon_prices, dtype=float).reshape(-1)
     if initiatives is None or initiatives.empty:
         empty = pd.DataFrame(
             columns=[
@@ -59,90 +160,97 @@ def evaluate_abatement(
                 "irr",
             ]
         )
-        return {
-            "macc": empty,
-            "total_reduction": 0.0,
-            "total_cost": 0.0,
-            "total_net_value": 0.0,
-            "total_npv": 0.0,
-            "portfolio_irr": None,
-        }
-
-    work = normalize_columns(initiatives.copy())
-    ensure_required_columns(work, REQUIRED_ABATEMENT_COLUMNS, "Abatement initiatives")
-    work = coerce_numeric(work, ["max_reduction_pct", "cost_per_tonne", "capex"])
-
-    detailed = baseline_detailed.copy()
-    detailed["emissions_tonnes"] = pd.to_numeric(detailed["emissions_tonnes"], errors="coerce").fillna(0.0)
+        return [
+            {
+                "macc": empty.copy(),
+                "total_reduction": 0.0,
+                "total_cost": 0.0,
+                "total_net_value": 0.0,
+                "total_npv": 0.0,
+                "portfolio_irr": None,
+            }
+            for _ in prices
+        ]
 
-    rows = []
-    portfolio_cash_flows = [0.0] * (analysis_years + 1)
+    work = prepare_initiatives(initiatives)
+    baseline_detailed = as_emissions_cube(baseline_detailed)
+    cost_per_tonne = work["cost_per_tonne"].to_numpy(dtype=float)
+    pct = work["max_reduction_pct"].to_numpy(dtype=float) / 100.0
+    capex = work["capex"].to_numpy(dtype=float)
 
-    for _, row in work.iterrows():
-        target_scope = str(row["target_scope"]).strip().lower()
-        target_department = str(row["department"]).strip().lower()
+    segment_totals = initiative_baseline_emissions(work, baseline_detailed)
+    adopted = prices[:, None] >= cost_per_tonne[None, :]
+    if sequential:
+        # Reductions depend only on the adopted set, so they are solved once per distinct set.
+        reductions = np.empty(adopted.shape)
+        available_totals = np.empty(adopted.shape)
+        masks, inverse = np.unique(adopted, axis=0, return_inverse=True)
+        for position, mask in enumerate(masks):
+            rows = inverse.reshape(-1) == position
+            reductions[rows], available_totals[rows] = sequential_reductions(work, baseline_detailed, mask)
+    else:
+        reductions = np.where(adopted, segment_totals * pct, 0.0)
+        available_totals = np.broadcast_to(segment_totals, adopted.shape)
 
-        segment = detailed
-        if target_scope and target_scope != "all":
-            segment = segment[segment["scope"].astype(str).str.lower() == target_scope]
-        if target_department and target_department != "all":
-            segment = segment[segment["department"].astype(str).str.lower() == target_department]
-
-        baseline_segment_emissions = float(segment["emissions_tonnes"].sum())
-        reduction_tonnes = baseline_segment_emissions * (float(row["max_reduction_pct"]) / 100.0)
-        adopted = bool(float(carbon_price) >= float(row["cost_per_tonne"]))
-
-        if not adopted:
-            reduction_tonnes = 0.0
-
-        variable_cost = reduction_tonnes * float(row["cost_per_tonne"])
-        annual_carbon_savings = reduction_tonnes * float(carbon_price)
-        abatement_cost = variable_cost + float(row["capex"])
-        net_value = annual_carbon_savings - abatement_cost
-
-        cash_flows = _build_cash_flows(
-            capex=float(row["capex"]),
-            annual_carbon_savings=annual_carbon_savings,
-            annual_variable_cost=variable_cost,
-            years=analysis_years,
-            annual_savings_growth=annual_savings_growth,
-        )
-        initiative_npv = npv(cash_flows, discount_rate)
-        initiative_irr = irr(cash_flows)
+    variable_cost = reductions * cost_per_tonne
+    carbon_savings = reductions * prices[:, None]
+    abatement_cost = variable_cost + capex
+    net_value = carbon_savings - abatement_cost
 
-        for idx, cf in enumerate(cash_flows):
-            portfolio_cash_flows[idx] += cf
+    years = int(analysis_years)
+    growth = np.array([(1.0 + annual_savings_growth) ** (year - 1) for year in range(1, years + 1)])
+    cash_flows = np.empty(adopted.shape + (years + 1,))
+    cash_flows[..., 0] = -capex
+    cash_flows[..., 1:] = (carbon_savings - variable_cost)[..., None] * growth
+    initiative_npv = npv_rows(cash_flows, discount_rate)
+    initiative_irr = irr_rows(cash_flows)
+    portfolio_cash_flows = cash_flows.sum(axis=1)
+    portfolio_irr = irr_rows(portfolio_cash_flows)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        roi_years = capex / carbon_savings
 
-        rows.append(
+    order = np.argsort(cost_per_tonne, kind="stable")
+    # Same as pandas cumsum: missing entries stay missing and are skipped in the running sum.
+    sorted_reductions, sorted_costs = reductions[:, order], abatement_cost[:, order]
+    cumulative_reduction = np.where(np.isnan(sorted_reductions), np.nan, np.nancumsum(sorted_reductions, axis=1))
+    cumulative_cost = np.where(np.isnan(sorted_costs), np.nan, np.nancumsum(sorted_costs, axis=1))
+    labels = {column: work[column].to_numpy()[order] for column in ("initiative_name", "target_scope", "department")}
+    results = []
+    for row in range(len(prices)):
+        macc = pd.DataFrame(
             {
-                "initiative_name": row["initiative_name"],
-                "target_scope": row["target_scope"],
-                "department": row["department"],
-                "cost_per_tonne": float(row["cost_per_tonne"]),
-                "capex": float(row["capex"]),
-                "adopted": adopted,
-                "baseline_segment_emissions": baseline_segment_emissions,
-                "reduction_tonnes": reduction_tonnes,
-                "abatement_cost": abatement_cost,
-                "carbon_savings": annual_carbon_savings,
-                "net_value": net_value,
-                "roi_years": (float(row["capex"]) / annual_carbon_savings) if annual_carbon_savings > 0 else None,
-                "npv": initiative_npv,
-                "irr": initiative_irr,
-                "cash_flows": cash_flows,
+                **labels,
+                "cost_per_tonne": cost_per_tonne[order],
+                "capex": capex[order],
+                "adopted": adopted[row, order],
+                "baseline_segment_emissions": segment_totals[order],
+                "available_segment_emissions": available_totals[row, order],
+                "reduction_tonnes": sorted_reductions[row],
+                "abatement_cost": sorted_costs[row],
+                "carbon_savings": carbon_savings[row, order],
+                "net_value": net_value[row, order],
+                "roi_years": _optional_floats(np.where(carbon_savings[row, order] > 0, roi_years[row, order], np.nan)),
+                "npv": initiative_npv[row, order],
+                "irr": _optional_floats(initiative_irr[row, order]),
+                "cash_flows": cash_flows[row, order].tolist(),
+                "cumulative_reduction": cumulative_reduction[row],
+                "cumulative_cost": cumulative_cost[row],
             }
         )
+        results.append(
+            {
+                "macc": macc,
+                "total_reduction": float(np.nansum(sorted_reductions[row])),
+                "total_cost": float(np.nansum(sorted_costs[row])),
+                "total_net_value": float(np.nansum(net_value[row])),
+                "total_npv": float(np.nansum(initiative_npv[row])),
+                "portfolio_irr": None if np.isnan(portfolio_irr[row]) else float(portfolio_irr[row]),
+                "portfolio_cash_flows": portfolio_cash_flows[row].tolist(),
+            }
+        )
+    return results
+
 
-    macc = pd.DataFrame(rows).sort_values("cost_per_tonne").reset_index(drop=True)
-    macc["cumulative_reduction"] = macc["reduction_tonnes"].cumsum()
-    macc["cumulative_cost"] = macc["abatement_cost"].cumsum()
-
-    return {
-        "macc": macc,
-        "total_reduction": float(macc["reduction_tonnes"].sum()),
-        "total_cost": float(macc["abatement_cost"].sum()),
-        "total_net_value": float(macc["net_value"].sum()),
-        "total_npv": float(macc["npv"].sum()),
-        "portfolio_irr": irr(portfolio_cash_flows),
-        "portfolio_cash_flows": portfolio_cash_flows,
-    }
+def _optional_floats(values: np.ndarray) -> list:
+    # Missing values stay None, as evaluate_abatement has always reported them.
+    return [None if np.isnan(value) else float(value) for value in values]
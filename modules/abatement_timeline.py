@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+
+from modules.abatement import initiative_baseline_emissions, prepare_initiatives
+from modules.arrow_io import arrow_inputs
+from modules.emissions_cube import EmissionsCube, as_emissions_cube
+from modules.memo import memoize
+
+
+def _decline_rates(work: pd.DataFrame, cost_decline_rates: float | Sequence[float] | None) -> np.ndarray:
+    if cost_decline_rates is None:
+        if "cost_decline_rate" in work.columns:
+            rates = pd.to_numeric(work["cost_decline_rate"], errors="coerce").fillna(0.0).to_numpy()
+        else:
+            rates = np.zeros(len(work))
+    else:
+        rates = np.broadcast_to(np.asarray(cost_decline_rates, dtype=float), (len(work),)).copy()
+    return np.clip(rates, 0.0, 1.0)
+
+
+def _price_matrix(price_paths: pd.Series | pd.DataFrame | np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    if isinstance(price_paths, pd.Series):
+        return price_paths.to_numpy(dtype=float)[None, :], price_paths.index.to_numpy()
+    if isinstance(price_paths, pd.DataFrame):
+        # Columns are analysis years, rows are price paths.
+        return price_paths.to_numpy(dtype=float), price_paths.columns.to_numpy()
+    prices = np.atleast_2d(np.asarray(price_paths, dtype=float))
+    return prices, np.arange(1, prices.shape[1] + 1)
+
+
+def adoption_timeline_paths(
+    initiatives: pd.DataFrame,
+    baseline_detailed: pd.DataFrame | EmissionsCube,
+    price_paths: pd.DataFrame | np.ndarray,
+    *,
+    cost_decline_rates: float | Sequence[float] | None = None,
+    discount_rate: float = 0.08,
+    max_cells: int = 8_000_000,
+) -> Dict[str, np.ndarray | pd.DataFrame]:
+    work = prepare_initiatives(initiatives).reset_index(drop=True)
+    baseline = as_emissions_cube(baseline_detailed)
+    prices, years = _price_matrix(price_paths)
+    n_paths, n_years = prices.shape
+    n_initiatives = len(work)
+
+    cost = work["cost_per_tonne"].fillna(np.inf).to_numpy()
+    capex = work["capex"].fillna(0.0).to_numpy()
+    reduction = initiative_baseline_emissions(work, baseline) * (work["max_reduction_pct"].fillna(0.0).to_numpy() / 100.0)
+    decline = _decline_rates(work, cost_decline_rates)
+
+    # Learning curve: costs in analysis year y (1-based) are scaled by (1 - decline) ** (y - 1).
+    learning = (1.0 - decline)[:, None] ** np.arange(n_years)[None, :]
+    cost_matrix = cost[:, None] * learning
+    discount = (1.0 + float(discount_rate)) ** -np.arange(n_years + 1)
+    year_index = np.arange(n_years)
+    # Discounted tail sums let NPV be read off at the adoption year instead of
+    # summing an initiatives x years benefit array for every path.
+    cost_tail = np.cumsum((cost_matrix * discount[1:])[:, ::-1], axis=1)[:, ::-1]
+    variable_cost = reduction[:, None] * cost_matrix
+
+    adoption_index = np.full((n_paths, n_initiatives), -1, dtype=np.int32)
+    initiative_npv = np.zeros((n_paths, n_initiatives))
+    reduction_by_year = np.zeros((n_paths, n_years))
+    cash_flows = np.zeros((n_paths, n_years + 1))
+
+    chunk = max(1, int(max_cells) // max(n_initiatives * n_years, 1))
+    for start in range(0, n_paths, chunk):
+        block = prices[start : start + chunk]
+        rows = len(block)
+        path_ids = np.repeat(np.arange(rows), n_initiatives)
+
+        eligible = block[:, None, :] >= cost_matrix[None, :, :]
+        first = eligible.argmax(axis=2)
+        adopted_any = np.take_along_axis(eligible, first[:, :, None], axis=2)[:, :, 0]
+        first = np.where(adopted_any, first, n_years)
+        active = year_index[None, None, :] >= first[:, :, None]
+
+        price_tail = np.cumsum((block * discount[1:])[:, ::-1], axis=1)[:, ::-1]
+        safe_first = np.minimum(first, n_years - 1)
+        # Capex is paid at the start of the adoption year, i.e. at t = adoption_year - 1.
+        capex_paid = np.where(adopted_any, capex[None, :] * np.take_along_axis(learning, safe_first.T, axis=1).T, 0.0)
+        benefit_npv = reduction[None, :] * (
+            np.take_along_axis(price_tail, safe_first, axis=1) - np.take_along_axis(cost_tail, safe_first.T, axis=1).T
+        )
+        initiative_npv[start : start + rows] = np.where(adopted_any, benefit_npv, 0.0) - capex_paid * discount[safe_first]
+        adoption_index[start : start + rows] = np.where(adopted_any, first, -1)
+
+        newly_reduced = np.bincount(
+            path_ids * (n_years + 1) + first.ravel(),
+            weights=np.broadcast_to(reduction, first.shape).ravel(),
+            minlength=rows * (n_years + 1),
+        ).reshape(rows, n_years + 1)
+        block_reduction = np.cumsum(newly_reduced[:, :n_years], axis=1)
+        reduction_by_year[start : start + rows] = block_reduction
+
+        path_flows = np.zeros((rows, n_years + 1))
+        path_flows[:, 1:] = block * block_reduction - np.einsum("kiy,iy->ky", active, variable_cost)
+        path_flows -= np.bincount(
+            path_ids * (n_years + 1) + safe_first.ravel(),
+            weights=capex_paid.ravel(),
+            minlength=rows * (n_years + 1),
+        ).reshape(rows, n_years + 1)
+        cash_flows[start : start + rows] = path_flows
+
+    baseline_total = baseline.total()
+    adoption_year = np.where(adoption_index >= 0, adoption_index + 1, 0)
+
+    return {
+        "years": years,
+        "prices": prices,
+        "adoption_year": adoption_year,
+        "initiative_npv": initiative_npv,
+        "reduction_tonnes": reduction_by_year,
+        "emissions_tonnes": np.maximum(baseline_total - reduction_by_year, 0.0),
+        "cash_flows": cash_flows,
+        "portfolio_npv": initiative_npv.sum(axis=1),
+        "initiatives": work.assign(cost_decline_rate=decline, reduction_tonnes=reduction),
+    }
+
+
+@arrow_inputs
+@memoize
+def adoption_timeline(
+    initiatives: pd.DataFrame,
+    baseline_detailed: pd.DataFrame | EmissionsCube,
+    price_path: pd.Series | Iterable[float],
+    *,
+    cost_decline_rates: float | Sequence[float] | None = None,
+    discount_rate: float = 0.08,
+) -> Dict[str, pd.DataFrame | float | list[float]]:
+    if initiatives is None or initiatives.empty:
+        raise ValueError("Abatement initiatives data is empty.")
+
+    paths = adoption_timeline_paths(
+        initiatives,
+        baseline_detailed,
+        price_path if isinstance(price_path, pd.Series) else np.asarray(list(price_path), dtype=float),
+        cost_decline_rates=cost_decline_rates,
+        discount_rate=discount_rate,
+    )
+    years = paths["years"]
+    adoption_year = paths["adoption_year"][0]
+    work = paths["initiatives"]
+
+    initiative_table = pd.DataFrame(
+        {
+            "initiative_name": work["initiative_name"],
+            "target_scope": work["target_scope"],
+            "department": work["department"],
+            "cost_per_tonne": work["cost_per_tonne"],
+            "capex": work["capex"],
+            "cost_decline_rate": work["cost_decline_rate"],
+            "reduction_tonnes": work["reduction_tonnes"],
+            "adopted": adoption_year > 0,
+            "adoption_year": pd.Series(np.where(adoption_year > 0, years[np.maximum(adoption_year - 1, 0)], None)),
+            "npv": paths["initiative_npv"][0],
+        }
+    ).sort_values(["adopted", "adoption_year", "cost_per_tonne"], ascending=[False, True, True], na_position="last")
+
+    adoption_counts = np.bincount(adoption_year, minlength=len(years) + 1)[1:]
+    timeline = pd.DataFrame(
+        {
+            "year": years,
+            "carbon_price": paths["prices"][0],
+            "newly_adopted": adoption_counts,
+            "adopted_initiatives": np.cumsum(adoption_counts),
+            "reduction_tonnes": paths["reduction_tonnes"][0],
+            "emissions_tonnes": paths["emissions_tonnes"][0],
+            "cash_flow": paths["cash_flows"][0, 1:],
+        }
+    )
+
+    return {
+        "initiatives": initiative_table.reset_index(drop=True),
+        "timeline": timeline,
+        "cash_flows": paths["cash_flows"][0].tolist(),
+        "total_npv": float(paths["portfolio_npv"][0]),
+    }
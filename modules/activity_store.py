@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from modules import arrow_io, emissions_cube, emissions_engine, excel_parser, unit_conversion, utils
+from modules.arrow_io import _pyarrow, read_ipc, write_ipc
+from modules.dataset_registry import content_key
+from modules.emissions_engine import calculate_emissions, period_issues, summarize_emissions
+from modules.excel_parser import ParsedInput, parse_path, parse_uploaded_file
+
+STORE_VERSION = 1
+STORE_DIR_ENV = "CARBONPRICINGX_STORE_DIR"
+INPUT_FRAMES = tuple(item.name for item in fields(ParsedInput))
+MANIFEST = "manifest.json"
+_HASH_CHUNK = 1024 * 1024
+# Stored frames are outputs of these modules (parsing, validation, unit conversion, cube, Arrow layout).
+_ENGINE_MODULES = (arrow_io, emissions_cube, emissions_engine, excel_parser, unit_conversion, utils)
+
+
+@dataclass
+class StoredInput:
+    key: str
+    parsed: ParsedInput
+    baseline: Optional[Dict[str, Any]]
+    from_store: bool
+
+    @property
+    def activities(self) -> pd.DataFrame:
+        # The frame the baseline was computed on; CSV uploads only fill activities.
+        return self.parsed.departments if self.parsed.activities.empty else self.parsed.activities
+
+
+@lru_cache(maxsize=None)
+def _engine_digest() -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for module in _ENGINE_MODULES:
+        digest.update(Path(module.__file__).read_bytes())
+    return digest.hexdigest()
+
+
+def _source_name(source: Any) -> str:
+    return str(source) if isinstance(source, (str, Path)) else str(getattr(source, "name", ""))
+
+
+class ActivityStore:
+    # One directory per source content hash holding Arrow IPC files, so restarts
+    # memory-map validated inputs and the detailed emissions instead of re-parsing.
+    def __init__(self, root: str | Path):
+        _pyarrow()
+        self.root = Path(root)
+        self._lock = threading.Lock()
+
+    def _index_path(self) -> Path:
+        return self.root / "_index.json"
+
+    def _read_index(self) -> Dict[str, list]:
+        try:
+            return json.loads(self._index_path().read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self, index: Dict[str, list]) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self._index_path().with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(index, sort_keys=True), encoding="utf-8")
+        tmp.replace(self._index_path())
+
+    def source_digest(self, source: Any) -> str:
+        # The parser is picked by suffix, so it is part of the content key.
+        digest = hashlib.blake2b(Path(_source_name(source)).suffix.lower().encode("utf-8"), digest_size=16)
+        if not isinstance(source, (str, Path)):
+            digest.update(bytes(source.getvalue()))
+            return digest.hexdigest()
+
+        path = Path(source).resolve()
+        stat = path.stat()
+        # Unchanged files (same size and mtime) skip rehashing; a changed file drops the entry it pointed to.
+        with self._lock:
+            index = self._read_index()
+            known = index.get(str(path))
+            if known is not None and known[:2] == [stat.st_size, stat.st_mtime_ns]:
+                return known[2]
+            with path.open("rb") as handle:
+                for chunk in iter(lambda: handle.read(_HASH_CHUNK), b""):
+                    digest.update(chunk)
+            key = digest.hexdigest()
+            if known is not None and known[2] != key and all(other[2] != known[2] for name, other in index.items() if name != str(path)):
+                shutil.rmtree(self.root / known[2], ignore_errors=True)
+            index[str(path)] = [stat.st_size, stat.st_mtime_ns, key]
+            self._write_index(index)
+        return key
+
+    def _entry_key(self, digest: str, unit_conversions: Optional[pd.DataFrame]) -> str:
+        return digest if unit_conversions is None else f"{digest}-{content_key(unit_conversions)[:16]}"
+
+    def _manifest(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            manifest = json.loads((self.root / key / MANIFEST).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        # Entries from another layout version, pandas release or engine code (which includes the
+        # built-in unit conversions and factor units) are rebuilt rather than read.
+        if (
+            manifest.get("version") != STORE_VERSION
+            or manifest.get("pandas") != pd.__version__
+            or manifest.get("engine") != _engine_digest()
+        ):
+            return None
+        return manifest
+
+    def get(self, key: str) -> Optional[StoredInput]:
+        manifest = self._manifest(key)
+        if manifest is None:
+            return None
+        entry = self.root / key
+
+        frames = {name: read_ipc(entry / f"{manifest['frames'].get(name, name)}.arrow") for name in INPUT_FRAMES}
+        baseline = None
+        if manifest["baseline"]:
+            with (entry / "cube.pkl").open("rb") as handle:
+                cube = pickle.load(handle)
+            detailed = read_ipc(entry / "detailed.arrow")
+            baseline = summarize_emissions(detailed, cube, read_ipc(entry / "unit_issues.arrow"), period_issues(detailed))
+        os.utime(entry / MANIFEST)
+        return StoredInput(key, ParsedInput(**frames), baseline, True)
+
+    def put(self, key: str, parsed: ParsedInput, baseline: Optional[Dict[str, Any]], source_name: str = "") -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / f".{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir()
+        try:
+            # Frames with identical content (CSV activities doubling as departments) are written once.
+            written: Dict[str, str] = {}
+            aliases: Dict[str, str] = {}
+            for name in INPUT_FRAMES:
+                frame = getattr(parsed, name)
+                frame_key = content_key(frame)
+                if frame_key in written:
+                    aliases[name] = written[frame_key]
+                    continue
+                write_ipc(frame, tmp / f"{name}.arrow")
+                written[frame_key] = name
+            if baseline is not None:
+                write_ipc(baseline["detailed"], tmp / "detailed.arrow")
+                write_ipc(baseline["unit_issues"], tmp / "unit_issues.arrow")
+                with (tmp / "cube.pkl").open("wb") as handle:
+                    pickle.dump(baseline["cube"], handle, protocol=pickle.HIGHEST_PROTOCOL)
+            manifest = {
+                "version": STORE_VERSION,
+                "pandas": pd.__version__,
+                "engine": _engine_digest(),
+                "source": source_name,
+                "rows": {name: len(getattr(parsed, name)) for name in INPUT_FRAMES},
+                "frames": aliases,
+                "baseline": baseline is not None,
+                "created": time.time(),
+            }
+            (tmp / MANIFEST).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+            # Entries are published by rename, so readers never map a half-written file.
+            # Stale versions are removed first; if another process won the race its entry is kept.
+            final = self.root / key
+            if final.exists() and self._manifest(key) is None:
+                shutil.rmtree(final, ignore_errors=True)
+            try:
+                os.replace(tmp, final)
+            except OSError:
+                if not final.exists():
+                    raise
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def load_or_build(self, source: Any, unit_conversions: Optional[pd.DataFrame] = None) -> StoredInput:
+        if source is None:
+            raise ValueError("No file uploaded.")
+        key = self._entry_key(self.source_digest(source), unit_conversions)
+        stored = self.get(key)
+        if stored is not None:
+            return stored
+
+        parsed = parse_path(source) if isinstance(source, (str, Path)) else parse_uploaded_file(source)
+        stored = StoredInput(key, parsed, None, False)
+        if not stored.activities.empty:
+            stored.baseline = calculate_emissions(stored.activities, unit_conversions)
+        self.put(key, parsed, stored.baseline, Path(_source_name(source)).name)
+        return stored
+
+    def entries(self) -> pd.DataFrame:
+        rows = []
+        for manifest_path in self.root.glob(f"*/{MANIFEST}"):
+            try:
+                manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            rows.append(
+                {
+                    "key": manifest_path.parent.name,
+                    "source": manifest.get("source", ""),
+                    "version": manifest.get("version"),
+                    "rows": sum(manifest.get("rows", {}).values()),
+                    "bytes": sum(path.stat().st_size for path in manifest_path.parent.iterdir()),
+                    "last_used": manifest_path.stat().st_mtime,
+                }
+            )
+        columns = ["key", "source", "version", "rows", "bytes", "last_used"]
+        return pd.DataFrame(rows, columns=columns).sort_values("last_used", ascending=False, ignore_index=True)
+
+    def prune(self, keep: int = 8) -> List[str]:
+        # Removing a directory is safe for processes that still map its files; the pages stay until unmapped.
+        removed = self.entries()["key"].iloc[keep:].tolist()
+        for key in removed:
+            shutil.rmtree(self.root / key, ignore_errors=True)
+        return removed
+
+
+def default_store() -> Optional[ActivityStore]:
+    root = os.environ.get(STORE_DIR_ENV)
+    return ActivityStore(root) if root else None
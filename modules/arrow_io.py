@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import functools
+import io
+import zipfile
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+
+HAS_PYARROW = find_spec("pyarrow") is not None
+ARROW_SUFFIXES = {".arrow", ".feather", ".ipc"}
+ARROW_COMPRESSIONS = ("uncompressed", "lz4", "zstd")
+
+
+def _pyarrow():
+    if not HAS_PYARROW:
+        raise ImportError('Arrow interchange needs pyarrow. Install the arrow extra: pip install -e ".[arrow]"')
+    import pyarrow
+
+    return pyarrow
+
+
+def is_arrow(data: Any) -> bool:
+    if not HAS_PYARROW:
+        return False
+    pa = _pyarrow()
+    return isinstance(data, (pa.Table, pa.RecordBatch, pa.RecordBatchReader))
+
+
+def enable_arrow_strings() -> None:
+    # Default from pandas 3; on pandas 2.1+ text columns become Arrow-backed too,
+    # so they cross the Arrow boundary without conversion.
+    major, minor = (int(part) for part in pd.__version__.split(".")[:2])
+    if HAS_PYARROW and major == 2 and minor >= 1:
+        pd.set_option("future.infer_string", True)
+
+
+def as_table(data: Any):
+    pa = _pyarrow()
+    if isinstance(data, pa.RecordBatchReader):
+        return data.read_all()
+    if isinstance(data, pa.RecordBatch):
+        return pa.Table.from_batches([data])
+    if isinstance(data, pa.Table):
+        return data
+    return to_arrow(data)
+
+
+def as_frame(data: Any) -> pd.DataFrame:
+    if isinstance(data, pd.DataFrame):
+        return data
+    if not is_arrow(data):
+        raise ValueError(f"Expected a DataFrame or Arrow table, got {type(data).__name__}.")
+    # Text maps to pandas' Arrow-backed string dtype (see enable_arrow_strings);
+    # one block per column lets primitive columns without nulls be wrapped rather than copied.
+    return as_table(data).to_pandas(split_blocks=True)
+
+
+def arrow_inputs(func: Callable[..., Any]) -> Callable[..., Any]:
+    # Lets an engine take Arrow tables, record batches or readers wherever it takes a DataFrame.
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if HAS_PYARROW:
+            args = tuple(as_frame(value) if is_arrow(value) else value for value in args)
+            kwargs = {name: as_frame(value) if is_arrow(value) else value for name, value in kwargs.items()}
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+def to_arrow(frame: pd.DataFrame):
+    pa = _pyarrow()
+    # Object columns holding lists (MACC cash flows) or mixed values are passed
+    # through pyarrow's inference; anything it cannot type is stored as text.
+    try:
+        return pa.Table.from_pandas(frame, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        fixed = frame.copy(deep=False)
+        for column in fixed.columns[fixed.dtypes == object]:
+            try:
+                pa.array(fixed[column], from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                fixed[column] = fixed[column].map(lambda value: None if value is None else str(value))
+        return pa.Table.from_pandas(fixed, preserve_index=False)
+
+
+def result_to_arrow(result: Dict[str, Any]) -> Dict[str, Any]:
+    # Engine results mix frames and scalars; frames become tables and the
+    # scalars ride along as schema metadata on each of them.
+    scalars = {name: value for name, value in result.items() if isinstance(value, (int, float, str, bool)) or value is None}
+    metadata = {str(name): repr(value) for name, value in scalars.items()}
+    tables = {name: to_arrow(value) for name, value in result.items() if isinstance(value, pd.DataFrame)}
+    return {name: table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata}) for name, table in tables.items()}
+
+
+def write_ipc(data: Any, destination: str | Path | io.IOBase, compression: str = "uncompressed") -> None:
+    # Arrow IPC file format (Feather v2). Uncompressed files are written as one
+    # record batch so memory-mapped readers get contiguous columns with no copy.
+    if compression not in ARROW_COMPRESSIONS:
+        raise ValueError(f"Unsupported Arrow compression '{compression}'. Use one of: {', '.join(ARROW_COMPRESSIONS)}")
+    from pyarrow import feather
+
+    table = as_table(data)
+    chunksize = max(table.num_rows, 1) if compression == "uncompressed" else None
+    feather.write_feather(table, destination, compression=compression, chunksize=chunksize)
+
+
+def read_ipc(source: str | Path, to_pandas: bool = True, memory_map: bool = True):
+    pa = _pyarrow()
+    # Memory-mapped reads share the file's pages instead of copying them into the
+    # process; the mapping lives as long as the returned columns reference it, and
+    # those columns are read-only (engines assign new columns rather than writing).
+    if memory_map:
+        table = pa.ipc.open_file(pa.memory_map(str(source))).read_all()
+    else:
+        with pa.OSFile(str(source)) as handle:
+            table = pa.ipc.open_file(handle).read_all()
+    return as_frame(table) if to_pandas else table
+
+
+def build_arrow_report(sheets: Dict[str, Any], compression: Optional[str] = "zstd") -> bytes:
+    # One Feather file per table in a zip; the members are already compressed.
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_STORED) as archive:
+        for name, data in sheets.items():
+            if not (isinstance(data, pd.DataFrame) or is_arrow(data)):
+                continue
+            buffer = io.BytesIO()
+            write_ipc(data, buffer, compression=compression or "uncompressed")
+            archive.writestr(f"{name}.arrow", buffer.getvalue())
+    return output.getvalue()
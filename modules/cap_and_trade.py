@@ -1,12 +1,18 @@
 from __future__ import annotations
 
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, Sequence
 
-from modules.utils import clamp
+import numpy as np
+import pandas as pd
 
+from modules.arrow_io import arrow_inputs
+from modules.memo import memoize
+from modules.utils import clamp, coerce_numeric, ensure_required_columns, normalize_columns
 
-@dataclass
+
+@dataclass(frozen=True)
 class CapTradeConfig:
     annual_cap: float
     free_allocations: float
@@ -17,6 +23,28 @@ class CapTradeConfig:
     bank_balance: float = 0.0
 
 
+@dataclass(frozen=True)
+class MarketStabilityReserve:
+    upper_threshold: float
+    lower_threshold: float
+    intake_rate: float = 0.24
+    release_volume: float = 0.0
+    initial_reserve: float = 0.0
+
+
+@dataclass(frozen=True)
+class StochasticETSConfig:
+    n_paths: int = 10_000
+    emissions_drift: float = 0.0
+    emissions_volatility: float = 0.05
+    supply_volatility: float = 0.02
+    # Allowances banked across the whole market at the start; CapTradeConfig.bank_balance is the firm's own bank.
+    initial_market_bank: float = 0.0
+    seed: int | None = None
+    chunk_size: int = 25_000
+    max_workers: int | None = None
+
+
 def clearing_price(demand: float, supply: float, base_price: float, scarcity_factor: float) -> float:
     if supply <= 0:
         return base_price * scarcity_factor * 10.0
@@ -70,3 +98,118 @@ def simulate_cap_and_trade(
         "compliance_demand": compliance_demand,
         "applied_offsets": applied_offsets,
     }
+
+
+def _clearing_price_array(demand: np.ndarray, supply: np.ndarray, base_price: float, scarcity_factor: float) -> np.ndarray:
+    safe_supply = np.where(supply > 0, supply, 1.0)
+    price = base_price * (demand / safe_supply) * max(scarcity_factor, 0.0)
+    return np.where(supply > 0, price, base_price * scarcity_factor * 10.0)
+
+
+def _simulate_ets_chunk(
+    n_paths: int,
+    seed_sequence: np.random.SeedSequence,
+    emissions_tonnes: float,
+    caps: np.ndarray,
+    allocations: np.ndarray,
+    config: CapTradeConfig,
+    stochastic: StochasticETSConfig,
+    reserve: MarketStabilityReserve | None,
+) -> Dict[str, np.ndarray]:
+    rng = np.random.default_rng(seed_sequence)
+    n_years = len(caps)
+    emissions_shocks = rng.standard_normal((n_paths, n_years))
+    supply_shocks = rng.standard_normal((n_paths, n_years))
+
+    sigma_e = max(stochastic.emissions_volatility, 0.0)
+    sigma_s = max(stochastic.supply_volatility, 0.0)
+    emissions = emissions_tonnes * np.exp(
+        np.cumsum(stochastic.emissions_drift - 0.5 * sigma_e**2 + sigma_e * emissions_shocks, axis=1)
+    )
+    supply = caps[None, :] * np.exp(-0.5 * sigma_s**2 + sigma_s * supply_shocks)
+
+    out = {name: np.zeros((n_paths, n_years)) for name in ("price", "supply", "market_bank", "reserve", "net_compliance_cost")}
+    out["emissions"] = emissions
+    market_bank = np.full(n_paths, max(stochastic.initial_market_bank, 0.0))
+    firm_bank = np.full(n_paths, max(config.bank_balance, 0.0))
+    reserve_level = np.full(n_paths, reserve.initial_reserve if reserve else 0.0)
+
+    # Years are sequential (bank and reserve carry over); every step is vectorized across paths.
+    for year in range(n_years):
+        year_supply = supply[:, year]
+        if reserve is not None:
+            withdraw = np.where(market_bank > reserve.upper_threshold, reserve.intake_rate * market_bank, 0.0)
+            withdraw = np.minimum(withdraw, year_supply)
+            release = np.where(market_bank < reserve.lower_threshold, np.minimum(reserve.release_volume, reserve_level), 0.0)
+            year_supply = year_supply - withdraw + release
+            reserve_level = reserve_level + withdraw - release
+
+        demand = emissions[:, year]
+        price = _clearing_price_array(demand, year_supply + market_bank, config.base_price, config.scarcity_factor)
+        market_bank = np.maximum(market_bank + year_supply - demand, 0.0)
+
+        owned = allocations[year] + firm_bank
+        max_trade_volume = max(config.trading_limit_pct, 0.0) * max(caps[year], 0.0)
+        to_buy = np.minimum(np.maximum(demand - owned, 0.0), max_trade_volume)
+        to_sell = np.minimum(np.maximum(owned - demand, 0.0), max_trade_volume)
+        firm_bank = np.maximum(owned + to_buy - to_sell - demand, 0.0)
+
+        out["price"][:, year] = price
+        out["supply"][:, year] = year_supply
+        out["market_bank"][:, year] = market_bank
+        out["reserve"][:, year] = reserve_level
+        out["net_compliance_cost"][:, year] = (to_buy - to_sell) * price
+    return out
+
+
+# Unseeded runs are meant to differ between calls, so only seeded ones are cached.
+@arrow_inputs
+@memoize(when=lambda arguments: arguments["stochastic"] is not None and arguments["stochastic"].seed is not None)
+def simulate_ets_paths(
+    emissions_tonnes: float,
+    allowances: pd.DataFrame,
+    config: CapTradeConfig,
+    stochastic: StochasticETSConfig | None = None,
+    reserve: MarketStabilityReserve | None = None,
+    *,
+    quantiles: Sequence[float] = (0.05, 0.5, 0.95),
+) -> Dict[str, pd.DataFrame | np.ndarray | Dict[str, float]]:
+    if allowances is None or allowances.empty:
+        raise ValueError("Allowance schedule is empty.")
+    stochastic = stochastic or StochasticETSConfig()
+
+    schedule = normalize_columns(allowances.copy())
+    ensure_required_columns(schedule, {"year", "allocated_allowances", "initial_cap"}, "Cap-and-trade allowances")
+    schedule = coerce_numeric(schedule, ["allocated_allowances", "initial_cap"]).sort_values("year")
+    caps = schedule["initial_cap"].fillna(0.0).clip(lower=0.0).to_numpy(dtype=float)
+    allocations = schedule["allocated_allowances"].fillna(0.0).clip(lower=0.0).to_numpy(dtype=float)
+
+    # One child seed per chunk keeps results identical whether chunks run in-process or in workers.
+    n_paths = max(int(stochastic.n_paths), 1)
+    chunk_size = max(int(stochastic.chunk_size), 1)
+    sizes = [min(chunk_size, n_paths - start) for start in range(0, n_paths, chunk_size)]
+    seeds = np.random.SeedSequence(stochastic.seed).spawn(len(sizes))
+    args = [(size, seed, float(emissions_tonnes), caps, allocations, config, stochastic, reserve) for size, seed in zip(sizes, seeds)]
+
+    if stochastic.max_workers and stochastic.max_workers > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=stochastic.max_workers) as pool:
+            chunks = list(pool.map(_simulate_ets_chunk, *zip(*args)))
+    else:
+        chunks = [_simulate_ets_chunk(*chunk_args) for chunk_args in args]
+    paths = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+
+    yearly = pd.DataFrame({"year": schedule["year"].to_numpy()})
+    for name in ("price", "emissions", "supply", "market_bank", "reserve", "net_compliance_cost"):
+        levels = np.quantile(paths[name], quantiles, axis=0)
+        for q, values in zip(quantiles, levels):
+            yearly[f"{name}_p{int(round(q * 100)):02d}"] = values
+
+    path_costs = paths["net_compliance_cost"].sum(axis=1)
+    cost_levels = np.quantile(path_costs, quantiles)
+    return {
+        "yearly": yearly,
+        "paths": paths,
+        "path_compliance_cost": path_costs,
+        "compliance_cost_quantiles": {f"p{int(round(q * 100)):02d}": float(v) for q, v in zip(quantiles, cost_levels)},
+        "mean_compliance_cost": float(path_costs.mean()),
+    }
@@ -1,14 +1,21 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Iterable
+from typing import Dict, Iterable
 
+import numpy as np
 import pandas as pd
 
-from modules.utils import clamp
+from modules.arrow_io import arrow_inputs
+from modules.emissions_cube import EmissionsCube, as_emissions_cube
+from modules.emissions_engine import normalize_scope
+from modules.memo import memoize
+from modules.utils import clamp, coerce_numeric, normalize_columns
 
+ELASTICITY_PARAMETERS = ("elasticity", "fuel_switching_factor", "energy_efficiency_factor")
 
-@dataclass
+
+@dataclass(frozen=True)
 class CarbonPricingConfig:
     elasticity: float = 0.0
     fuel_switching_factor: float = 0.0
@@ -24,31 +31,140 @@ def _adjustment_multiplier(price: float, config: CarbonPricingConfig) -> float:
     return clamp(multiplier, 0.0, 1.0)
 
 
+@memoize
 def run_price_scenarios(
     total_emissions_tonnes: float,
     prices: Iterable[float],
     config: CarbonPricingConfig,
 ) -> pd.DataFrame:
-    rows = []
-    for price in prices:
-        multiplier = _adjustment_multiplier(float(price), config)
-        adjusted_emissions = total_emissions_tonnes * multiplier
-        carbon_cost = adjusted_emissions * float(price)
-        reduction_pct = 0.0
-        if total_emissions_tonnes > 0:
-            reduction_pct = (1.0 - adjusted_emissions / total_emissions_tonnes) * 100.0
-
-        rows.append(
-            {
-                "carbon_price": float(price),
-                "adjusted_emissions": adjusted_emissions,
-                "carbon_cost": carbon_cost,
-                "reduction_pct": reduction_pct,
-                "multiplier": multiplier,
-            }
-        )
-
-    return pd.DataFrame(rows).sort_values("carbon_price").reset_index(drop=True)
+    # Same formula as _adjustment_multiplier, evaluated for every price at once.
+    price = np.sort(np.asarray(list(prices), dtype=float))
+    extra_reduction = config.fuel_switching_factor + config.energy_efficiency_factor
+    multiplier = np.clip((1.0 - config.elasticity * (price / 100.0)) * (1.0 - extra_reduction), 0.0, 1.0)
+    adjusted_emissions = total_emissions_tonnes * multiplier
+    reduction_pct = (1.0 - multiplier) * 100.0 if total_emissions_tonnes > 0 else np.zeros(len(price))
+    return pd.DataFrame(
+        {
+            "carbon_price": price,
+            "adjusted_emissions": adjusted_emissions,
+            "carbon_cost": adjusted_emissions * price,
+            "reduction_pct": reduction_pct,
+            "multiplier": multiplier,
+        }
+    )
+
+
+def _wildcard_key(series: pd.Series) -> pd.Series:
+    keys = series.astype(str).str.strip().str.lower()
+    return keys.where(~series.isna() & ~keys.isin(["", "all", "nan", "none"]), "all")
+
+
+def resolve_segment_elasticities(
+    segments: pd.DataFrame,
+    config: CarbonPricingConfig,
+    elasticity_table: pd.DataFrame | None = None,
+) -> pd.DataFrame:
+    # Most specific rule wins: department + scope, then department, then scope,
+    # then the global config.
+    resolved = segments.copy()
+    for param in ELASTICITY_PARAMETERS:
+        resolved[param] = float(getattr(config, param))
+    resolved["elasticity_rule"] = "default"
+    if elasticity_table is None or elasticity_table.empty:
+        return resolved
+
+    table = normalize_columns(elasticity_table.copy())
+    if "scope" not in table.columns and "department" not in table.columns:
+        raise ValueError("Elasticity table must be keyed by scope and/or department.")
+    for param in ELASTICITY_PARAMETERS:
+        if param not in table.columns:
+            table[param] = float(getattr(config, param))
+    table = coerce_numeric(table, ELASTICITY_PARAMETERS)
+    for param in ELASTICITY_PARAMETERS:
+        table[param] = table[param].fillna(float(getattr(config, param)))
+
+    table["scope_key"] = _wildcard_key(table["scope"]) if "scope" in table.columns else "all"
+    table["scope_key"] = table["scope_key"].where(table["scope_key"] == "all", table["scope_key"].map(normalize_scope))
+    table["department_key"] = _wildcard_key(table["department"]) if "department" in table.columns else "all"
+
+    keys = pd.DataFrame(
+        {
+            "scope_key": resolved["scope"].map(normalize_scope),
+            "department_key": resolved["department"].astype(str).str.strip().str.lower(),
+        },
+        index=resolved.index,
+    )
+    rules = [
+        ("department+scope", ["department_key", "scope_key"], (table["department_key"] != "all") & (table["scope_key"] != "all")),
+        ("department", ["department_key"], (table["department_key"] != "all") & (table["scope_key"] == "all")),
+        ("scope", ["scope_key"], (table["department_key"] == "all") & (table["scope_key"] != "all")),
+    ]
+    for rule_name, on, mask in reversed(rules):
+        subset = table.loc[mask, on + list(ELASTICITY_PARAMETERS)].drop_duplicates(on, keep="last")
+        if subset.empty:
+            continue
+        matched = keys[on].merge(subset, on=on, how="left").set_index(keys.index)
+        hit = matched["elasticity"].notna()
+        for param in ELASTICITY_PARAMETERS:
+            resolved.loc[hit, param] = matched.loc[hit, param]
+        resolved.loc[hit, "elasticity_rule"] = rule_name
+    return resolved
+
+
+@arrow_inputs
+@memoize
+def run_segment_price_scenarios(
+    detailed: pd.DataFrame | EmissionsCube,
+    prices: Iterable[float],
+    config: CarbonPricingConfig,
+    elasticity_table: pd.DataFrame | None = None,
+) -> Dict[str, pd.DataFrame | np.ndarray]:
+    segments = as_emissions_cube(detailed).rollup(["department", "scope"])
+    segments = resolve_segment_elasticities(segments, config, elasticity_table)
+
+    price_grid = np.sort(np.asarray(list(prices), dtype=float))
+    baseline = segments["emissions_tonnes"].to_numpy(dtype=float)
+    elasticity = segments["elasticity"].to_numpy(dtype=float)
+    extra_reduction = (segments["fuel_switching_factor"] + segments["energy_efficiency_factor"]).to_numpy(dtype=float)
+
+    # Same response as _adjustment_multiplier, evaluated for segments x prices at once.
+    multiplier = np.clip(
+        (1.0 - elasticity[:, None] * (price_grid[None, :] / 100.0)) * (1.0 - extra_reduction)[:, None],
+        0.0,
+        1.0,
+    )
+    adjusted = baseline[:, None] * multiplier
+    carbon_cost = adjusted * price_grid[None, :]
+
+    total_baseline = float(baseline.sum())
+    total_adjusted = adjusted.sum(axis=0)
+    totals = pd.DataFrame(
+        {
+            "carbon_price": price_grid,
+            "adjusted_emissions": total_adjusted,
+            "carbon_cost": carbon_cost.sum(axis=0),
+            "reduction_pct": (1.0 - total_adjusted / total_baseline) * 100.0 if total_baseline > 0 else 0.0,
+            "multiplier": total_adjusted / total_baseline if total_baseline > 0 else 1.0,
+        }
+    )
+
+    return {
+        "segments": segments,
+        "prices": price_grid,
+        "adjusted_emissions": adjusted,
+        "carbon_cost": carbon_cost,
+        "totals": totals,
+    }
+
+
+def segment_detail_at_price(result: Dict[str, pd.DataFrame | np.ndarray], price: float) -> pd.DataFrame:
+    prices = result["prices"]
+    column = int(np.abs(prices - float(price)).argmin())
+    detail = result["segments"].copy()
+    detail["carbon_price"] = prices[column]
+    detail["adjusted_emissions"] = result["adjusted_emissions"][:, column]
+    detail["carbon_cost"] = result["carbon_cost"][:, column]
+    return detail.sort_values("carbon_cost", ascending=False).reset_index(drop=True)
 
 
 def recommend_carbon_price(macc_df: pd.DataFrame) -> float:
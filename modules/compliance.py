@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+
+from modules.abatement import initiative_baseline_emissions, prepare_initiatives, sequential_reductions
+from modules.arrow_io import arrow_inputs
+from modules.cap_and_trade import CapTradeConfig, clearing_price
+from modules.emissions_cube import EmissionsCube
+from modules.memo import memoize
+from modules.offset_engine import procure_offsets
+from modules.target_pricing import break_even_prices
+
+COMPLIANCE_SOURCES = ("abatement", "offsets", "allowances")
+_CURVE_SOURCES = ("abatement", "offsets")
+
+
+def _abatement_blocks(
+    initiatives: pd.DataFrame,
+    baseline_detailed: pd.DataFrame | EmissionsCube,
+    *,
+    discount_rate: float,
+    analysis_years: int,
+    sequential: bool,
+) -> pd.DataFrame:
+    work = prepare_initiatives(initiatives).reset_index(drop=True)
+    adopt_all = work["cost_per_tonne"].notna().to_numpy()
+    if sequential:
+        volume, _ = sequential_reductions(work, baseline_detailed, adopt_all)
+    else:
+        pct = work["max_reduction_pct"].fillna(0.0).clip(lower=0.0).to_numpy() / 100.0
+        volume = np.where(adopt_all, initiative_baseline_emissions(work, baseline_detailed) * pct, 0.0)
+    # Capex is levelized over the analysis horizon, which is exactly the
+    # initiative's break-even carbon price.
+    unit_cost = break_even_prices(
+        work["cost_per_tonne"].to_numpy(),
+        work["capex"].fillna(0.0).to_numpy(),
+        volume,
+        discount_rate=discount_rate,
+        analysis_years=analysis_years,
+    )
+    return pd.DataFrame(
+        {"source": "abatement", "name": work["initiative_name"].astype(str), "volume": volume, "unit_cost": unit_cost}
+    )
+
+
+@arrow_inputs
+@memoize
+def build_compliance_curve(
+    total_emissions: float,
+    *,
+    initiatives: pd.DataFrame | None = None,
+    baseline_detailed: pd.DataFrame | EmissionsCube | None = None,
+    offset_lots: pd.DataFrame | None = None,
+    offset_limit_pct: float = 0.0,
+    discount_rate: float = 0.08,
+    analysis_years: int = 10,
+    sequential: bool = False,
+) -> pd.DataFrame:
+    blocks = []
+    if initiatives is not None and not initiatives.empty and baseline_detailed is not None:
+        blocks.append(
+            _abatement_blocks(
+                initiatives,
+                baseline_detailed,
+                discount_rate=discount_rate,
+                analysis_years=analysis_years,
+                sequential=sequential,
+            )
+        )
+    if offset_lots is not None and not offset_lots.empty and offset_limit_pct > 0:
+        schedule = procure_offsets(total_emissions, offset_lots, offset_limit_pct)["schedule"]
+        blocks.append(
+            pd.DataFrame(
+                {
+                    "source": "offsets",
+                    "name": schedule["project"].astype(str),
+                    "volume": schedule["procured_adjusted_tonnes"],
+                    "unit_cost": schedule["cost_per_adjusted_tonne"],
+                }
+            )
+        )
+
+    if not blocks:
+        return pd.DataFrame(columns=["source", "name", "volume", "unit_cost", "cumulative_volume", "cumulative_cost"])
+
+    curve = pd.concat(blocks, ignore_index=True)
+    curve = curve[(curve["volume"] > 0) & np.isfinite(curve["unit_cost"])]
+    curve = curve.sort_values("unit_cost", kind="stable").reset_index(drop=True)
+    curve["cumulative_volume"] = curve["volume"].cumsum()
+    curve["cumulative_cost"] = (curve["volume"] * curve["unit_cost"]).cumsum()
+    return curve
+
+
+def solve_compliance_batch(
+    curve: pd.DataFrame,
+    deficits: Iterable[float] | np.ndarray,
+    allowance_prices: Iterable[float] | np.ndarray,
+    allowance_volumes: Iterable[float] | np.ndarray,
+) -> Dict[str, np.ndarray]:
+    deficit = np.maximum(np.asarray(deficits, dtype=float), 0.0)
+    price, allowance_cap = np.broadcast_arrays(
+        np.asarray(allowance_prices, dtype=float),
+        np.maximum(np.asarray(allowance_volumes, dtype=float), 0.0),
+    )
+    deficit, price, allowance_cap = np.broadcast_arrays(deficit, price, allowance_cap)
+
+    unit_cost = curve["unit_cost"].to_numpy(dtype=float)
+    volume_knots = np.concatenate([[0.0], curve["cumulative_volume"].to_numpy(dtype=float)])
+    cost_knots = np.concatenate([[0.0], curve["cumulative_cost"].to_numpy(dtype=float)])
+    curve_capacity = volume_knots[-1]
+
+    # The least-cost plan always uses a prefix of the sorted curve: blocks cheaper
+    # than the allowance price, then allowances up to the trading limit, then the
+    # remaining blocks. Every quantity is a piecewise-linear lookup on prefix sums.
+    below_price = volume_knots[np.searchsorted(unit_cost, price, side="right")]
+    first_leg = np.minimum(deficit, below_price)
+    allowances_used = np.minimum(np.maximum(deficit - below_price, 0.0), allowance_cap)
+    second_leg = np.minimum(np.maximum(deficit - below_price - allowance_cap, 0.0), curve_capacity - below_price)
+    curve_used = first_leg + second_leg
+
+    curve_cost = np.interp(curve_used, volume_knots, cost_knots)
+    block = np.clip(np.searchsorted(volume_knots[1:], curve_used, side="left"), 0, max(len(unit_cost) - 1, 0))
+    curve_marginal = np.where(curve_used > 0, unit_cost[block] if len(unit_cost) else 0.0, 0.0)
+
+    result = {
+        "total_cost": curve_cost + allowances_used * price,
+        "marginal_price": np.maximum(curve_marginal, np.where(allowances_used > 0, price, 0.0)),
+        "allowances": allowances_used,
+        "allowance_cost": allowances_used * price,
+        "unmet": np.maximum(deficit - curve_used - allowances_used, 0.0),
+    }
+    sources = curve["source"].to_numpy()
+    volumes = curve["volume"].to_numpy(dtype=float)
+    for source in _CURVE_SOURCES:
+        mask = sources == source
+        source_volume = np.concatenate([[0.0], np.cumsum(np.where(mask, volumes, 0.0))])
+        source_cost = np.concatenate([[0.0], np.cumsum(np.where(mask, volumes * unit_cost, 0.0))])
+        result[source] = np.interp(curve_used, volume_knots, source_volume)
+        result[f"{source}_cost"] = np.interp(curve_used, volume_knots, source_cost)
+    return result
+
+
+def solve_compliance(
+    curve: pd.DataFrame,
+    emissions_tonnes: float,
+    config: CapTradeConfig,
+) -> Dict[str, pd.DataFrame | float]:
+    owned_allowances = max(config.free_allocations, 0.0) + max(config.bank_balance, 0.0)
+    deficit = max(float(emissions_tonnes) - owned_allowances, 0.0)
+    allowance_price = clearing_price(
+        demand=float(emissions_tonnes),
+        supply=max(config.annual_cap, 1e-9),
+        base_price=config.base_price,
+        scarcity_factor=config.scarcity_factor,
+    )
+    allowance_volume = max(config.trading_limit_pct, 0.0) * max(config.annual_cap, 0.0)
+
+    batch = solve_compliance_batch(curve, [deficit], [allowance_price], [allowance_volume])
+    solved = {key: float(value[0]) for key, value in batch.items()}
+    mix = pd.DataFrame(
+        {
+            "source": list(COMPLIANCE_SOURCES),
+            "volume": [solved["abatement"], solved["offsets"], solved["allowances"]],
+            "cost": [solved["abatement_cost"], solved["offsets_cost"], solved["allowance_cost"]],
+        }
+    )
+
+    return {
+        "mix": mix,
+        "compliance_deficit": deficit,
+        "allowance_price": allowance_price,
+        "total_compliance_cost": solved["total_cost"],
+        "marginal_compliance_price": solved["marginal_price"],
+        "unmet_after_plan": solved["unmet"],
+    }
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field, fields, is_dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+REGISTRY_STATS_COLUMNS = ["key", "rows", "refcount", "idle", "frame_bytes", "derived_bytes"]
+
+
+def hash_values(values: pd.Series | pd.Index) -> bytes:
+    if isinstance(values.dtype, pd.StringDtype):
+        # Same digest as hash_pandas_object, but each distinct string is hashed once
+        # instead of first materializing one Python object per row.
+        codes, uniques = pd.factorize(values)
+        hashed = pd.util.hash_array(np.asarray(uniques, dtype=object), categorize=False)
+        result = hashed.take(codes) if len(hashed) else np.zeros(len(codes), dtype=np.uint64)
+        result[codes < 0] = np.iinfo(np.uint64).max
+        return result.tobytes()
+    try:
+        return pd.util.hash_pandas_object(values, index=False).to_numpy().tobytes()
+    except TypeError:
+        # Unhashable cells (lists, dicts) are hashed through their repr.
+        return pd.util.hash_pandas_object(pd.Series(values).map(repr), index=False).to_numpy().tobytes()
+
+
+def content_key(frame: pd.DataFrame) -> str:
+    # Hashed on every call: a frame's owner can still edit it in place, so nothing
+    # about the object itself says whether its content changed.
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(([str(col) for col in frame.columns], [str(dtype) for dtype in frame.dtypes])).encode("utf-8"))
+    digest.update(hash_values(frame.index))
+    for position in range(frame.shape[1]):
+        digest.update(hash_values(frame.iloc[:, position]))
+    return digest.hexdigest()
+
+
+def estimate_nbytes(obj: Any) -> int:
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, dict):
+        return sum(estimate_nbytes(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(estimate_nbytes(value) for value in obj)
+    if is_dataclass(obj) and not isinstance(obj, type):
+        return sum(estimate_nbytes(getattr(obj, item.name)) for item in fields(obj))
+    return 0
+
+
+@dataclass
+class _Entry:
+    frame: pd.DataFrame
+    nbytes: int
+    refcount: int = 0
+    derived: Dict[str, Any] = field(default_factory=dict)
+    derived_nbytes: Dict[str, int] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def total_bytes(self) -> int:
+        return self.nbytes + sum(self.derived_nbytes.values())
+
+
+class DatasetLease:
+    # A session's handle on a shared dataset; the registry reference is released
+    # when the lease is released explicitly or garbage-collected with the session.
+    def __init__(self, registry: "DatasetRegistry", key: str, frame: pd.DataFrame):
+        self.key = key
+        self.frame = frame
+        self._registry = registry
+        self._finalizer = weakref.finalize(self, registry.release, key)
+
+    def derived(self, name: str, compute: Callable[[pd.DataFrame], Any]) -> Any:
+        return self._registry.derived(self.key, name, compute)
+
+    def release(self) -> None:
+        self._finalizer()
+
+
+class DatasetRegistry:
+    def __init__(self, max_idle_bytes: int = 256 * 1024 * 1024):
+        self.max_idle_bytes = max_idle_bytes
+        self._lock = threading.RLock()
+        self._entries: Dict[str, _Entry] = {}
+        # Unreferenced entries in least-recently-released order, kept for reuse up to max_idle_bytes.
+        self._idle: "OrderedDict[str, None]" = OrderedDict()
+        self._files: Dict[Tuple[str, int, int], str] = {}
+
+    def lease(self, frame: pd.DataFrame, key: Optional[str] = None) -> DatasetLease:
+        key = key or content_key(frame)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(frame, estimate_nbytes(frame))
+            entry.refcount += 1
+            self._idle.pop(key, None)
+            return DatasetLease(self, key, entry.frame)
+
+    def lease_file(
+        self,
+        path: str | Path,
+        loader: Callable[[Path], pd.DataFrame] = pd.read_csv,
+    ) -> DatasetLease:
+        path = Path(path)
+        stat = path.stat()
+        signature = (str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            key = self._files.get(signature)
+            if key in self._entries:
+                return self.lease(self._entries[key].frame, key)
+        lease = self.lease(loader(path))
+        with self._lock:
+            self._files[signature] = lease.key
+        return lease
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.refcount = max(entry.refcount - 1, 0)
+            if entry.refcount == 0:
+                self._idle[key] = None
+                self._evict()
+
+    def _evict(self) -> None:
+        idle_bytes = sum(self._entries[key].total_bytes for key in self._idle)
+        while self._idle and idle_bytes > self.max_idle_bytes:
+            key, _ = self._idle.popitem(last=False)
+            idle_bytes -= self._entries.pop(key).total_bytes
+        self._files = {signature: key for signature, key in self._files.items() if key in self._entries}
+
+    def derived(self, key: str, name: str, compute: Callable[[pd.DataFrame], Any]) -> Any:
+        with self._lock:
+            entry = self._entries[key]
+        # Per-entry lock: concurrent sessions wait for one computation instead of repeating it.
+        with entry.lock:
+            if name not in entry.derived:
+                result = compute(entry.frame)
+                entry.derived[name] = result
+                entry.derived_nbytes[name] = estimate_nbytes(result)
+            return entry.derived[name]
+
+    def stats(self) -> pd.DataFrame:
+        with self._lock:
+            rows = [
+                {
+                    "key": key,
+                    "rows": len(entry.frame),
+                    "refcount": entry.refcount,
+                    "idle": key in self._idle,
+                    "frame_bytes": entry.nbytes,
+                    "derived_bytes": sum(entry.derived_nbytes.values()),
+                }
+                for key, entry in self._entries.items()
+            ]
+        return pd.DataFrame(rows, columns=REGISTRY_STATS_COLUMNS)
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(entry.total_bytes for entry in self._entries.values())
+
+
+_DEFAULT_REGISTRY = DatasetRegistry()
+
+
+def default_registry() -> DatasetRegistry:
+    return _DEFAULT_REGISTRY
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from modules.utils import compress_keys, ensure_required_columns, factorize_labels
+
+CUBE_DIMENSIONS = ("department", "scope", "activity", "source", "unit", "period")
+CUBE_MEASURES = ("emissions_tonnes", "amount")
+
+FilterValue = Optional[Union[str, Iterable[str]]]
+
+
+def _measure_values(column: pd.Series) -> np.ndarray:
+    # Clean float columns are read without a copy.
+    if not pd.api.types.is_float_dtype(column.dtype):
+        column = pd.to_numeric(column, errors="coerce")
+    values = column.to_numpy(dtype=float, na_value=np.nan)
+    return np.nan_to_num(values) if np.isnan(values).any() else values
+
+
+@dataclass
+class EmissionsCube:
+    # One entry per distinct dimension combination; codes index into labels.
+    dimensions: Tuple[str, ...]
+    labels: Dict[str, np.ndarray]
+    codes: Dict[str, np.ndarray]
+    measures: Dict[str, np.ndarray]
+    _lookup: Dict[str, Dict[str, np.ndarray]] = field(default_factory=dict, repr=False, compare=False)
+    _aggregates: Dict[tuple, tuple] = field(default_factory=dict, repr=False, compare=False)
+    _segments: Optional[pd.DataFrame] = field(default=None, repr=False, compare=False)
+    # Cubes are shared across sessions and job threads; the memo fields above are filled under this lock.
+    _lock: Any = field(default_factory=threading.RLock, repr=False, compare=False)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_detailed(cls, detailed: pd.DataFrame) -> "EmissionsCube":
+        ensure_required_columns(detailed, {"department", "scope", "emissions_tonnes"}, "Emissions cube source")
+        dimensions = tuple(dim for dim in CUBE_DIMENSIONS if dim in detailed.columns)
+
+        # Cell keys are accumulated into one row-length integer array, one
+        # dimension at a time, so per-dimension code arrays never pile up.
+        labels: Dict[str, np.ndarray] = {}
+        flat = np.zeros(len(detailed), dtype=np.int64)
+        for dim in dimensions:
+            codes, uniques = factorize_labels(detailed[dim])
+            # Sorted labels keep roll-ups in the same order as a sorted groupby.
+            order = np.argsort(uniques.to_numpy(dtype=object), kind="stable")
+            rank = np.empty(len(order), dtype=np.int64)
+            rank[order] = np.arange(len(order))
+            labels[dim] = uniques.to_numpy(dtype=object)[order]
+            flat *= len(order)
+            flat += rank[codes]
+            del codes
+
+        # Collapse row-level data to distinct cells once; every later query works on cells only.
+        shape = tuple(len(labels[dim]) for dim in dimensions)
+        cell_index, cell_keys = compress_keys(flat, int(np.prod(shape, dtype=object)))
+        codes = dict(zip(dimensions, np.unravel_index(cell_keys, shape)))
+        measures = {
+            name: np.bincount(cell_index, weights=_measure_values(detailed[name]), minlength=len(cell_keys))
+            for name in CUBE_MEASURES
+            if name in detailed.columns
+        }
+        return cls(dimensions, labels, codes, measures)
+
+    @property
+    def n_cells(self) -> int:
+        return len(self.measures["emissions_tonnes"])
+
+    def _group(
+        self,
+        dims: Tuple[str, ...],
+        codes: Dict[str, np.ndarray],
+        measures: Dict[str, np.ndarray],
+    ) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+        if not dims:
+            return {}, {name: np.array([values.sum()]) for name, values in measures.items()}
+        shape = tuple(len(self.labels[dim]) for dim in dims)
+        flat = np.ravel_multi_index(tuple(codes[dim] for dim in dims), shape)
+        keys, group = np.unique(flat, return_inverse=True)
+        grouped_codes = dict(zip(dims, np.unravel_index(keys, shape)))
+        grouped = {name: np.bincount(group, weights=values, minlength=len(keys)) for name, values in measures.items()}
+        return grouped_codes, grouped
+
+    def _aggregate(self, dims: Tuple[str, ...]) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+        # Roll-ups are memoized per dimension subset; queries touching few
+        # dimensions then scan a handful of aggregate rows instead of every cell.
+        with self._lock:
+            if dims not in self._aggregates:
+                self._aggregates[dims] = self._group(dims, self.codes, self.measures)
+            return self._aggregates[dims]
+
+    def _label_codes(self, dim: str) -> Dict[str, np.ndarray]:
+        with self._lock:
+            if dim not in self._lookup:
+                lowered = pd.Series(self.labels[dim]).str.lower()
+                self._lookup[dim] = {key: np.asarray(idx, dtype=np.int64) for key, idx in lowered.groupby(lowered).groups.items()}
+            return self._lookup[dim]
+
+    def _selections(self, filters: Dict[str, FilterValue]) -> Dict[str, np.ndarray]:
+        selections = {}
+        for dim, value in filters.items():
+            if dim not in self.dimensions:
+                raise ValueError(f"Emissions cube has no dimension '{dim}'.")
+            if value is None:
+                continue
+            values = [value] if isinstance(value, str) else list(value)
+            keys = [str(item).strip().lower() for item in values]
+            # "all" (or a blank key) is a wildcard, matching the initiative targeting convention.
+            if any(key in ("", "all") for key in keys):
+                continue
+            lookup = self._label_codes(dim)
+            allowed = np.zeros(len(self.labels[dim]), dtype=bool)
+            for key in keys:
+                if key in lookup:
+                    allowed[lookup[key]] = True
+            selections[dim] = allowed
+        return selections
+
+    def _query(
+        self,
+        dims: Tuple[str, ...],
+        measures: Tuple[str, ...],
+        filters: Dict[str, FilterValue],
+    ) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+        selections = self._selections(filters)
+        key_dims = tuple(dim for dim in self.dimensions if dim in dims or dim in selections)
+        codes, values = self._aggregate(key_dims)
+        values = {name: values[name] for name in measures}
+        if not selections:
+            return codes, values
+        mask = np.ones(len(values[measures[0]]), dtype=bool)
+        for dim, allowed in selections.items():
+            mask &= allowed[codes[dim]]
+        codes = {dim: codes[dim][mask] for dim in dims}
+        values = {name: column[mask] for name, column in values.items()}
+        if set(dims) == set(key_dims):
+            return codes, values
+        return self._group(dims, codes, values)
+
+    def total(self, measure: str = "emissions_tonnes", **filters: FilterValue) -> float:
+        _, values = self._query((), (measure,), filters)
+        return float(values[measure].sum())
+
+    def slice(self, **filters: FilterValue) -> "EmissionsCube":
+        codes, measures = self._query(self.dimensions, tuple(self.measures), filters)
+        return EmissionsCube(self.dimensions, self.labels, codes, measures)
+
+    def rollup(
+        self,
+        dimensions: Sequence[str] = (),
+        measure: str | Sequence[str] = "emissions_tonnes",
+        **filters: FilterValue,
+    ) -> pd.DataFrame:
+        dims = (dimensions,) if isinstance(dimensions, str) else tuple(dimensions)
+        measures = (measure,) if isinstance(measure, str) else tuple(measure)
+        unknown = set(dims) - set(self.dimensions)
+        if unknown:
+            raise ValueError(f"Emissions cube has no dimension(s): {', '.join(sorted(unknown))}")
+
+        codes, values = self._query(tuple(dim for dim in self.dimensions if dim in dims), measures, filters)
+        out = pd.DataFrame({dim: self.labels[dim][codes[dim]] for dim in dims})
+        for name in measures:
+            out[name] = values[name]
+        return out
+
+    def segments(self) -> pd.DataFrame:
+        # Department x scope totals keyed the way initiative targeting matches them.
+        with self._lock:
+            if self._segments is None:
+                self._segments = segment_totals(self.rollup(["department", "scope"]))
+            return self._segments.copy()
+
+
+def segment_totals(by_segment: pd.DataFrame) -> pd.DataFrame:
+    segments = by_segment.copy(deep=False)
+    segments["department"] = segments["department"].astype(str).str.lower()
+    segments["scope"] = segments["scope"].astype(str).str.lower()
+    return segments.groupby(["department", "scope"], as_index=False, sort=True)["emissions_tonnes"].sum()
+
+
+def as_emissions_cube(data: pd.DataFrame | EmissionsCube) -> EmissionsCube:
+    # Storage backends (modules/sql_backend.py) answer the same queries in their
+    # database, so anything that is not a row-level frame is used as it is.
+    return EmissionsCube.from_detailed(data) if isinstance(data, pd.DataFrame) else data
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
-from typing import Dict, Tuple
+from typing import Dict, Iterable, Tuple
 
+import numpy as np
 import pandas as pd
 
-from modules.utils import coerce_numeric, ensure_required_columns, normalize_columns
+from modules.arrow_io import arrow_inputs
+from modules.emissions_cube import EmissionsCube
+from modules.emissions_timeseries import emissions_by_period
+from modules.unit_conversion import unit_scale_factors
+from modules.utils import clean_labels, coerce_numeric, ensure_required_columns, factorize_labels, normalize_columns
 
 REQUIRED_ACTIVITY_COLUMNS = {
     "department",
@@ -16,6 +21,12 @@ REQUIRED_ACTIVITY_COLUMNS = {
     "source",
 }
 
+# Optional time columns, in order of preference; the first one present becomes `period`.
+# An explicit `period` column must parse; `date`/`month` rows that do not are left
+# undated (out of the period roll-ups, still in every total) and reported.
+PERIOD_COLUMNS = ("period", "date", "month")
+PERIOD_ISSUE_COLUMNS = ["column", "value", "rows"]
+
 _SCOPE_MAP = {
     "scope_1": "scope1",
     "scope 1": "scope1",
@@ -32,7 +43,7 @@ _SCOPE_MAP = {
 }
 
 
-def _normalize_scope(scope: str) -> str:
+def normalize_scope(scope: str) -> str:
     value = str(scope).strip().lower()
     return _SCOPE_MAP.get(value, value)
 
@@ -41,11 +52,14 @@ def validate_activities(df: pd.DataFrame) -> pd.DataFrame:
     if df is None or df.empty:
         raise ValueError("Activities data is empty.")
 
-    cleaned = normalize_columns(df.copy())
+    # normalize_columns/coerce_numeric return shallow copies and every cleaned column
+    # below is assigned, never written in place, so the caller's frame is untouched.
+    cleaned = normalize_columns(df)
     ensure_required_columns(cleaned, REQUIRED_ACTIVITY_COLUMNS, "Activities")
     cleaned = coerce_numeric(cleaned, ["amount", "emission_factor"])
 
-    if cleaned["department"].isna().any() or (cleaned["department"].astype(str).str.strip() == "").any():
+    department = clean_labels(cleaned["department"])
+    if cleaned["department"].isna().any() or (department == "").any():
         raise ValueError("Activities contains missing department values.")
 
     if cleaned["amount"].isna().any() or (cleaned["amount"] < 0).any():
@@ -54,34 +68,99 @@ def validate_activities(df: pd.DataFrame) -> pd.DataFrame:
     if cleaned["emission_factor"].isna().any():
         raise ValueError("Activities contains invalid emission_factor values. emission_factor must be numeric.")
 
-    cleaned["department"] = cleaned["department"].astype(str).str.strip()
-    cleaned["scope"] = cleaned["scope"].apply(_normalize_scope)
-    cleaned["activity"] = cleaned["activity"].astype(str).str.strip()
-    cleaned["unit"] = cleaned["unit"].astype(str).str.strip()
-    cleaned["source"] = cleaned["source"].astype(str).str.strip()
+    cleaned["department"] = department
+    cleaned["scope"] = clean_labels(cleaned["scope"], transform=normalize_scope)
+    for column in ("activity", "unit", "source"):
+        cleaned[column] = clean_labels(cleaned[column])
+
+    period_column = _period_column(cleaned)
+    if period_column is not None:
+        cleaned["period"] = _parse_periods(cleaned[period_column], strict=period_column == "period")
     return cleaned
 
 
-def calculate_emissions(df: pd.DataFrame) -> Dict[str, pd.DataFrame | float | Dict[str, float]]:
-    cleaned = validate_activities(df)
-    detailed = cleaned.copy()
-    detailed["emissions_tonnes"] = detailed["amount"] * detailed["emission_factor"]
+def _period_column(df: pd.DataFrame) -> str | None:
+    return next((col for col in PERIOD_COLUMNS if col in df.columns), None)
+
+
+def _parse_periods(values: pd.Series, strict: bool) -> pd.Series:
+    # Parse each distinct label once; monthly uploads repeat the same few dates.
+    codes, labels = factorize_labels(values)
+    parsed = pd.to_datetime(pd.Series(labels), errors="coerce", format="mixed")
+    if strict and parsed.isna().any():
+        raise ValueError("Activities contains invalid period values. Use dates such as 2024-01-31 or months such as 2024-01.")
+    return pd.Series(parsed.dt.to_period("M").array.take(codes), index=values.index)
+
 
-    by_scope = (
-        detailed.groupby("scope", as_index=False)["emissions_tonnes"].sum().sort_values("emissions_tonnes", ascending=False)
+def period_issues(detailed: pd.DataFrame) -> pd.DataFrame:
+    # Distinct date/month values that could not be read as a month, with their row counts.
+    # An explicit period column never leaves gaps (it must parse), so gaps come from date/month.
+    missing = detailed["period"].isna() if "period" in detailed.columns else None
+    if missing is None or not missing.any():
+        return period_issue_frame([])
+    column = _period_column(detailed.drop(columns="period"))
+    values = detailed.loc[missing, column]
+    counts = values.where(values.notna(), "").astype(str).str.strip().value_counts(sort=False)
+    return period_issue_frame(zip([column] * len(counts), counts.index, counts.tolist()))
+
+
+def period_issue_frame(rows: Iterable[Tuple[str, str, int]]) -> pd.DataFrame:
+    columns = list(zip(*rows)) or [(), (), ()]
+    return pd.DataFrame(
+        {
+            name: np.asarray(values, dtype=np.int64 if name == "rows" else object)
+            for name, values in zip(PERIOD_ISSUE_COLUMNS, columns)
+        }
     )
-    by_department = (
-        detailed.groupby("department", as_index=False)["emissions_tonnes"]
-        .sum()
-        .sort_values("emissions_tonnes", ascending=False)
+
+
+@arrow_inputs
+def calculate_emissions(
+    df: pd.DataFrame,
+    unit_conversions: pd.DataFrame | None = None,
+) -> Dict[str, pd.DataFrame | EmissionsCube | float | Dict[str, float]]:
+    if not isinstance(df, pd.DataFrame) and hasattr(df, "emissions_summary"):
+        # Storage backends (modules/sql_backend.py) aggregate in their database and
+        # carry their own unit conversions; `detailed` is None in their result.
+        if unit_conversions is not None:
+            raise ValueError("Unit conversions for a storage backend are set when the backend is opened.")
+        return df.emissions_summary()
+    detailed = validate_activities(df)
+    # Amounts are restated in the unit each emission factor is expressed per;
+    # rows whose unit cannot be converted keep their reported amount and are flagged.
+    units = unit_scale_factors(detailed, unit_conversions)
+    detailed["amount"] = detailed["amount"].to_numpy() * units["scale"]
+    detailed["unit"] = units["unit"]
+    detailed["unit_convertible"] = units["convertible"]
+    detailed["emissions_tonnes"] = detailed["amount"] * detailed["emission_factor"]
+    unit_issues = units["summary"][~units["summary"]["convertible"]].reset_index(drop=True)
+    return summarize_emissions(detailed, EmissionsCube.from_detailed(detailed), unit_issues, period_issues(detailed))
+
+
+def summarize_emissions(
+    detailed: pd.DataFrame,
+    cube: EmissionsCube,
+    unit_issues: pd.DataFrame,
+    period_issues: pd.DataFrame | None = None,
+) -> Dict[str, pd.DataFrame | EmissionsCube | float | Dict[str, float]]:
+    # Every summary is a cube roll-up, so a stored detailed frame and cube rebuild the full result cheaply.
+    by_period = (
+        emissions_by_period(cube) if "period" in cube.dimensions else pd.DataFrame(columns=["period", "emissions_tonnes"])
     )
 
-    total = float(detailed["emissions_tonnes"].sum())
+    by_scope = cube.rollup("scope").sort_values("emissions_tonnes", ascending=False, kind="stable")
+    by_department = cube.rollup("department").sort_values("emissions_tonnes", ascending=False, kind="stable")
+
+    total = cube.total()
 
-    scope_totals = {row["scope"]: float(row["emissions_tonnes"]) for _, row in by_scope.iterrows()}
+    scope_totals = dict(zip(by_scope["scope"], by_scope["emissions_tonnes"].astype(float)))
 
     return {
         "detailed": detailed,
+        "cube": cube,
+        "by_period": by_period,
+        "unit_issues": unit_issues,
+        "period_issues": period_issues if period_issues is not None else period_issue_frame([]),
         "by_scope": by_scope,
         "by_department": by_department,
         "total_emissions": total,
@@ -90,7 +169,5 @@ def calculate_emissions(df: pd.DataFrame) -> Dict[str, pd.DataFrame | float | Di
 
 
 def emissions_baseline_by_segment(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    detailed = calculate_emissions(df)["detailed"]
-    by_scope = detailed.groupby("scope", as_index=False)["emissions_tonnes"].sum()
-    by_dept_scope = detailed.groupby(["department", "scope"], as_index=False)["emissions_tonnes"].sum()
-    return by_scope, by_dept_scope
+    cube = calculate_emissions(df)["cube"]
+    return cube.rollup("scope"), cube.rollup(["department", "scope"])
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from typing import Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from modules.emissions_cube import EmissionsCube
+
+PERIOD_FREQUENCIES = {"M": 12, "Q": 4, "Y": 1}
+
+
+def _check_frequency(freq: str) -> str:
+    key = str(freq).upper()
+    if key not in PERIOD_FREQUENCIES:
+        raise ValueError(f"Unsupported period frequency '{freq}'. Use one of: {', '.join(PERIOD_FREQUENCIES)}")
+    return key
+
+
+def _period_matrix(
+    cube: EmissionsCube,
+    freq: str,
+    by: Sequence[str],
+) -> Tuple[pd.PeriodIndex, pd.DataFrame, np.ndarray]:
+    if "period" not in cube.dimensions:
+        raise ValueError("Activities data has no period column.")
+    freq = _check_frequency(freq)
+    by = tuple(by)
+
+    monthly = cube.rollup(["period", *by])
+    # Undated rows (unreadable date/month values) carry a missing period and are left out.
+    monthly = monthly[~monthly["period"].astype(str).isin(["NaT", "nan"])]
+    if monthly.empty:
+        return pd.PeriodIndex([], freq=freq), pd.DataFrame(columns=list(by)), np.zeros((0, 0))
+
+    # Month labels are parsed once per distinct month; every row then maps to a
+    # dense calendar slot with integer arithmetic.
+    month_labels, month_codes = np.unique(monthly["period"].to_numpy(dtype=str), return_inverse=True)
+    months = pd.PeriodIndex(month_labels, freq="M")
+    per_year = PERIOD_FREQUENCIES[freq]
+    ordinals = months.year.to_numpy() * per_year + (months.month.to_numpy() - 1) // (12 // per_year)
+    first = int(ordinals.min())
+    slot = ordinals[month_codes] - first
+    n_periods = int(ordinals.max()) - first + 1
+
+    if by:
+        grouped = monthly.groupby(list(by), sort=True)
+        group_codes = grouped.ngroup().to_numpy()
+        groups = grouped.size().index.to_frame(index=False)
+    else:
+        group_codes, groups = np.zeros(len(monthly), dtype=np.int64), pd.DataFrame(index=[0])
+    matrix = np.bincount(
+        group_codes * n_periods + slot,
+        weights=monthly["emissions_tonnes"].to_numpy(dtype=float),
+        minlength=len(groups) * n_periods,
+    ).reshape(len(groups), n_periods)
+
+    start = months[np.argmin(ordinals)].asfreq(freq)
+    periods = pd.period_range(start=start, periods=n_periods, freq=freq)
+    return periods, groups, matrix
+
+
+def _long(periods: pd.PeriodIndex, groups: pd.DataFrame, columns: dict) -> pd.DataFrame:
+    n_groups, n_periods = len(groups), len(periods)
+    out = pd.DataFrame({"period": np.tile(periods.astype(str), n_groups)})
+    for dim in groups.columns:
+        out[dim] = np.repeat(groups[dim].to_numpy(), n_periods)
+    for name, values in columns.items():
+        out[name] = values.ravel()
+    return out
+
+
+def emissions_by_period(cube: EmissionsCube, freq: str = "M", by: Sequence[str] = ()) -> pd.DataFrame:
+    periods, groups, matrix = _period_matrix(cube, freq, by)
+    return _long(periods, groups, {"emissions_tonnes": matrix})
+
+
+def year_over_year(cube: EmissionsCube, freq: str = "M", by: Sequence[str] = ()) -> pd.DataFrame:
+    periods, groups, matrix = _period_matrix(cube, freq, by)
+    lag = PERIOD_FREQUENCIES[_check_frequency(freq)]
+    prior = np.full(matrix.shape, np.nan)
+    prior[:, lag:] = matrix[:, :-lag]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change_pct = np.where(prior > 0, (matrix - prior) / prior * 100.0, np.nan)
+    return _long(
+        periods,
+        groups,
+        {
+            "emissions_tonnes": matrix,
+            "prior_year_emissions": prior,
+            "yoy_change": matrix - prior,
+            "yoy_change_pct": change_pct,
+        },
+    )
+
+
+def rolling_12_month(cube: EmissionsCube, by: Sequence[str] = ()) -> pd.DataFrame:
+    periods, groups, matrix = _period_matrix(cube, "M", by)
+    # Trailing sums from one prefix sum per group; windows with less than a full
+    # year of history are left empty.
+    prefix = np.concatenate([np.zeros((matrix.shape[0], 1)), np.cumsum(matrix, axis=1)], axis=1)
+    rolling = np.full(matrix.shape, np.nan)
+    if matrix.shape[1] >= 12:
+        rolling[:, 11:] = prefix[:, 12:] - prefix[:, :-12]
+    return _long(periods, groups, {"emissions_tonnes": matrix, "rolling_12m_emissions": rolling})
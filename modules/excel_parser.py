@@ -1,12 +1,17 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+from glob import glob
+from importlib.util import find_spec
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Tuple
 
 import pandas as pd
 
-from modules.utils import ensure_required_columns, normalize_columns
+from modules.emissions_engine import PERIOD_COLUMNS
+from modules.utils import coerce_numeric, ensure_required_columns, normalize_column_name, normalize_columns
 
 ACTIVITY_COLUMNS = {
     "department",
@@ -28,6 +33,29 @@ ABATEMENT_COLUMNS = {
     "department",
 }
 ALLOWANCE_COLUMNS = {"year", "allocated_allowances", "initial_cap", "offset_limit_pct"}
+# Columns kept when a recognized sheet is loaded; anything else on the sheet is skipped.
+SHEET_COLUMNS = {
+    "activities": ACTIVITY_COLUMNS | set(PERIOD_COLUMNS) | {"factor_unit"},
+    "emission_factors": EMISSION_FACTOR_COLUMNS,
+    "departments": DEPARTMENT_COLUMNS | set(PERIOD_COLUMNS) | {"factor_unit"},
+    "abatement": ABATEMENT_COLUMNS | {"reduction_pct", "cost_decline_rate"},
+    "allowances": ALLOWANCE_COLUMNS,
+}
+# python-calamine is a much faster XLSX reader; pandas supports it from 2.2.
+XLSX_ENGINE = (
+    "calamine"
+    if find_spec("python_calamine") is not None and tuple(int(part) for part in pd.__version__.split(".")[:2]) >= (2, 2)
+    else None
+)
+SUPPORTED_SUFFIXES = (".csv", ".xlsx")
+SOURCE_FILE_COLUMN = "source_file"
+NUMERIC_COLUMNS = {
+    "activities": ["amount", "emission_factor"],
+    "emission_factors": ["co2_factor", "ch4_factor", "n2o_factor", "year"],
+    "departments": ["amount", "emission_factor"],
+    "abatement": ["max_reduction_pct", "cost_per_tonne", "capex"],
+    "allowances": ["year", "allocated_allowances", "initial_cap", "offset_limit_pct"],
+}
 
 
 @dataclass
@@ -39,9 +67,18 @@ class ParsedInput:
     allowances: pd.DataFrame
 
 
+@dataclass
+class BatchParseResult:
+    parsed: ParsedInput
+    files: pd.DataFrame
+
+    @property
+    def failures(self) -> pd.DataFrame:
+        return self.files[self.files["status"] == "failed"].reset_index(drop=True)
+
+
 def _clean(df: pd.DataFrame) -> pd.DataFrame:
-    out = normalize_columns(df.copy())
-    return out.dropna(how="all")
+    return normalize_columns(df).dropna(how="all")
 
 
 def _normalize_abatement(df: pd.DataFrame) -> pd.DataFrame:
@@ -91,6 +128,21 @@ def _sheet_kind(sheet_name: str, cleaned: pd.DataFrame) -> str | None:
     return None
 
 
+def _read_xlsx(source: Any) -> Dict[str, pd.DataFrame]:
+    # Sheets are classified from their name and header row (nrows=0 stops after
+    # the header), then only recognized sheets and their known columns are loaded.
+    with pd.ExcelFile(source, engine=XLSX_ENGINE) as workbook:
+        sheets = {}
+        for sheet_name in workbook.sheet_names:
+            header = _clean(workbook.parse(sheet_name, nrows=0))
+            kind = _sheet_kind(sheet_name, header)
+            if kind is None:
+                continue
+            wanted = SHEET_COLUMNS[kind]
+            sheets[sheet_name] = workbook.parse(sheet_name, usecols=lambda column: normalize_column_name(column) in wanted)
+    return sheets
+
+
 def _parse_sheets(sheets: Dict[str, pd.DataFrame]) -> ParsedInput:
     activities = _empty_df(ACTIVITY_COLUMNS)
     emission_factors = _empty_df(EMISSION_FACTOR_COLUMNS)
@@ -113,7 +165,7 @@ def _parse_sheets(sheets: Dict[str, pd.DataFrame]) -> ParsedInput:
             allowances = cleaned
 
     if departments.empty and not activities.empty:
-        departments = activities.copy()
+        departments = activities.copy(deep=False)
 
     _validate_if_not_empty(activities, ACTIVITY_COLUMNS, "Activities")
     _validate_if_not_empty(emission_factors, EMISSION_FACTOR_COLUMNS, "Emission factors")
@@ -143,12 +195,12 @@ def parse_uploaded_file(file_obj: Any) -> ParsedInput:
         return ParsedInput(
             activities=activities,
             emission_factors=_empty_df(EMISSION_FACTOR_COLUMNS),
-            departments=activities.copy(),
+            departments=activities.copy(deep=False),
             abatement=_empty_df(ABATEMENT_COLUMNS),
             allowances=_empty_df(ALLOWANCE_COLUMNS),
         )
     elif lower_name.endswith(".xlsx"):
-        sheets = pd.read_excel(file_obj, sheet_name=None)
+        sheets = _read_xlsx(file_obj)
         return _parse_sheets(sheets)
     else:
         raise ValueError("Unsupported file type. Use CSV or XLSX.")
@@ -162,13 +214,82 @@ def parse_path(path: str | Path) -> ParsedInput:
         return ParsedInput(
             activities=activities,
             emission_factors=_empty_df(EMISSION_FACTOR_COLUMNS),
-            departments=activities.copy(),
+            departments=activities.copy(deep=False),
             abatement=_empty_df(ABATEMENT_COLUMNS),
             allowances=_empty_df(ALLOWANCE_COLUMNS),
         )
 
     if p.suffix.lower() == ".xlsx":
-        sheets = pd.read_excel(p, sheet_name=None)
+        sheets = _read_xlsx(p)
         return _parse_sheets(sheets)
 
     raise ValueError("Unsupported file type. Use CSV or XLSX.")
+
+
+def _resolve_paths(path_or_glob: str | Path) -> List[Path]:
+    p = Path(path_or_glob)
+    if p.is_dir():
+        candidates = [child for child in p.iterdir() if child.is_file()]
+    elif p.is_file():
+        candidates = [p]
+    else:
+        candidates = [Path(match) for match in glob(str(path_or_glob), recursive=True)]
+    return sorted(child for child in candidates if child.suffix.lower() in SUPPORTED_SUFFIXES)
+
+
+def _parse_file(path: str) -> Tuple[str, ParsedInput | None, str | None]:
+    # Runs in worker processes; errors are returned, not raised, so one bad
+    # workbook never aborts the batch.
+    try:
+        return path, parse_path(path), None
+    except Exception as exc:
+        return path, None, f"{type(exc).__name__}: {exc}"
+
+
+def _merge_parts(parts: List[Tuple[str, ParsedInput]]) -> ParsedInput:
+    merged = {}
+    for field in fields(ParsedInput):
+        frames = [
+            getattr(parsed, field.name).assign(**{SOURCE_FILE_COLUMN: source})
+            for source, parsed in parts
+            if not getattr(parsed, field.name).empty
+        ]
+        if frames:
+            combined = pd.concat(frames, ignore_index=True, sort=False)
+        else:
+            empty_columns = getattr(parts[0][1], field.name).columns if parts else []
+            combined = pd.DataFrame(columns=[*empty_columns, SOURCE_FILE_COLUMN])
+        # A column that is numeric in one workbook and text in another would
+        # otherwise come out as object; the known numeric columns are coerced.
+        merged[field.name] = coerce_numeric(combined, NUMERIC_COLUMNS[field.name])
+    return ParsedInput(**merged)
+
+
+def parse_paths(path_or_glob: str | Path, *, max_workers: int | None = None) -> BatchParseResult:
+    paths = _resolve_paths(path_or_glob)
+    if not paths:
+        raise ValueError(f"No CSV or XLSX files found for: {path_or_glob}")
+
+    workers = min(max_workers or os.cpu_count() or 1, len(paths))
+    names = [str(path) for path in paths]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_parse_file, names, chunksize=max(1, len(names) // (workers * 4))))
+    else:
+        results = [_parse_file(name) for name in names]
+
+    # Rows are tagged with the file name, or the full path when names repeat across folders.
+    labels = [Path(name).name for name in names]
+    if len(set(labels)) < len(labels):
+        labels = names
+    parts = [(label, parsed) for label, (_, parsed, _) in zip(labels, results) if parsed is not None]
+    files = pd.DataFrame(
+        {
+            "file": labels,
+            "path": [name for name, _, _ in results],
+            "status": ["ok" if parsed is not None else "failed" for _, parsed, _ in results],
+            "error": [error for _, _, error in results],
+            "activity_rows": [len(parsed.activities) if parsed is not None else 0 for _, parsed, _ in results],
+        }
+    )
+    return BatchParseResult(parsed=_merge_parts(parts), files=files)
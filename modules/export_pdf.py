@@ -1,12 +1,37 @@
 from __future__ import annotations
 
 from io import BytesIO
-from typing import Any, Dict
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
 
+import numpy as np
+import pandas as pd
+from reportlab.graphics.charts.barcharts import HorizontalBarChart
+from reportlab.graphics.charts.legends import LineLegend
+from reportlab.graphics.charts.lineplots import LinePlot
+from reportlab.graphics.shapes import Drawing, String
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import Flowable, PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from modules.visualization import PALETTE, macc_segments, top_n_with_other
+
+CHART_WIDTH = 468
+CHART_HEIGHT = 220
+TABLE_FONT_SIZE = 7
+ROW_HEIGHT = 12
+HEADER_COLOR = colors.HexColor("#0A7A5D")
+MAX_TABLE_ROWS = 20_000
+MACC_TABLE_COLUMNS = ["initiative_name", "department", "cost_per_tonne", "reduction_tonnes", "cumulative_reduction", "abatement_cost", "npv"]
+
+_HEADER_STYLE = [
+    ("BACKGROUND", (0, 0), (-1, 0), HEADER_COLOR),
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+]
+_SERIES_COLORS = [colors.HexColor(color) for color in PALETTE]
 
 
 def _summary_table(summary: Dict[str, Any]):
@@ -14,20 +39,173 @@ def _summary_table(summary: Dict[str, Any]):
     for key, value in summary.items():
         rows.append([str(key), str(value)])
     table = Table(rows, hAlign="LEFT")
-    table.setStyle(
-        TableStyle(
-            [
-                ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#0A7A5D")),
-                ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
-                ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-            ]
-        )
-    )
+    table.setStyle(TableStyle(_HEADER_STYLE))
     return table
 
 
-def build_pdf_report(payload: Dict[str, Any]) -> bytes:
+def _frame(data: Any) -> pd.DataFrame:
+    if isinstance(data, pd.DataFrame):
+        return data
+    return pd.DataFrame(data or [])
+
+
+def _format_column(values: pd.Series) -> Tuple[List[str], bool]:
+    if values.dtype == object:
+        # Columns like npv mix floats and None; they are formatted as numbers when every value converts.
+        numeric = pd.to_numeric(values, errors="coerce")
+        if numeric.notna().sum() == values.notna().sum():
+            values = numeric
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        numbers = values.to_numpy(dtype=float, na_value=np.nan)
+        return ["" if np.isnan(number) else f"{number:,.2f}" for number in numbers], True
+    return ["" if pd.isna(value) else str(value)[:40] for value in values.tolist()], False
+
+
+class _RowBlock(Flowable):
+    # A run of table rows drawn straight onto the canvas: one grid path and one
+    # text object per page instead of a styled cell-by-cell platypus Table.
+    def __init__(self, header: Sequence[str], rows: List[Sequence[str]], col_widths: Sequence[float], numeric: Sequence[bool]):
+        super().__init__()
+        self.header = header
+        self.rows = rows
+        self.col_widths = col_widths
+        self.numeric = numeric
+
+    def wrap(self, availWidth, availHeight):
+        self.width = sum(self.col_widths)
+        self.height = ROW_HEIGHT * (len(self.rows) + 1)
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        fit = int(availHeight // ROW_HEIGHT) - 1
+        if fit < 1 or fit >= len(self.rows):
+            return []
+        return [
+            _RowBlock(self.header, self.rows[:fit], self.col_widths, self.numeric),
+            _RowBlock(self.header, self.rows[fit:], self.col_widths, self.numeric),
+        ]
+
+    def draw(self):
+        canv = self.canv
+        edges = np.concatenate([[0.0], np.cumsum(self.col_widths)]).tolist()
+        canv.setFillColor(HEADER_COLOR)
+        canv.rect(0, self.height - ROW_HEIGHT, self.width, ROW_HEIGHT, stroke=0, fill=1)
+        canv.setStrokeColor(colors.grey)
+        canv.setLineWidth(0.5)
+        canv.grid(edges, [self.height - ROW_HEIGHT * line for line in range(len(self.rows) + 2)])
+
+        text = canv.beginText()
+        text.setFillColor(colors.white)
+        text.setFont("Helvetica-Bold", TABLE_FONT_SIZE)
+        baseline = self.height - ROW_HEIGHT + 3.5
+        for left, label in zip(edges, self.header):
+            text.setTextOrigin(left + 2, baseline)
+            text.textOut(label)
+        text.setFillColor(colors.black)
+        text.setFont("Helvetica", TABLE_FONT_SIZE)
+        for position, row in enumerate(self.rows, start=1):
+            y = baseline - ROW_HEIGHT * position
+            for left, right, value, numeric in zip(edges, edges[1:], row, self.numeric):
+                x = right - 2 - stringWidth(value, "Helvetica", TABLE_FONT_SIZE) if numeric else left + 2
+                text.setTextOrigin(x, y)
+                text.textOut(value)
+        canv.drawText(text)
+
+
+def _table_chunks(df: pd.DataFrame, columns: Sequence[str], width: float, height: float) -> Iterator[_RowBlock]:
+    # One page-sized block at a time, so rows are formatted per block; the first
+    # block splits if it starts part-way down a page.
+    chunk_rows = max(int(height // ROW_HEIGHT) - 1, 1)
+    col_widths = [width / len(columns)] * len(columns)
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start : start + chunk_rows]
+        formatted, numeric = zip(*(_format_column(chunk[column]) for column in columns))
+        yield _RowBlock(columns, list(zip(*formatted)), col_widths, numeric)
+
+
+def _line_chart(title: str, x: np.ndarray, series: Dict[str, np.ndarray], x_label: str, fill: bool = False) -> Drawing:
+    drawing = Drawing(CHART_WIDTH, CHART_HEIGHT)
+    plot = LinePlot()
+    plot.x, plot.y = 50, 40
+    plot.width, plot.height = CHART_WIDTH - 70, CHART_HEIGHT - 75
+    plot.data = [list(zip(x.tolist(), values.tolist())) for values in series.values()]
+    for index in range(len(series)):
+        plot.lines[index].strokeColor = _SERIES_COLORS[index % len(_SERIES_COLORS)]
+        plot.lines[index].strokeWidth = 1.5
+    if fill:
+        plot.lines[0].inFill = True
+        plot.lines[0].fillColor = colors.HexColor("#99f6e4")
+    plot.xValueAxis.labels.fontSize = 7
+    plot.yValueAxis.labels.fontSize = 7
+    plot.yValueAxis.labelTextFormat = "{:,.0f}".format
+    plot.xValueAxis.labelTextFormat = "{:,.0f}".format
+    drawing.add(plot)
+    drawing.add(String(0, CHART_HEIGHT - 14, title, fontName="Helvetica-Bold", fontSize=11))
+    drawing.add(String(plot.x + plot.width / 2, 8, x_label, fontSize=8, textAnchor="middle"))
+    if len(series) > 1:
+        legend = LineLegend()
+        legend.x, legend.y = CHART_WIDTH - 150, CHART_HEIGHT - 10
+        legend.fontSize = 7
+        legend.colorNamePairs = [(_SERIES_COLORS[index % len(_SERIES_COLORS)], name) for index, name in enumerate(series)]
+        drawing.add(legend)
+    return drawing
+
+
+def _pricing_charts(pricing: pd.DataFrame) -> List[Drawing]:
+    if pricing.empty or "carbon_price" not in pricing.columns:
+        return []
+    view = pricing.sort_values("carbon_price")
+    price = view["carbon_price"].to_numpy(dtype=float)
+    charts = []
+    if "carbon_cost" in view.columns:
+        charts.append(_line_chart("Carbon Cost Curve", price, {"Carbon cost": view["carbon_cost"].to_numpy(dtype=float)}, "Carbon price"))
+    if "adjusted_emissions" in view.columns:
+        charts.append(
+            _line_chart("Emissions vs Carbon Price", price, {"Adjusted emissions": view["adjusted_emissions"].to_numpy(dtype=float)}, "Carbon price")
+        )
+    return charts
+
+
+def _macc_chart(macc: pd.DataFrame) -> List[Drawing]:
+    if macc.empty or not {"initiative_name", "reduction_tonnes", "cost_per_tonne"} <= set(macc.columns):
+        return []
+    segments = macc_segments(macc, max_segments=400)
+    if segments.empty:
+        return []
+    x = np.column_stack([segments["start_reduction"], segments["end_reduction"]]).ravel()
+    y = np.repeat(segments["cost_per_tonne"].to_numpy(dtype=float), 2)
+    return [_line_chart("MAC Curve (cost per tonne by cumulative reduction)", x, {"MACC": y}, "Cumulative reduction (tCO2e)", fill=True)]
+
+
+def _department_chart(departments: pd.DataFrame) -> List[Drawing]:
+    if departments.empty or not {"department", "emissions_tonnes"} <= set(departments.columns):
+        return []
+    view = top_n_with_other(departments[["department", "emissions_tonnes"]], "department", "emissions_tonnes", n=15)
+    drawing = Drawing(CHART_WIDTH, CHART_HEIGHT + 60)
+    chart = HorizontalBarChart()
+    chart.x, chart.y = 120, 20
+    chart.width, chart.height = CHART_WIDTH - 140, CHART_HEIGHT + 10
+    chart.data = [view["emissions_tonnes"].astype(float).tolist()[::-1]]
+    chart.categoryAxis.categoryNames = [str(name)[:24] for name in view["department"]][::-1]
+    chart.categoryAxis.labels.fontSize = 7
+    chart.valueAxis.labels.fontSize = 7
+    chart.valueAxis.valueMin = 0
+    chart.valueAxis.labelTextFormat = "{:,.0f}".format
+    chart.bars[0].fillColor = _SERIES_COLORS[0]
+    drawing.add(chart)
+    drawing.add(String(0, CHART_HEIGHT + 46, "Emissions by Department (tCO2e)", fontName="Helvetica-Bold", fontSize=11))
+    return [drawing]
+
+
+def _ets_chart(yearly: pd.DataFrame) -> List[Drawing]:
+    bands = [column for column in ("price_p05", "price_p50", "price_p95") if column in yearly.columns]
+    if yearly.empty or "year" not in yearly.columns or not bands:
+        return []
+    series = {column.replace("price_", "").upper(): yearly[column].to_numpy(dtype=float) for column in bands}
+    return [_line_chart("Allowance Price Paths", yearly["year"].to_numpy(dtype=float), series, "Year")]
+
+
+def build_pdf_report(payload: Dict[str, Any], max_table_rows: int = MAX_TABLE_ROWS) -> bytes:
     buffer = BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=letter)
     styles = getSampleStyleSheet()
@@ -51,5 +229,27 @@ def build_pdf_report(payload: Dict[str, Any]) -> bytes:
             story.append(Paragraph(str(section_data), styles["BodyText"]))
         story.append(Spacer(1, 8))
 
+    data = payload.get("data", {})
+    macc = _frame(data.get("macc"))
+    charts = (
+        _pricing_charts(_frame(data.get("pricing")))
+        + _macc_chart(macc)
+        + _department_chart(_frame(data.get("department_emissions")))
+        + _ets_chart(_frame(data.get("ets_yearly")))
+    )
+    if charts:
+        story.append(Paragraph("Charts", styles["Heading2"]))
+        for chart in charts:
+            story.append(chart)
+            story.append(Spacer(1, 12))
+
+    table_columns = [column for column in MACC_TABLE_COLUMNS if column in macc.columns]
+    if not macc.empty and table_columns:
+        story.append(PageBreak())
+        story.append(Paragraph("Appendix: MACC initiatives", styles["Heading2"]))
+        if len(macc) > max_table_rows:
+            story.append(Paragraph(f"First {max_table_rows:,} of {len(macc):,} initiatives; the Excel export has the full table.", styles["BodyText"]))
+        story.extend(_table_chunks(macc.iloc[:max_table_rows], table_columns, doc.width, doc.height))
+
     doc.build(story)
     return buffer.getvalue()
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from typing import Iterable
 
+import numpy as np
+
 
 def npv(cash_flows: Iterable[float], discount_rate: float) -> float:
     rate = float(discount_rate)
@@ -22,37 +24,63 @@ def irr(
     flows = [float(x) for x in cash_flows]
     if len(flows) < 2:
         return None
+    rate = irr_rows(
+        np.asarray([flows]), lower_bound=lower_bound, upper_bound=upper_bound, max_iter=max_iter, tolerance=tolerance
+    )[0]
+    return None if np.isnan(rate) else float(rate)
 
-    if not any(x < 0 for x in flows) or not any(x > 0 for x in flows):
-        return None
 
-    def f(rate: float) -> float:
-        return npv(flows, rate)
+def npv_rows(cash_flows: np.ndarray, discount_rate: float | np.ndarray) -> np.ndarray:
+    # npv over the last axis, accumulated in the same order as npv so results match it exactly.
+    flows = np.asarray(cash_flows, dtype=float)
+    rate = np.asarray(discount_rate, dtype=float)
+    total = np.zeros(flows.shape[:-1])
+    for idx in range(flows.shape[-1]):
+        total = total + flows[..., idx] / ((1.0 + rate) ** idx)
+    return total
+
 
-    low = lower_bound
-    high = upper_bound
-    f_low = f(low)
-    f_high = f(high)
+def irr_rows(
+    cash_flows: np.ndarray,
+    *,
+    lower_bound: float = -0.99,
+    upper_bound: float = 10.0,
+    max_iter: int = 200,
+    tolerance: float = 1e-7,
+) -> np.ndarray:
+    # Bisection run on every cash-flow row at once; rows without a sign change or
+    # a bracketed root get NaN.
+    flows = np.asarray(cash_flows, dtype=float)
+    result = np.full(flows.shape[:-1], np.nan)
+    if flows.shape[-1] < 2:
+        return result
 
-    if f_low == 0:
-        return low
-    if f_high == 0:
-        return high
+    low = np.full(result.shape, float(lower_bound))
+    high = np.full(result.shape, float(upper_bound))
+    f_low = npv_rows(flows, low)
+    f_high = npv_rows(flows, high)
+    active = (flows < 0).any(axis=-1) & (flows > 0).any(axis=-1)
 
-    if f_low * f_high > 0:
-        return None
+    at_low = active & (f_low == 0)
+    result[at_low] = low[at_low]
+    active &= ~at_low
+    at_high = active & (f_high == 0)
+    result[at_high] = high[at_high]
+    active &= ~at_high & ~(f_low * f_high > 0)
 
     for _ in range(max_iter):
+        if not active.any():
+            break
         mid = (low + high) / 2.0
-        f_mid = f(mid)
-        if abs(f_mid) <= tolerance:
-            return mid
-
-        if f_low * f_mid < 0:
-            high = mid
-            f_high = f_mid
-        else:
-            low = mid
-            f_low = f_mid
-
-    return (low + high) / 2.0
+        f_mid = npv_rows(flows, mid)
+        converged = active & (np.abs(f_mid) <= tolerance)
+        result[converged] = mid[converged]
+        active &= ~converged
+
+        left = f_low * f_mid < 0
+        high = np.where(active & left, mid, high)
+        f_low = np.where(active & ~left, f_mid, f_low)
+        low = np.where(active & ~left, mid, low)
+
+    result[active] = ((low + high) / 2.0)[active]
+    return result
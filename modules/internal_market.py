@@ -1,19 +1,24 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict
+from typing import Callable, Dict, Iterable, Mapping
 
+import numpy as np
 import pandas as pd
 
+from modules.arrow_io import arrow_inputs
+from modules.memo import memoize
 from modules.utils import clamp
 
 
-@dataclass
+@dataclass(frozen=True)
 class InternalFeeConfig:
     internal_fee_rate: float
     response_factor: float
 
 
+@arrow_inputs
+@memoize
 def simulate_internal_fee(department_emissions: pd.DataFrame, config: InternalFeeConfig) -> Dict[str, pd.DataFrame | float]:
     if department_emissions is None or department_emissions.empty:
         raise ValueError("Department emissions data is empty.")
@@ -41,3 +46,110 @@ def simulate_internal_fee(department_emissions: pd.DataFrame, config: InternalFe
         "total_adjusted_emissions": float(table["adjusted_emissions"].sum()),
         "total_reduction": float(table["emissions_reduction"].sum()),
     }
+
+
+ResponseCurve = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+
+def _linear_response(fee_rates: np.ndarray, response_factors: np.ndarray) -> np.ndarray:
+    return np.clip(1.0 - response_factors * fee_rates / 100.0, 0.0, 1.0)
+
+
+def _exponential_response(fee_rates: np.ndarray, response_factors: np.ndarray) -> np.ndarray:
+    return np.exp(-np.maximum(response_factors, 0.0) * fee_rates / 100.0)
+
+
+def _hill_response(fee_rates: np.ndarray, response_factors: np.ndarray) -> np.ndarray:
+    # Slow start, then saturation: half of the emissions respond at fee = 100 / response_factor.
+    scaled = np.maximum(response_factors, 0.0) * fee_rates / 100.0
+    return 1.0 / (1.0 + scaled**2)
+
+
+RESPONSE_CURVES: Dict[str, ResponseCurve] = {
+    "linear": _linear_response,
+    "exponential": _exponential_response,
+    "hill": _hill_response,
+}
+
+
+def _response_factors(table: pd.DataFrame, response_factors: float | Mapping | pd.Series | None) -> np.ndarray:
+    if response_factors is None:
+        if "response_factor" not in table.columns:
+            raise ValueError("Provide response_factors or a response_factor column per department.")
+        factors = pd.to_numeric(table["response_factor"], errors="coerce")
+    elif isinstance(response_factors, (Mapping, pd.Series)):
+        lookup = {str(k).strip().lower(): float(v) for k, v in dict(response_factors).items()}
+        factors = table["department"].astype(str).str.strip().str.lower().map(lookup)
+        if "response_factor" in table.columns:
+            factors = factors.fillna(pd.to_numeric(table["response_factor"], errors="coerce"))
+    else:
+        factors = pd.Series(float(response_factors), index=table.index)
+    return factors.fillna(0.0).to_numpy(dtype=float)
+
+
+@arrow_inputs
+@memoize
+def sweep_internal_fees(
+    department_emissions: pd.DataFrame,
+    fee_rates: Iterable[float],
+    *,
+    response_factors: float | Mapping | pd.Series | None = None,
+    response_curve: str | ResponseCurve = "linear",
+) -> Dict[str, pd.DataFrame | np.ndarray | float]:
+    if department_emissions is None or department_emissions.empty:
+        raise ValueError("Department emissions data is empty.")
+    missing = {"department", "emissions_tonnes"} - set(department_emissions.columns)
+    if missing:
+        raise ValueError(f"Department emissions missing columns: {', '.join(sorted(missing))}")
+    curve = RESPONSE_CURVES.get(response_curve) if isinstance(response_curve, str) else response_curve
+    if curve is None:
+        raise ValueError(f"Unknown response curve: {response_curve}")
+
+    departments = department_emissions.reset_index(drop=True)
+    emissions = pd.to_numeric(departments["emissions_tonnes"], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    factors = _response_factors(departments, response_factors)
+    rates = np.asarray(list(fee_rates), dtype=float)
+
+    # Departments x fee rates in one pass.
+    multiplier = curve(rates[None, :], factors[:, None])
+    fee_cost = emissions[:, None] * rates[None, :]
+    adjusted = emissions[:, None] * multiplier
+    revenue = adjusted * rates[None, :]
+
+    baseline_total = float(emissions.sum())
+    totals = pd.DataFrame(
+        {
+            "fee_rate": rates,
+            "total_fee_cost": fee_cost.sum(axis=0),
+            "total_revenue": revenue.sum(axis=0),
+            "total_adjusted_emissions": adjusted.sum(axis=0),
+        }
+    )
+    totals["total_reduction"] = baseline_total - totals["total_adjusted_emissions"]
+    totals["reduction_pct"] = totals["total_reduction"] / baseline_total * 100.0 if baseline_total > 0 else 0.0
+
+    best = int(totals["total_revenue"].to_numpy().argmax()) if len(rates) else 0
+    return {
+        "departments": departments.assign(response_factor=factors),
+        "fee_rates": rates,
+        "fee_cost": fee_cost,
+        "adjusted_emissions": adjusted,
+        "revenue": revenue,
+        "totals": totals,
+        "revenue_maximizing_fee_rate": float(rates[best]) if len(rates) else 0.0,
+        "max_revenue": float(totals["total_revenue"].iloc[best]) if len(rates) else 0.0,
+    }
+
+
+def fee_table_at_rate(sweep: Dict[str, pd.DataFrame | np.ndarray | float], fee_rate: float) -> pd.DataFrame:
+    rates = sweep["fee_rates"]
+    column = int(np.abs(rates - float(fee_rate)).argmin())
+    rate = float(rates[column])
+    table = sweep["departments"].copy()
+    table["emissions_tonnes"] = pd.to_numeric(table["emissions_tonnes"], errors="coerce").fillna(0.0)
+    table["fee_cost"] = sweep["fee_cost"][:, column]
+    table["adjusted_emissions"] = sweep["adjusted_emissions"][:, column]
+    table["emissions_reduction"] = table["emissions_tonnes"] - table["adjusted_emissions"]
+    table["savings_from_reduction"] = table["emissions_reduction"] * rate
+    table["net_cost_vs_savings"] = table["fee_cost"] - table["savings_from_reduction"]
+    return table.sort_values("fee_cost", ascending=False)
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from modules.memo import fingerprint
+
+JOB_KINDS = ("thread", "process")
+FINAL_STATES = ("done", "failed", "cancelled", "timed_out")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def job_key(*parts: Any, **named: Any) -> str:
+    return fingerprint(*parts, **named)
+
+
+@dataclass
+class Job:
+    key: str
+    label: str = ""
+    timeout: Optional[float] = None
+    state: str = "queued"
+    progress: float = 0.0
+    message: str = ""
+    result: Any = None
+    error: str = ""
+    submitted_at: float = field(default_factory=time.monotonic)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    _cancel: threading.Event = field(default_factory=threading.Event, repr=False, compare=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+    _future: Optional[Future] = field(default=None, repr=False, compare=False)
+
+    @property
+    def done(self) -> bool:
+        self._check_timeout()
+        return self.state in FINAL_STATES
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    def cancel(self) -> None:
+        # Queued jobs never start; cooperative jobs stop at their next progress
+        # report; anything else runs to completion with its result discarded.
+        self._cancel.set()
+        if self._future is not None:
+            self._future.cancel()
+        self._finish("cancelled")
+
+    def wait(self, timeout: Optional[float] = None) -> "Job":
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.done and (deadline is None or time.monotonic() < deadline):
+            time.sleep(0.01)
+        return self
+
+    def _start(self) -> None:
+        with self._lock:
+            if self.state == "queued":
+                self.state = "running"
+                self.started_at = time.monotonic()
+
+    def _check_timeout(self) -> None:
+        if self.state == "queued" and self._future is not None and self._future.running():
+            self._start()
+        if self.state == "running" and self.timeout is not None and self.elapsed > self.timeout:
+            self._cancel.set()
+            self._finish("timed_out", error=f"exceeded {self.timeout:g}s")
+
+    def _finish(self, state: str, result: Any = None, error: str = "") -> None:
+        with self._lock:
+            # The first final state wins; late results of cancelled or timed-out jobs are dropped.
+            if self.state in FINAL_STATES:
+                return
+            self.state = state
+            self.result = result
+            self.error = error
+            self.finished_at = time.monotonic()
+            if self.started_at is None:
+                self.started_at = self.finished_at
+            if state == "done":
+                self.progress = 1.0
+
+    def _on_future_done(self, future: Future) -> None:
+        if future.cancelled():
+            self._finish("cancelled")
+            return
+        exc = future.exception()
+        if isinstance(exc, JobCancelled):
+            self._finish("cancelled")
+        elif exc is not None:
+            self._finish("failed", error=f"{type(exc).__name__}: {exc}")
+        else:
+            self._finish("done", result=future.result())
+
+
+class JobContext:
+    # Handed to cooperative job functions to report progress and observe cancellation.
+    def __init__(self, job: Job):
+        self._job = job
+
+    @property
+    def cancelled(self) -> bool:
+        return self._job._cancel.is_set()
+
+    def check(self) -> None:
+        if self.cancelled:
+            raise JobCancelled(self._job.label)
+
+    def progress(self, fraction: float, message: str = "") -> None:
+        self.check()
+        self._job.progress = float(np.clip(fraction, 0.0, 1.0))
+        self._job.message = message
+
+
+def _run_job(job: Job, func: Callable[..., Any], args: tuple, kwargs: dict, pass_context: bool) -> Any:
+    if job._cancel.is_set():
+        raise JobCancelled(job.label)
+    job._start()
+    if pass_context:
+        return func(JobContext(job), *args, **kwargs)
+    return func(*args, **kwargs)
+
+
+class JobExecutor:
+    def __init__(self, max_workers: Optional[int] = None, kind: str = "thread", max_results: int = 32):
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unsupported job executor kind '{kind}'. Use one of: {', '.join(JOB_KINDS)}")
+        self.kind = kind
+        self.max_results = max_results
+        self._pool = (ThreadPoolExecutor if kind == "thread" else ProcessPoolExecutor)(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+
+    def submit(
+        self,
+        func: Callable[..., Any],
+        *args: Any,
+        key: Optional[str] = None,
+        label: str = "",
+        timeout: Optional[float] = None,
+        pass_context: bool = False,
+        **kwargs: Any,
+    ) -> Job:
+        if pass_context and self.kind == "process":
+            raise ValueError("Progress and cooperative cancellation require a thread executor.")
+        key = key or job_key(func, *args, **kwargs)
+        with self._lock:
+            # Queued, running and finished jobs are reused; failed or stopped ones are retried.
+            job = self._jobs.get(key)
+            if job is not None and (not job.done or job.state == "done"):
+                self._jobs.move_to_end(key)
+                return job
+            job = Job(key, label or getattr(func, "__name__", "job"), timeout)
+            self._jobs[key] = job
+            self._trim()
+
+        if self.kind == "thread":
+            future = self._pool.submit(_run_job, job, func, args, kwargs, pass_context)
+        else:
+            future = self._pool.submit(func, *args, **kwargs)
+        job._future = future
+        future.add_done_callback(job._on_future_done)
+        return job
+
+    def _trim(self) -> None:
+        finished = [key for key, job in self._jobs.items() if job.done]
+        for key in finished[: max(len(self._jobs) - self.max_results, 0)]:
+            del self._jobs[key]
+
+    def get(self, key: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(key)
+
+    def shutdown(self, cancel: bool = True) -> None:
+        if cancel:
+            for job in list(self._jobs.values()):
+                if not job.done:
+                    job.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=cancel)
+
+
+_DEFAULT_EXECUTOR: Optional[JobExecutor] = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def default_executor() -> JobExecutor:
+    global _DEFAULT_EXECUTOR
+    with _DEFAULT_LOCK:
+        if _DEFAULT_EXECUTOR is None:
+            _DEFAULT_EXECUTOR = JobExecutor()
+        return _DEFAULT_EXECUTOR
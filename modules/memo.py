@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import fields, is_dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from modules.activity_store import STORE_VERSION, _engine_digest
+from modules.dataset_registry import content_key, estimate_nbytes, hash_values
+
+CACHE_DIR_ENV = "CARBONPRICINGX_CACHE_DIR"
+
+
+def _fingerprint(value: Any, digest: Any) -> None:
+    digest.update(type(value).__name__.encode("utf-8"))
+    if isinstance(value, pd.DataFrame):
+        digest.update(content_key(value).encode("utf-8"))
+    elif isinstance(value, (pd.Series, pd.Index)):
+        digest.update(hash_values(value))
+    elif isinstance(value, np.ndarray):
+        digest.update(str(value.dtype).encode("utf-8") + repr(value.shape).encode("utf-8"))
+        digest.update(np.ascontiguousarray(value).tobytes() if value.dtype != object else repr(value.tolist()).encode("utf-8"))
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        digest.update(bytes(value))
+    elif isinstance(value, dict):
+        for item_key in sorted(value, key=str):
+            _fingerprint(item_key, digest)
+            _fingerprint(value[item_key], digest)
+    elif isinstance(value, (list, tuple, range)):
+        for item in value:
+            _fingerprint(item, digest)
+    elif is_dataclass(value) and not isinstance(value, type):
+        # Fields excluded from comparison hold caches (e.g. the cube's memoized roll-ups).
+        for item in fields(value):
+            if item.compare:
+                _fingerprint(item.name, digest)
+                _fingerprint(getattr(value, item.name), digest)
+    elif callable(getattr(value, "getvalue", None)):
+        # In-memory file objects (uploads) are keyed by their content.
+        digest.update(bytes(value.getvalue()))
+    elif callable(value):
+        name = f"{getattr(value, '__module__', '')}.{getattr(value, '__qualname__', repr(value))}"
+        # Lambdas and nested functions share qualified names, so they are keyed by identity.
+        digest.update((name + (f"@{id(value)}" if "<" in name else "")).encode("utf-8"))
+    else:
+        digest.update(repr(value).encode("utf-8"))
+
+
+def fingerprint(*parts: Any, **named: Any) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    _fingerprint(parts, digest)
+    _fingerprint(named, digest)
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def _code_version(module_name: str) -> str:
+    # Disk entries outlive the process, so keys carry the store layout version, the
+    # parsing and emissions code and the engine's own module; an upgrade misses
+    # instead of serving results computed by older code.
+    digest = hashlib.blake2b(f"{STORE_VERSION}:{_engine_digest()}".encode("utf-8"), digest_size=16)
+    source = getattr(sys.modules.get(module_name), "__file__", None)
+    if source:
+        digest.update(Path(source).read_bytes())
+    return digest.hexdigest()
+
+
+def _detach(value: Any) -> Any:
+    # Callers get shallow frame copies, so adding or replacing columns never edits a cached result.
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=False)
+    if isinstance(value, dict):
+        return {key: _detach(item) for key, item in value.items()}
+    return value
+
+
+class MemoCache:
+    def __init__(
+        self,
+        max_bytes: int = 256 * 1024 * 1024,
+        max_entries: int = 1_024,
+        ttl: Optional[float] = None,
+        directory: Optional[str | Path] = None,
+        enabled: bool = True,
+    ):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.directory = Path(directory) if directory else None
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self._bytes = 0
+        self._counts = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl is not None and time.time() - stored_at >= self.ttl
+
+    def _disk_path(self, key: str) -> Path:
+        return self.directory / f"{key}.pkl"
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[2]):
+                self._drop(key)
+                self._counts["expired"] += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._counts["hits"] += 1
+                return True, entry[0]
+        if self.directory is not None:
+            path = self._disk_path(key)
+            try:
+                if not self._expired(path.stat().st_mtime):
+                    with path.open("rb") as handle:
+                        value = pickle.load(handle)
+                    self._store(key, value, path.stat().st_mtime)
+                    with self._lock:
+                        self._counts["disk_hits"] += 1
+                    return True, value
+            except (OSError, pickle.UnpicklingError, EOFError):
+                pass
+        with self._lock:
+            self._counts["misses"] += 1
+        return False, None
+
+    def put(self, key: str, value: Any) -> None:
+        self._store(key, value, time.time())
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp = self._disk_path(key).with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            try:
+                with tmp.open("wb") as handle:
+                    pickle.dump(value, handle, protocol=pickle.HIGHEST_PROTOCOL)
+                tmp.replace(self._disk_path(key))
+            except (OSError, pickle.PicklingError, TypeError, AttributeError):
+                tmp.unlink(missing_ok=True)
+
+    def _store(self, key: str, value: Any, stored_at: float) -> None:
+        nbytes = estimate_nbytes(value)
+        with self._lock:
+            self._drop(key)
+            # Results larger than the whole budget are computed but not kept in memory.
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (value, nbytes, stored_at)
+            self._bytes += nbytes
+            while self._entries and (self._bytes > self.max_bytes or len(self._entries) > self.max_entries):
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._counts["evictions"] += 1
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def clear(self, disk: bool = False) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if disk and self.directory is not None and self.directory.exists():
+            for path in self.directory.glob("*.pkl"):
+                path.unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self._counts["hits"] + self._counts["disk_hits"] + self._counts["misses"]
+            return {
+                **self._counts,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hit_rate": (self._counts["hits"] + self._counts["disk_hits"]) / lookups if lookups else 0.0,
+            }
+
+
+_ENGINE_CACHE = MemoCache(directory=os.environ.get(CACHE_DIR_ENV) or None)
+
+
+def engine_cache() -> MemoCache:
+    return _ENGINE_CACHE
+
+
+def configure_engine_cache(**settings: Any) -> MemoCache:
+    global _ENGINE_CACHE
+    _ENGINE_CACHE = MemoCache(**settings)
+    return _ENGINE_CACHE
+
+
+def memoize(
+    func: Optional[Callable[..., Any]] = None,
+    *,
+    cache: Optional[MemoCache] = None,
+    when: Optional[Callable[[Dict[str, Any]], bool]] = None,
+) -> Callable[..., Any]:
+    def decorate(target: Callable[..., Any]) -> Callable[..., Any]:
+        signature = inspect.signature(target)
+
+        @functools.wraps(target)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            # The engine cache is resolved per call so configure_engine_cache applies to decorated engines.
+            store = cache or _ENGINE_CACHE
+            if not store.enabled:
+                return target(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            if when is not None and not when(bound.arguments):
+                return target(*args, **kwargs)
+            key = fingerprint(target, _code_version(target.__module__), **bound.arguments)
+            found, value = store.get(key)
+            if not found:
+                value = target(*args, **kwargs)
+                store.put(key, value)
+            return _detach(value)
+
+        wrapper.uncached = target
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
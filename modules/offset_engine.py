@@ -1,8 +1,14 @@
 from __future__ import annotations
 
-from typing import Dict
+from typing import Dict, Mapping
 
-from modules.utils import clamp
+import numpy as np
+import pandas as pd
+
+from modules.arrow_io import arrow_inputs
+from modules.utils import clamp, coerce_numeric, ensure_required_columns, normalize_columns
+
+REQUIRED_OFFSET_LOT_COLUMNS = {"project", "vintage", "project_type", "volume", "price", "integrity_score"}
 
 
 def simulate_offsets(
@@ -30,3 +36,123 @@ def simulate_offsets(
         "effective_reduction": effective_reduction,
         "residual_emissions": residual_emissions,
     }
+
+
+def _cap_key(value) -> str:
+    # Vintages read from CSV or Excel can arrive as 2019, 2019.0 or "2019"; all map to "2019".
+    text = str(value).strip().lower()
+    try:
+        number = float(text)
+    except ValueError:
+        return text
+    return str(int(number)) if number.is_integer() else text
+
+
+def _cap_keys(values: pd.Series) -> np.ndarray:
+    # Keys are normalized once per distinct label.
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return np.array([_cap_key(value) for value in uniques], dtype=object)[codes]
+
+
+def _group_caps(keys: np.ndarray, caps: Mapping | None) -> np.ndarray:
+    if not caps:
+        return np.full(len(keys), np.inf)
+    return pd.Series(keys).map({_cap_key(k): float(v) for k, v in caps.items()}).fillna(np.inf).to_numpy(dtype=float)
+
+
+def _capped_volume(volume: np.ndarray, keys: np.ndarray, cap: np.ndarray) -> np.ndarray:
+    # Lots are already in merit order; each lot gets what is left of its group cap
+    # after the cheaper lots of the same group.
+    taken_before = pd.Series(volume).groupby(keys, sort=False).cumsum().to_numpy() - volume
+    return np.minimum(np.clip(cap - taken_before, 0.0, None), volume)
+
+
+def _jointly_capped_volume(
+    volume: np.ndarray,
+    vintage_keys: np.ndarray,
+    vintage_cap: np.ndarray,
+    type_keys: np.ndarray,
+    type_cap: np.ndarray,
+) -> np.ndarray:
+    # With both cap kinds set, a lot clipped by one cap must leave the other cap's
+    # headroom to the next cheapest lot, so lots in capped groups take what is left
+    # of both caps in one merit-order pass; uncapped lots keep their full volume.
+    allowed = volume.copy()
+    capped = np.flatnonzero(np.isfinite(vintage_cap) | np.isfinite(type_cap))
+    vintage_left = dict(zip(vintage_keys[capped], vintage_cap[capped]))
+    type_left = dict(zip(type_keys[capped], type_cap[capped]))
+    for position, vintage, project_type in zip(capped.tolist(), vintage_keys[capped], type_keys[capped]):
+        take = max(min(volume[position], vintage_left[vintage], type_left[project_type]), 0.0)
+        vintage_left[vintage] -= take
+        type_left[project_type] -= take
+        allowed[position] = take
+    return allowed
+
+
+@arrow_inputs
+def procure_offsets(
+    total_emissions: float,
+    lots: pd.DataFrame,
+    offset_limit_pct: float,
+    *,
+    vintage_caps: Mapping | None = None,
+    type_caps: Mapping | None = None,
+) -> Dict[str, pd.DataFrame | float]:
+    if lots is None or lots.empty:
+        raise ValueError("Offset lots data is empty.")
+
+    table = normalize_columns(lots.copy())
+    ensure_required_columns(table, REQUIRED_OFFSET_LOT_COLUMNS, "Offset lots")
+    if "quality_discount_factor" not in table.columns:
+        table["quality_discount_factor"] = 1.0
+    table = coerce_numeric(table, ["volume", "price", "integrity_score", "quality_discount_factor"])
+    table["quality_discount_factor"] = table["quality_discount_factor"].fillna(1.0).clip(0.0, 1.5)
+    table["integrity"] = (table["integrity_score"] / 100.0).clip(0.0, 1.0)
+    table = table[(table["volume"] > 0) & (table["integrity"] > 0) & table["price"].notna()]
+
+    # Demand and caps are in integrity-adjusted tonnes, the quantity that reduces
+    # residual emissions; credits purchased are converted back per lot.
+    table["effective_offset_cost"] = table["price"] * table["quality_discount_factor"]
+    table["cost_per_adjusted_tonne"] = table["effective_offset_cost"] / table["integrity"]
+    table["available_adjusted_tonnes"] = table["volume"] * table["integrity"]
+    table = table.sort_values("cost_per_adjusted_tonne", kind="stable").reset_index(drop=True)
+
+    available = table["available_adjusted_tonnes"].to_numpy(dtype=float)
+    vintage_keys = _cap_keys(table["vintage"])
+    type_keys = _cap_keys(table["project_type"])
+    vintage_cap = _group_caps(vintage_keys, vintage_caps)
+    type_cap = _group_caps(type_keys, type_caps)
+    if vintage_caps and type_caps:
+        allowed = _jointly_capped_volume(available, vintage_keys, vintage_cap, type_keys, type_cap)
+    elif vintage_caps:
+        allowed = _capped_volume(available, vintage_keys, vintage_cap)
+    elif type_caps:
+        allowed = _capped_volume(available, type_keys, type_cap)
+    else:
+        allowed = available
+
+    # Filling in merit order and stopping at the demand leaves each lot's cap allowance
+    # unchanged up to the marginal lot, so the demand is applied on sorted cumulative volumes.
+    demand = max(float(total_emissions), 0.0) * clamp(offset_limit_pct, 0.0, 1.0)
+    filled_before = np.cumsum(allowed) - allowed
+    table["procured_adjusted_tonnes"] = np.minimum(np.clip(demand - filled_before, 0.0, None), allowed)
+    table["credits_purchased"] = table["procured_adjusted_tonnes"] / table["integrity"]
+    table["procurement_cost"] = table["credits_purchased"] * table["effective_offset_cost"]
+    table["cumulative_adjusted_tonnes"] = table["procured_adjusted_tonnes"].cumsum()
+
+    procured = float(table["procured_adjusted_tonnes"].sum())
+    total_cost = float(table["procurement_cost"].sum())
+    purchased = table[table["procured_adjusted_tonnes"] > 0]
+    marginal_price = float(purchased["cost_per_adjusted_tonne"].iloc[-1]) if not purchased.empty else 0.0
+
+    return {
+        "schedule": table.drop(columns=["integrity"]),
+        "demand": demand,
+        "procured_adjusted_tonnes": procured,
+        "credits_purchased": float(table["credits_purchased"].sum()),
+        "unmet_demand": max(demand - procured, 0.0),
+        "total_offset_cost": total_cost,
+        "average_offset_price": total_cost / procured if procured > 0 else 0.0,
+        "marginal_offset_price": marginal_price,
+        "residual_emissions": max(float(total_emissions) - procured, 0.0),
+    }
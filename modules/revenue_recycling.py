@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from modules.abatement import evaluate_abatement, initiative_segment_pairs, prepare_initiatives, segment_emissions
+from modules.arrow_io import arrow_inputs
+from modules.emissions_cube import EmissionsCube, as_emissions_cube
+from modules.internal_market import InternalFeeConfig, simulate_internal_fee
+from modules.memo import memoize
+
+
+@dataclass(frozen=True)
+class RecyclingConfig:
+    recycling_share: float = 1.0
+    years: int = 5
+    max_iter: int = 50
+    tolerance: float = 1e-9
+
+
+def _department_units(work: pd.DataFrame, segments: pd.DataFrame, departments: pd.Index, adopted: np.ndarray) -> pd.DataFrame:
+    # Split each initiative into one fundable unit per department it touches; a
+    # department pays for its share of the initiative's abatement cost.
+    initiative_idx, segment_idx = initiative_segment_pairs(work, segments)
+    pct = work["max_reduction_pct"].fillna(0.0).clip(lower=0.0).to_numpy() / 100.0
+    pairs = pd.DataFrame(
+        {
+            "initiative": initiative_idx,
+            "department": segments["department"].to_numpy()[segment_idx],
+            "reduction_potential": pct[initiative_idx] * segments["emissions_tonnes"].to_numpy()[segment_idx],
+        }
+    )
+    units = pairs.groupby(["initiative", "department"], as_index=False, sort=False)["reduction_potential"].sum()
+    initiative_total = units.groupby("initiative")["reduction_potential"].transform("sum")
+    share = np.where(initiative_total > 0, units["reduction_potential"] / initiative_total.where(initiative_total > 0, 1.0), 0.0)
+
+    cost_per_tonne = work["cost_per_tonne"].to_numpy()[units["initiative"]]
+    capex = work["capex"].fillna(0.0).to_numpy()[units["initiative"]]
+    units["initiative_name"] = work["initiative_name"].to_numpy()[units["initiative"]]
+    units["cost_per_tonne"] = cost_per_tonne
+    # Same one-off cost as evaluate_abatement's abatement_cost (variable cost + capex).
+    units["unit_cost"] = units["reduction_potential"] * cost_per_tonne + capex * share
+    units = units[adopted[units["initiative"]] & np.isfinite(units["unit_cost"]) & (units["reduction_potential"] > 0)]
+    units["department_idx"] = departments.get_indexer(units["department"])
+
+    units = units.sort_values(["department_idx", "cost_per_tonne"], kind="stable").reset_index(drop=True)
+    units["cost_before"] = units.groupby("department_idx")["unit_cost"].cumsum() - units["unit_cost"]
+    return units
+
+
+@arrow_inputs
+@memoize
+def simulate_revenue_recycling(
+    initiatives: pd.DataFrame,
+    baseline_detailed: pd.DataFrame | EmissionsCube,
+    fee_config: InternalFeeConfig,
+    recycling: RecyclingConfig | None = None,
+) -> Dict[str, pd.DataFrame | Dict[str, float | int | bool]]:
+    recycling = recycling or RecyclingConfig()
+    work = prepare_initiatives(initiatives).reset_index(drop=True)
+    cube = as_emissions_cube(baseline_detailed)
+    segments = segment_emissions(cube)
+    baseline_dept = segments.groupby("department", sort=True)["emissions_tonnes"].sum()
+    departments = baseline_dept.index
+    rate = float(fee_config.internal_fee_rate)
+    # Budgets only fund initiatives evaluate_abatement adopts with the internal fee as
+    # the carbon price; its MACC is in stable cost order, so map rows back to `work`.
+    macc = evaluate_abatement(initiatives, cube, rate)["macc"]
+    adopted = np.zeros(len(work), dtype=bool)
+    adopted[np.argsort(work["cost_per_tonne"].to_numpy(), kind="stable")] = macc["adopted"].to_numpy(dtype=bool)
+    units = _department_units(work, segments, departments, adopted)
+    # Segments are keyed by lowercased department; results keep the label as first reported.
+    reported = cube.rollup(["department"])["department"].astype(str)
+    labels = reported.groupby(reported.str.lower().to_numpy(), sort=False).first().reindex(departments)
+
+    n_years = max(int(recycling.years), 1)
+    base = baseline_dept.to_numpy(dtype=float)
+    unit_dept = units["department_idx"].to_numpy()
+    unit_cost = units["unit_cost"].to_numpy(dtype=float)
+    cost_before = units["cost_before"].to_numpy(dtype=float)
+    unit_reduction = units["reduction_potential"].to_numpy(dtype=float)
+    share = float(np.clip(recycling.recycling_share, 0.0, 1.0))
+
+    # The fee response without recycling, as simulate_internal_fee reports it.
+    no_recycling = simulate_internal_fee(baseline_dept.reset_index(), fee_config)["table"].set_index("department")
+    response_multiplier = no_recycling["adjusted_emissions"] / no_recycling["emissions_tonnes"].where(
+        no_recycling["emissions_tonnes"] > 0
+    )
+    response_multiplier = response_multiplier.reindex(departments).fillna(1.0).to_numpy()
+
+    # Fixed point over the whole horizon: the abatement funded from year t revenue
+    # lowers emissions (and so revenue) from year t + 1 on. Each pass updates every
+    # department-year at once; because funding lags one year, year t is exact after
+    # t passes, so the loop converges in at most years + 1 iterations.
+    n_units = len(units)
+    flat_index = (unit_dept[:, None] * n_years + np.arange(n_years)[None, :]).ravel()
+
+    def step(current: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        cumulative_budget = np.cumsum(current * rate * share, axis=1)
+        # Water-filling: each department funds its initiatives in cost order from
+        # its cumulative recycled budget; funded abatement persists in later years.
+        budget = cumulative_budget[unit_dept]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            funded = np.where(
+                unit_cost[:, None] > 0,
+                np.clip((budget - cost_before[:, None]) / unit_cost[:, None], 0.0, 1.0),
+                (budget >= cost_before[:, None]).astype(float),
+            )
+        in_effect = np.zeros((n_units, n_years))
+        in_effect[:, 1:] = funded[:, :-1]
+        reduction = np.bincount(
+            flat_index, weights=(in_effect * unit_reduction[:, None]).ravel(), minlength=current.size
+        ).reshape(current.shape)
+        return np.maximum(base[:, None] - reduction, 0.0) * response_multiplier[:, None], funded, reduction
+
+    emissions = np.repeat((base * response_multiplier)[:, None], n_years, axis=1)
+    tolerance = float(recycling.tolerance) * max(float(base.max()) if base.size else 1.0, 1.0)
+    iterations, residual, converged = 0, 0.0, False
+    while iterations < max(int(recycling.max_iter), 1):
+        updated, funded, reduction = step(emissions)
+        residual = float(np.max(np.abs(updated - emissions))) if emissions.size else 0.0
+        emissions = updated
+        iterations += 1
+        if residual <= tolerance:
+            converged = True
+            break
+
+    revenue = emissions * rate
+    years = np.arange(1, n_years + 1)
+    yearly = pd.DataFrame(
+        {
+            "year": np.tile(years, len(departments)),
+            "department": np.repeat(labels.to_numpy(), n_years),
+            "baseline_emissions": np.repeat(base, n_years),
+            "funded_reduction": reduction.ravel(),
+            "emissions_tonnes": emissions.ravel(),
+            "fee_revenue": revenue.ravel(),
+            "recycled_budget": (revenue * share).ravel(),
+        }
+    )
+    totals = yearly.groupby("year", as_index=False)[
+        ["baseline_emissions", "funded_reduction", "emissions_tonnes", "fee_revenue", "recycled_budget"]
+    ].sum()
+
+    funding = units[["initiative_name", "department", "cost_per_tonne", "unit_cost", "reduction_potential"]].copy()
+    funding["department"] = labels.to_numpy()[units["department_idx"].to_numpy()]
+    funding["funded_share"] = funded[:, -1] if len(units) else []
+    funding["first_funded_year"] = np.where(funded.any(axis=1), (funded > 0).argmax(axis=1) + 1, 0) if len(units) else []
+
+    diagnostics = {"iterations": iterations, "residual": residual, "converged": converged}
+    return {"yearly": yearly, "totals": totals, "funding": funding, "diagnostics": diagnostics}
@@ -0,0 +1,478 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from modules.abatement import evaluate_abatement_prices
+from modules.cap_and_trade import CapTradeConfig, simulate_cap_and_trade
+from modules.carbon_pricing import CarbonPricingConfig, run_price_scenarios
+from modules.dataset_registry import DatasetLease, DatasetRegistry, content_key, default_registry
+from modules.emissions_engine import calculate_emissions
+from modules.internal_market import fee_table_at_rate, sweep_internal_fees
+from modules.memo import engine_cache
+from modules.offset_engine import simulate_offsets
+
+HTTP_REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class ServiceError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class ServiceConfig:
+    host: str = "127.0.0.1"
+    port: int = 8765
+    batch_window: float = 0.002
+    max_batch: int = 256
+
+
+def _json_ready(value: Any) -> Any:
+    if isinstance(value, pd.DataFrame):
+        columns = {str(name): value[name].tolist() for name in value.columns}
+        return [_json_ready(dict(zip(columns, row))) for row in zip(*columns.values())]
+    if isinstance(value, dict):
+        return {str(key): _json_ready(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_ready(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+
+class MicroBatcher:
+    # Requests sharing a group key that arrive within one batch window are
+    # evaluated together in a worker thread; evaluate returns one result (or
+    # exception) per item, in order.
+    def __init__(
+        self,
+        evaluate: Callable[[Hashable, List[Any]], List[Any]],
+        window: float = 0.002,
+        max_batch: int = 256,
+    ):
+        self.evaluate = evaluate
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self.items = 0
+        self._pending: Dict[Hashable, List[Tuple[Any, asyncio.Future]]] = {}
+
+    async def submit(self, group: Hashable, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.get(group)
+        if pending is None:
+            pending = self._pending[group] = []
+            loop.call_later(self.window, self._flush, group, pending)
+        pending.append((item, future))
+        if len(pending) >= self.max_batch:
+            self._flush(group, pending)
+        return await future
+
+    def _flush(self, group: Hashable, pending: List[Tuple[Any, asyncio.Future]]) -> None:
+        if self._pending.get(group) is not pending:
+            return
+        del self._pending[group]
+        asyncio.ensure_future(self._run(group, pending))
+
+    async def _run(self, group: Hashable, pending: List[Tuple[Any, asyncio.Future]]) -> None:
+        self.batches += 1
+        self.items += len(pending)
+        items = [item for item, _ in pending]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(None, self.evaluate, group, items)
+        except Exception as exc:
+            results = [exc] * len(pending)
+        for (_, future), result in zip(pending, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+class SimulationService:
+    def __init__(self, config: Optional[ServiceConfig] = None, registry: Optional[DatasetRegistry] = None):
+        self.config = config or ServiceConfig()
+        self.registry = registry or default_registry()
+        self._leases: Dict[str, DatasetLease] = {}
+        # Uploads are registered in executor threads.
+        self._leases_lock = threading.Lock()
+
+        def batcher(evaluate: Callable[[Hashable, List[Any]], List[Any]]) -> MicroBatcher:
+            # Results are converted to JSON-ready values inside the batch, off the event loop.
+            def evaluate_json(group: Hashable, items: List[Any]) -> List[Any]:
+                return [result if isinstance(result, Exception) else _json_ready(result) for result in evaluate(group, items)]
+
+            return MicroBatcher(evaluate_json, self.config.batch_window, self.config.max_batch)
+
+        self._batchers = {
+            "emissions": batcher(self._emissions_batch),
+            "price-scenarios": batcher(self._price_batch),
+            "internal-fee": batcher(self._internal_fee_batch),
+            "abatement": batcher(self._abatement_batch),
+        }
+        # Single closed-form evaluations gain nothing from batching, so they are answered directly.
+        self._direct: Dict[str, Callable[[Any], Any]] = {"cap-and-trade": self._cap_and_trade, "offsets": self._offsets}
+
+    def register_dataset(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if "csv" in payload:
+            frame = pd.read_csv(io.StringIO(str(payload["csv"])))
+        elif isinstance(payload.get("activities"), list):
+            frame = pd.DataFrame(payload["activities"])
+        else:
+            raise ServiceError(400, "Provide activities as a list of records or as csv text.")
+        key = content_key(frame)
+        with self._leases_lock:
+            lease = self._leases.get(key)
+        if lease is None:
+            # Validate before keeping the dataset; the baseline is then shared by every request.
+            lease = self.registry.lease(frame, key)
+            try:
+                lease.derived("emissions", calculate_emissions)
+            except ValueError:
+                lease.release()
+                raise
+            with self._leases_lock:
+                kept = self._leases.setdefault(key, lease)
+            if kept is not lease:
+                # A concurrent upload of the same content registered first.
+                lease.release()
+                lease = kept
+        return {"dataset": key, "rows": len(lease.frame)}
+
+    def release_dataset(self, key: str) -> Dict[str, Any]:
+        with self._leases_lock:
+            lease = self._leases.pop(key, None)
+        if lease is None:
+            raise ServiceError(404, f"Unknown dataset '{key}'.")
+        lease.release()
+        return {"dataset": key, "released": True}
+
+    def _baseline(self, key: Any) -> Dict[str, Any]:
+        with self._leases_lock:
+            lease = self._leases.get(str(key))
+        if lease is None:
+            raise ServiceError(404, f"Unknown dataset '{key}'. Upload it to /datasets first.")
+        return lease.derived("emissions", calculate_emissions)
+
+    def _total_emissions(self, payload: Dict[str, Any], field: str) -> float:
+        if field in payload:
+            return float(payload[field])
+        if "dataset" in payload:
+            return float(self._baseline(payload["dataset"])["total_emissions"])
+        raise ServiceError(400, f"Provide a dataset hash or {field}.")
+
+    def _emissions_batch(self, dataset: Hashable, items: List[Any]) -> List[Any]:
+        result = self._baseline(dataset)
+        summary = {
+            "dataset": dataset,
+            "total_emissions": result["total_emissions"],
+            "scope_totals": result["scope_totals"],
+            "by_scope": result["by_scope"],
+            "by_department": result["by_department"],
+        }
+        return [summary] * len(items)
+
+    def _price_batch(self, group: Hashable, items: List[Any]) -> List[Any]:
+        # Every request's prices are evaluated in one vectorized sweep, then sliced back out.
+        total, elasticity, fuel_switching, efficiency = group
+        config = CarbonPricingConfig(elasticity, fuel_switching, efficiency)
+        sweep = run_price_scenarios(total, np.unique(np.concatenate([np.asarray(item, dtype=float) for item in items])), config)
+        indexed = sweep.set_index("carbon_price", drop=False)
+        return [indexed.loc[np.sort(np.asarray(item, dtype=float))].reset_index(drop=True) for item in items]
+
+    def _internal_fee_batch(self, group: Hashable, items: List[Any]) -> List[Any]:
+        dataset, response_factor = group
+        departments = self._baseline(dataset)["by_department"]
+        sweep = sweep_internal_fees(departments, sorted(set(items)), response_factors=response_factor, response_curve="linear")
+        results = []
+        for rate in items:
+            table = fee_table_at_rate(sweep, rate).drop(columns="response_factor")
+            results.append(
+                {
+                    "table": table,
+                    "total_fee_cost": float(table["fee_cost"].sum()),
+                    "total_adjusted_emissions": float(table["adjusted_emissions"].sum()),
+                    "total_reduction": float(table["emissions_reduction"].sum()),
+                }
+            )
+        return results
+
+    def _abatement_batch(self, group: Hashable, items: List[Any]) -> List[Any]:
+        # Every distinct carbon price for a shared dataset, portfolio and finance
+        # settings is evaluated in one vectorized call.
+        dataset, initiatives_json, discount_rate, analysis_years, growth, sequential = group
+        cube = self._baseline(dataset)["cube"]
+        initiatives = pd.read_json(io.StringIO(initiatives_json), orient="records")
+        prices = sorted(set(items))
+        evaluated = evaluate_abatement_prices(
+            initiatives,
+            cube,
+            prices,
+            discount_rate=discount_rate,
+            analysis_years=analysis_years,
+            annual_savings_growth=growth,
+            sequential=sequential,
+        )
+        results = dict(zip(prices, evaluated))
+        return [results[price] for price in items]
+
+    def _cap_and_trade(self, item: Tuple[float, Dict[str, Any], float]) -> Dict[str, float]:
+        emissions, config, offsets_used = item
+        return simulate_cap_and_trade(emissions, CapTradeConfig(**config), offsets_used)
+
+    def _offsets(self, item: Dict[str, Any]) -> Dict[str, float]:
+        return simulate_offsets(**item)
+
+    async def handle(self, method: str, path: str, payload: Dict[str, Any]) -> Tuple[int, Any]:
+        parts = [part for part in path.split("?", 1)[0].split("/") if part]
+        if method == "GET" and parts == ["health"]:
+            return 200, {"status": "ok"}
+        if method == "GET" and parts == ["stats"]:
+            return 200, self.stats()
+        if parts[:1] == ["datasets"]:
+            if method == "POST" and len(parts) == 1:
+                return 201, await asyncio.get_running_loop().run_in_executor(None, self.register_dataset, payload)
+            if method == "DELETE" and len(parts) == 2:
+                return 200, self.release_dataset(parts[1])
+            raise ServiceError(405, f"{method} is not supported on {path}.")
+        if len(parts) != 1 or (parts[0] not in self._batchers and parts[0] not in self._direct):
+            raise ServiceError(404, f"Unknown endpoint {path}.")
+        if method != "POST":
+            raise ServiceError(405, f"{method} is not supported on {path}.")
+        group, item = self._batch_request(parts[0], payload)
+        if parts[0] in self._direct:
+            return 200, self._direct[parts[0]](item)
+        return 200, await self._batchers[parts[0]].submit(group, item)
+
+    def _batch_request(self, endpoint: str, payload: Dict[str, Any]) -> Tuple[Hashable, Any]:
+        if endpoint == "emissions":
+            dataset = str(payload.get("dataset", ""))
+            self._baseline(dataset)
+            return dataset, None
+        if endpoint == "price-scenarios":
+            config = payload.get("config", {})
+            prices = payload.get("prices", list(range(0, 251)))
+            group = (
+                self._total_emissions(payload, "total_emissions"),
+                float(config.get("elasticity", 0.0)),
+                float(config.get("fuel_switching_factor", 0.0)),
+                float(config.get("energy_efficiency_factor", 0.0)),
+            )
+            return group, [float(price) for price in prices]
+        if endpoint == "internal-fee":
+            config = payload.get("config", {})
+            dataset = str(payload.get("dataset", ""))
+            self._baseline(dataset)
+            return (dataset, float(config.get("response_factor", 0.0))), float(config.get("internal_fee_rate", 0.0))
+        if endpoint == "abatement":
+            dataset = str(payload.get("dataset", ""))
+            self._baseline(dataset)
+            group = (
+                dataset,
+                json.dumps(payload.get("initiatives", []), sort_keys=True),
+                float(payload.get("discount_rate", 0.08)),
+                int(payload.get("analysis_years", 10)),
+                float(payload.get("annual_savings_growth", 0.0)),
+                bool(payload.get("sequential", False)),
+            )
+            return group, float(payload.get("carbon_price", 0.0))
+        if endpoint == "cap-and-trade":
+            emissions = self._total_emissions(payload, "emissions_tonnes")
+            return payload.get("dataset", "inline"), (emissions, dict(payload.get("config", {})), float(payload.get("offsets_used", 0.0)))
+        emissions = self._total_emissions(payload, "total_emissions")
+        item = {
+            "total_emissions": emissions,
+            "offset_price": float(payload.get("offset_price", 0.0)),
+            "integrity_score": float(payload.get("integrity_score", 100.0)),
+            "offset_limit_pct": float(payload.get("offset_limit_pct", 0.0)),
+            "quality_discount_factor": float(payload.get("quality_discount_factor", 1.0)),
+        }
+        return payload.get("dataset", "inline"), item
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "datasets": len(self._leases),
+            "registry_bytes": self.registry.total_bytes,
+            "engine_cache": engine_cache().stats(),
+            "batches": {
+                name: {
+                    "batches": batcher.batches,
+                    "requests": batcher.items,
+                    "mean_batch_size": batcher.items / batcher.batches if batcher.batches else 0.0,
+                }
+                for name, batcher in self._batchers.items()
+            },
+        }
+
+    async def _respond(self, method: str, path: str, body: bytes) -> Tuple[int, Any]:
+        try:
+            payload = json.loads(body) if body.strip() else {}
+            if not isinstance(payload, dict):
+                raise ServiceError(400, "Request body must be a JSON object.")
+            status, result = await self.handle(method, path, payload)
+            return status, _json_ready(result)
+        except ServiceError as exc:
+            return exc.status, {"error": str(exc)}
+        except (ValueError, TypeError, KeyError) as exc:
+            return 400, {"error": str(exc)}
+        except Exception as exc:
+            return 500, {"error": f"{type(exc).__name__}: {exc}"}
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target = request_line.decode("latin-1").split()[:2]
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length") or 0))
+                status, result = await self._respond(method.upper(), target, body)
+                data = json.dumps(result).encode("utf-8")
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    (
+                        f"HTTP/1.1 {status} {HTTP_REASONS.get(status, 'OK')}\r\n"
+                        "Content-Type: application/json\r\n"
+                        f"Content-Length: {len(data)}\r\n"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                    ).encode("latin-1")
+                    + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self._serve_connection, self.config.host, self.config.port)
+
+    async def serve_forever(self) -> None:
+        server = await self.start()
+        async with server:
+            await server.serve_forever()
+
+
+async def _request(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    method: str,
+    path: str,
+    payload: Optional[Dict[str, Any]] = None,
+) -> Tuple[int, Any]:
+    body = json.dumps(payload or {}).encode("utf-8")
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode(
+            "latin-1"
+        )
+        + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def run_load_test(
+    activities: pd.DataFrame,
+    *,
+    requests: int = 2_000,
+    concurrency: int = 64,
+    config: Optional[ServiceConfig] = None,
+) -> Dict[str, float]:
+    # Starts the service on an ephemeral port and drives it with keep-alive
+    # clients issuing a mix of price, fee, offset and cap-and-trade requests.
+    config = config or ServiceConfig(port=0)
+    service = SimulationService(config, DatasetRegistry())
+    server = await service.start()
+    port = server.sockets[0].getsockname()[1]
+    latencies: List[float] = []
+    failures = 0
+
+    async with server:
+        reader, writer = await asyncio.open_connection(config.host, port)
+        status, uploaded = await _request(reader, writer, "POST", "/datasets", {"activities": json.loads(activities.to_json(orient="records"))})
+        writer.close()
+        if status != 201:
+            raise ValueError(f"Dataset upload failed: {uploaded}")
+        dataset = uploaded["dataset"]
+
+        def payload(index: int) -> Tuple[str, Dict[str, Any]]:
+            kind = index % 4
+            if kind == 0:
+                return "/price-scenarios", {"dataset": dataset, "prices": [index % 250], "config": {"elasticity": 0.1}}
+            if kind == 1:
+                return "/internal-fee", {"dataset": dataset, "config": {"internal_fee_rate": index % 300, "response_factor": 0.15}}
+            if kind == 2:
+                return "/offsets", {"dataset": dataset, "offset_price": 18.0, "offset_limit_pct": 0.15}
+            return "/cap-and-trade", {
+                "dataset": dataset,
+                "config": {
+                    "annual_cap": 1_000.0,
+                    "free_allocations": 700.0,
+                    "trading_limit_pct": 1.0,
+                    "offset_limit_pct": 0.1,
+                    "base_price": 45.0,
+                    "scarcity_factor": 1.0,
+                },
+            }
+
+        counter = iter(range(requests))
+
+        async def client() -> None:
+            nonlocal failures
+            reader, writer = await asyncio.open_connection(config.host, port)
+            for index in counter:
+                path, body = payload(index)
+                started = time.perf_counter()
+                status, _ = await _request(reader, writer, "POST", path, body)
+                latencies.append(time.perf_counter() - started)
+                failures += status != 200
+            writer.close()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latency_ms = np.asarray(latencies) * 1_000.0
+    batches = service.stats()["batches"]
+    return {
+        "requests": float(len(latencies)),
+        "failures": float(failures),
+        "requests_per_second": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": float(np.percentile(latency_ms, 50)) if len(latency_ms) else 0.0,
+        "p99_ms": float(np.percentile(latency_ms, 99)) if len(latency_ms) else 0.0,
+        "mean_batch_size": sum(item["requests"] for item in batches.values())
+        / max(sum(item["batches"] for item in batches.values()), 1),
+    }
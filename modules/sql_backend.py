@@ -0,0 +1,407 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from modules.dataset_registry import content_key
+from modules.emissions_cube import CUBE_DIMENSIONS, CUBE_MEASURES, EmissionsCube, FilterValue, segment_totals
+from modules.emissions_engine import period_issue_frame, period_issues, summarize_emissions, validate_activities
+from modules.excel_parser import _resolve_paths, parse_path
+from modules.unit_conversion import unit_scale_factors
+from modules.utils import compress_keys, factorize_labels
+
+SQL_SUFFIXES = {".db", ".sqlite", ".sqlite3"}
+SQL_CHUNK_ROWS = 500_000
+SQL_INSERT_ROWS = 50_000
+_TEXT_COLUMNS = ("department", "scope", "activity", "source", "unit", "factor_unit", "period")
+# Queries read the cells table: reported amount and amount x emission_factor summed per
+# distinct combination of the cube dimensions and the unit key, kept up to date on append.
+# Unit scales are constant per (activity, unit, factor_unit) key, so they are applied to
+# cell sums at query time.
+_MEASURE_SQL = {
+    "emissions_tonnes": "SUM(c.emissions * s.scale)",
+    "amount": "SUM(c.amount * s.scale)",
+}
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS activities (
+    department TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    activity TEXT NOT NULL,
+    source TEXT NOT NULL,
+    unit TEXT NOT NULL,
+    factor_unit TEXT NOT NULL,
+    period TEXT,
+    amount REAL NOT NULL,
+    emission_factor REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cells (
+    department TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    activity TEXT NOT NULL,
+    source TEXT NOT NULL,
+    unit TEXT NOT NULL,
+    factor_unit TEXT NOT NULL,
+    period TEXT NOT NULL,
+    amount REAL NOT NULL,
+    emissions REAL NOT NULL,
+    rows INTEGER NOT NULL,
+    UNIQUE (department, scope, activity, source, unit, factor_unit, period)
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS period_issues (
+    source_column TEXT NOT NULL,
+    value TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    PRIMARY KEY (source_column, value)
+);
+"""
+
+
+# Databases written before the cells table existed are aggregated once when opened.
+_REBUILD_CELLS = """
+INSERT INTO cells
+SELECT department, scope, activity, source, unit, factor_unit, COALESCE(period, ''),
+       SUM(amount), SUM(amount * emission_factor), COUNT(*)
+FROM activities
+GROUP BY department, scope, activity, source, unit, factor_unit, COALESCE(period, '')
+ORDER BY MIN(rowid)
+"""
+_UPSERT_CELLS = """
+INSERT INTO cells VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (department, scope, activity, source, unit, factor_unit, period) DO UPDATE SET
+    amount = amount + excluded.amount, emissions = emissions + excluded.emissions, rows = rows + excluded.rows
+"""
+
+
+def _workbook_activities(path: str) -> pd.DataFrame:
+    parsed = parse_path(path)
+    return parsed.departments if parsed.activities.empty else parsed.activities
+
+
+def _column(dim: str) -> str:
+    return "s.unit_label" if dim == "unit" else f"c.{dim}"
+
+
+class SQLiteActivityBackend:
+    # Activities live in an embedded SQLite table. The queries the engines ask of an
+    # EmissionsCube (rollup, total, segments) and top-N lists run as GROUP BY queries,
+    # so only aggregated rows come back into pandas.
+    def __init__(self, path: str | Path = ":memory:", unit_conversions: Optional[pd.DataFrame] = None):
+        self.path = str(path)
+        self.unit_conversions = unit_conversions
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        with self._conn:
+            has_cells = self._conn.execute("SELECT 1 FROM cells LIMIT 1").fetchone()
+            if not has_cells and self._conn.execute("SELECT 1 FROM activities LIMIT 1").fetchone():
+                self._conn.execute(_REBUILD_CELLS)
+        if self.path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA temp_store=MEMORY")
+        self._prepared: Optional[str] = None
+        self._unit_issues = pd.DataFrame()
+        self._cached: Dict[str, Any] = {}
+
+    def __repr__(self) -> str:
+        # Engine memo keys fingerprint arguments by repr; the version changes on every append.
+        conversions = "none" if self.unit_conversions is None else content_key(self.unit_conversions)
+        return f"SQLiteActivityBackend({self.path!r}, version={self.version!r}, conversions={conversions!r})"
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COALESCE(SUM(rows), 0) FROM cells").fetchone()[0])
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return None if row is None else row[0]
+
+    @property
+    def version(self) -> Optional[str]:
+        with self._lock:
+            return self._meta("version")
+
+    @property
+    def dimensions(self) -> Tuple[str, ...]:
+        with self._lock:
+            has_period = self._meta("has_period") == "1"
+        return tuple(dim for dim in CUBE_DIMENSIONS if dim != "period" or has_period)
+
+    def append(self, activities: pd.DataFrame) -> int:
+        with self._lock, self._conn:
+            return self._insert(activities)
+
+    def _insert(self, activities: pd.DataFrame) -> int:
+        # Runs inside the caller's transaction, so a file appended in chunks lands whole or not at all.
+        detailed = validate_activities(activities)
+        has_period = "period" in detailed.columns
+        amount = detailed["amount"].to_numpy(dtype=float)
+        factor = detailed["emission_factor"].to_numpy(dtype=float)
+
+        # Each text column is factorized once; the codes give both the row-level text and
+        # the cell key, so cells are summed with bincount instead of a string groupby.
+        text: Dict[str, np.ndarray] = {}
+        flat = np.zeros(len(detailed), dtype=np.int64)
+        shape = []
+        for name in _TEXT_COLUMNS:
+            if name in detailed.columns:
+                codes, labels = factorize_labels(detailed[name])
+                labels = labels.to_numpy(dtype=object)
+                if name == "period":
+                    # Undated rows are NULL in activities and '' in cells, where the period is part of the key.
+                    labels = np.where(np.isin(labels, ["nan", "NaT"]), "", labels)
+            else:
+                codes, labels = np.zeros(len(detailed), dtype=np.int64), np.array([""], dtype=object)
+            text[name] = labels[codes]
+            flat *= len(labels)
+            flat += codes
+            shape.append(len(labels))
+        cell_index, cell_keys = compress_keys(flat, int(np.prod(shape, dtype=object)))
+        # Cells keep first-appearance order, which the unit-issue summary follows.
+        _, first = np.unique(cell_index, return_index=True)
+        order = np.argsort(first, kind="stable")
+        sums = [np.bincount(cell_index, weights=values, minlength=len(cell_keys))[order] for values in (amount, amount * factor)]
+        rows = np.bincount(cell_index, minlength=len(cell_keys))[order]
+        cell_rows = first[order]
+        cells = zip(*(text[name][cell_rows].tolist() for name in _TEXT_COLUMNS), sums[0].tolist(), sums[1].tolist(), rows.tolist())
+        issues = period_issues(detailed)
+
+        stored = self._meta("has_period")
+        if stored is not None and stored != str(int(has_period)):
+            raise ValueError("Activities appended to one backend must all have a period column or all lack one.")
+        # Row-level inserts go in bounded batches, so the Python objects held at once stay small.
+        raw_period = np.where(text["period"] == "", None, text["period"])
+        for start in range(0, len(detailed), SQL_INSERT_ROWS):
+            stop = start + SQL_INSERT_ROWS
+            columns = [text[name][start:stop].tolist() for name in _TEXT_COLUMNS[:-1]]
+            columns += [raw_period[start:stop].tolist(), amount[start:stop].tolist(), factor[start:stop].tolist()]
+            self._conn.executemany("INSERT INTO activities VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", zip(*columns))
+        self._conn.executemany(_UPSERT_CELLS, cells)
+        self._conn.executemany(
+            "INSERT INTO period_issues VALUES (?, ?, ?) "
+            "ON CONFLICT (source_column, value) DO UPDATE SET rows = rows + excluded.rows",
+            zip(issues["column"], issues["value"], issues["rows"].tolist()),
+        )
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+            [("has_period", str(int(has_period))), ("version", uuid.uuid4().hex)],
+        )
+        return len(detailed)
+
+    def append_csv(self, path: str | Path, chunksize: int = SQL_CHUNK_ROWS) -> int:
+        # Files larger than memory are validated and inserted one chunk at a time.
+        with self._lock, self._conn:
+            return sum(self._insert(chunk) for chunk in pd.read_csv(path, chunksize=chunksize))
+
+    def append_files(self, path_or_glob: str | Path, *, max_workers: Optional[int] = None, chunksize: int = SQL_CHUNK_ROWS) -> pd.DataFrame:
+        # Streams a folder or glob of site files into the database without merging them in
+        # memory: CSVs are appended chunk by chunk, workbooks are parsed in worker processes
+        # and appended one file at a time. One bad file is reported and does not stop the rest.
+        paths = _resolve_paths(path_or_glob)
+        if not paths:
+            raise ValueError(f"No CSV or XLSX files found for: {path_or_glob}")
+        csvs = [path for path in paths if path.suffix.lower() == ".csv"]
+        workbooks = [str(path) for path in paths if path.suffix.lower() != ".csv"]
+        results: Dict[str, Tuple[int, Optional[str]]] = {}
+
+        def record(path: str, load) -> None:
+            try:
+                results[path] = (load(), None)
+            except Exception as exc:
+                results[path] = (0, f"{type(exc).__name__}: {exc}")
+
+        workers = min(max_workers or os.cpu_count() or 1, len(workbooks))
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                # At most two parsed workbooks per worker wait in memory for the writer.
+                pending = {}
+                queue = iter(workbooks)
+                for path in islice(queue, 2 * workers):
+                    pending[pool.submit(_workbook_activities, path)] = path
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        path = pending.pop(future)
+                        record(path, lambda: self.append(future.result()))
+                        for following in islice(queue, 1):
+                            pending[pool.submit(_workbook_activities, following)] = following
+        else:
+            for path in workbooks:
+                record(path, lambda: self.append(_workbook_activities(path)))
+        for path in csvs:
+            record(str(path), lambda: self.append_csv(path, chunksize))
+
+        names = [str(path) for path in paths]
+        return pd.DataFrame(
+            {
+                "path": names,
+                "status": ["ok" if results[name][1] is None else "failed" for name in names],
+                "error": [results[name][1] for name in names],
+                "activity_rows": [results[name][0] for name in names],
+            }
+        )
+
+    def _prepare(self) -> None:
+        # Unit scales depend on every row (the dominant unit per activity), so they are
+        # resolved once per data version from per-key row counts into a temp table.
+        version = self._meta("version")
+        if self._prepared == version:
+            return
+        keys = pd.read_sql_query(
+            "SELECT activity, unit, factor_unit, SUM(rows) AS rows FROM cells "
+            "GROUP BY activity, unit, factor_unit ORDER BY MIN(rowid)",
+            self._conn,
+        )
+        if keys.empty:
+            raise ValueError("Activities data is empty.")
+        units = unit_scale_factors(keys, self.unit_conversions, rows=keys["rows"].to_numpy())
+        with self._conn:
+            self._conn.execute("DROP TABLE IF EXISTS temp.unit_scales")
+            self._conn.execute(
+                "CREATE TEMP TABLE unit_scales (activity TEXT, unit TEXT, factor_unit TEXT, scale REAL, unit_label TEXT, "
+                "PRIMARY KEY (activity, unit, factor_unit))"
+            )
+            self._conn.executemany(
+                "INSERT INTO unit_scales VALUES (?, ?, ?, ?, ?)",
+                zip(keys["activity"], keys["unit"], keys["factor_unit"], units["scale"].tolist(), list(units["unit"])),
+            )
+        self._unit_issues = units["summary"][~units["summary"]["convertible"]].reset_index(drop=True)
+        self._cached = {}
+        self._prepared = version
+
+    def _where(self, filters: Dict[str, FilterValue]) -> Tuple[str, List[str]]:
+        # Same matching rules as EmissionsCube filters: case-insensitive, "all" or blank is a wildcard.
+        # SQLite's lower() folds ASCII letters only.
+        clauses, params = [], []
+        for dim, value in filters.items():
+            if dim not in self.dimensions:
+                raise ValueError(f"Emissions cube has no dimension '{dim}'.")
+            if value is None:
+                continue
+            values = [value] if isinstance(value, str) else list(value)
+            keys = [str(item).strip().lower() for item in values]
+            if any(key in ("", "all") for key in keys):
+                continue
+            clauses.append(f"lower({_column(dim)}) IN ({', '.join('?' * len(keys))})")
+            params.extend(keys)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _query(self, dims: Sequence[str], measures: Sequence[str], filters: Dict[str, FilterValue]) -> pd.DataFrame:
+        unknown = set(dims) - set(self.dimensions)
+        if unknown:
+            raise ValueError(f"Emissions cube has no dimension(s): {', '.join(sorted(unknown))}")
+        unsupported = set(measures) - set(_MEASURE_SQL)
+        if unsupported:
+            raise ValueError(f"Unsupported measure(s): {', '.join(sorted(unsupported))}")
+
+        # Rows come back in cube dimension order, like EmissionsCube.rollup.
+        ordered = [dim for dim in self.dimensions if dim in dims]
+        select = [f"{_column(dim)} AS {dim}" for dim in ordered] + [f"{_MEASURE_SQL[name]} AS {name}" for name in measures]
+        where, params = self._where(filters)
+        sql = f"SELECT {', '.join(select)} FROM cells AS c JOIN unit_scales AS s USING (activity, unit, factor_unit){where}"
+        if ordered:
+            positions = ", ".join(str(position) for position in range(1, len(ordered) + 1))
+            sql += f" GROUP BY {positions} ORDER BY {positions}"
+        with self._lock:
+            self._prepare()
+            rows = self._conn.execute(sql, params).fetchall()
+        values = list(zip(*rows)) if rows else [()] * len(select)
+        # Periods are stored as YYYY-MM text, the label form the cube uses too; '' marks undated rows.
+        out = pd.DataFrame({dim: np.asarray(values[position], dtype=object) for position, dim in enumerate(ordered)})
+        if "period" in out.columns:
+            out["period"] = out["period"].where(out["period"] != "", None)
+        for offset, name in enumerate(measures, start=len(ordered)):
+            out[name] = np.nan_to_num(np.asarray(values[offset], dtype=float))
+        return out[[*dims, *measures]]
+
+    def rollup(
+        self,
+        dimensions: Sequence[str] = (),
+        measure: str | Sequence[str] = "emissions_tonnes",
+        **filters: FilterValue,
+    ) -> pd.DataFrame:
+        dims = (dimensions,) if isinstance(dimensions, str) else tuple(dimensions)
+        measures = (measure,) if isinstance(measure, str) else tuple(measure)
+        return self._query(dims, measures, filters)
+
+    def total(self, measure: str = "emissions_tonnes", **filters: FilterValue) -> float:
+        return float(self._query((), (measure,), filters)[measure].sum())
+
+    def segments(self) -> pd.DataFrame:
+        with self._lock:
+            self._prepare()
+            if "segments" not in self._cached:
+                self._cached["segments"] = segment_totals(self.rollup(["department", "scope"]))
+            return self._cached["segments"].copy()
+
+    def top_n(
+        self,
+        dimension: str,
+        n: int = 10,
+        measure: str = "emissions_tonnes",
+        *,
+        other: bool = False,
+        **filters: FilterValue,
+    ) -> pd.DataFrame:
+        # Largest groups first (ties by label), as rollup(...).sort_values(descending).head(n);
+        # with other=True the remaining groups are folded into one "Other (k)" row.
+        if dimension not in self.dimensions:
+            raise ValueError(f"Emissions cube has no dimension '{dimension}'.")
+        if measure not in _MEASURE_SQL:
+            raise ValueError(f"Unsupported measure(s): {measure}")
+        where, params = self._where(filters)
+        sql = (
+            f"SELECT {_column(dimension)} AS label, {_MEASURE_SQL[measure]} AS value, "
+            f"COUNT(*) OVER () AS groups, SUM({_MEASURE_SQL[measure]}) OVER () AS total "
+            f"FROM cells AS c JOIN unit_scales AS s USING (activity, unit, factor_unit){where} "
+            "GROUP BY 1 ORDER BY 2 DESC, 1 LIMIT ?"
+        )
+        with self._lock:
+            self._prepare()
+            rows = self._conn.execute(sql, [*params, int(n)]).fetchall()
+        out = pd.DataFrame(
+            {
+                dimension: np.asarray([row[0] for row in rows], dtype=object),
+                measure: np.asarray([row[1] for row in rows], dtype=float),
+            }
+        )
+        if other and rows and rows[0][2] > len(rows):
+            rest = {dimension: f"Other ({rows[0][2] - len(rows):,})", measure: float(rows[0][3]) - float(out[measure].sum())}
+            out = pd.concat([out.astype({dimension: object}), pd.DataFrame([rest])], ignore_index=True)
+        return out
+
+    def cube(self) -> EmissionsCube:
+        # Cell-level cube (one row per distinct dimension combination) for callers that
+        # need labels or run many queries; built by a single GROUP BY over all dimensions.
+        with self._lock:
+            self._prepare()
+            if "cube" not in self._cached:
+                self._cached["cube"] = EmissionsCube.from_detailed(self._query(self.dimensions, CUBE_MEASURES, {}))
+            return self._cached["cube"]
+
+    def unit_issues(self) -> pd.DataFrame:
+        with self._lock:
+            self._prepare()
+            return self._unit_issues.copy()
+
+    def period_issues(self) -> pd.DataFrame:
+        with self._lock:
+            rows = self._conn.execute("SELECT source_column, value, rows FROM period_issues ORDER BY rowid").fetchall()
+        return period_issue_frame(rows)
+
+    def emissions_summary(self) -> Dict[str, Any]:
+        # calculate_emissions' result without the row-level `detailed` frame, which stays in the database.
+        return summarize_emissions(None, self.cube(), self.unit_issues(), self.period_issues())
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+
+from modules.abatement import initiative_segment_pairs, prepare_initiatives, segment_emissions
+from modules.arrow_io import arrow_inputs
+from modules.emissions_cube import EmissionsCube
+from modules.memo import memoize
+
+SEGMENT_LEVELS = ("total", "department", "scope")
+
+
+@dataclass
+class TargetPriceCurve:
+    sorted_costs: np.ndarray
+    initiative_names: np.ndarray
+    cumulative: Dict[str, np.ndarray]
+    baselines: Dict[str, np.ndarray]
+    labels: Dict[str, np.ndarray]
+    break_even: pd.DataFrame
+
+
+def annuity_factor(discount_rate: float, analysis_years: int, annual_savings_growth: float = 0.0) -> float:
+    # Present value of 1 unit of net benefit in year 1 growing at annual_savings_growth,
+    # matching the cash flow layout used by evaluate_abatement.
+    discount = 1.0 + float(discount_rate)
+    ratio = (1.0 + float(annual_savings_growth)) / discount
+    years = int(analysis_years)
+    if np.isclose(ratio, 1.0):
+        return years / discount
+    return (1.0 - ratio**years) / (1.0 - ratio) / discount
+
+
+def break_even_prices(
+    cost_per_tonne: np.ndarray,
+    capex: np.ndarray,
+    reduction_tonnes: np.ndarray,
+    *,
+    discount_rate: float = 0.08,
+    analysis_years: int = 10,
+    annual_savings_growth: float = 0.0,
+) -> np.ndarray:
+    # NPV = -capex + reduction * (price - cost_per_tonne) * annuity, so NPV > 0 above
+    # price = cost_per_tonne + capex / (reduction * annuity).
+    factor = annuity_factor(discount_rate, analysis_years, annual_savings_growth)
+    cost = np.asarray(cost_per_tonne, dtype=float)
+    capex_arr = np.asarray(capex, dtype=float)
+    reduction = np.asarray(reduction_tonnes, dtype=float)
+    denominator = reduction * factor
+    prices = np.full(cost.shape, np.nan)
+    valid = denominator > 0
+    prices[valid] = cost[valid] + capex_arr[valid] / denominator[valid]
+    return prices
+
+
+def _level_groups(segments: pd.DataFrame, level: str) -> Tuple[np.ndarray, np.ndarray]:
+    if level == "total":
+        return np.zeros(len(segments), dtype=np.int64), np.array(["all"], dtype=object)
+    codes, uniques = pd.factorize(segments[level], sort=True)
+    return codes.astype(np.int64), np.asarray(uniques, dtype=object)
+
+
+@arrow_inputs
+@memoize
+def build_target_price_curve(
+    initiatives: pd.DataFrame,
+    baseline_detailed: pd.DataFrame | EmissionsCube,
+    *,
+    levels: Iterable[str] = SEGMENT_LEVELS,
+    discount_rate: float = 0.08,
+    analysis_years: int = 10,
+    annual_savings_growth: float = 0.0,
+) -> TargetPriceCurve:
+    work = prepare_initiatives(initiatives).reset_index(drop=True)
+    work["cost_per_tonne"] = work["cost_per_tonne"].fillna(np.inf)
+    pct = work["max_reduction_pct"].fillna(0.0).clip(lower=0.0).to_numpy() / 100.0
+    pct = np.where(np.isfinite(work["cost_per_tonne"].to_numpy()), pct, 0.0)
+
+    segments = segment_emissions(baseline_detailed)
+    segment_values = segments["emissions_tonnes"].to_numpy()
+    initiative_idx, segment_idx = initiative_segment_pairs(work, segments)
+    pair_reduction = pct[initiative_idx] * segment_values[segment_idx]
+
+    order = np.argsort(work["cost_per_tonne"].to_numpy(), kind="stable")
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    pair_rank = rank[initiative_idx]
+
+    cumulative: Dict[str, np.ndarray] = {}
+    baselines: Dict[str, np.ndarray] = {}
+    labels: Dict[str, np.ndarray] = {}
+    for level in levels:
+        if level not in SEGMENT_LEVELS:
+            raise ValueError(f"Unsupported segment level: {level}")
+        groups, names = _level_groups(segments, level)
+        width = len(names)
+        per_rank = np.bincount(
+            pair_rank * width + groups[segment_idx],
+            weights=pair_reduction,
+            minlength=len(work) * width,
+        ).reshape(len(work), width)
+        cumulative[level] = np.cumsum(per_rank, axis=0)
+        baselines[level] = np.bincount(groups, weights=segment_values, minlength=width)
+        labels[level] = names
+
+    full_reduction = np.bincount(initiative_idx, weights=pair_reduction, minlength=len(work))
+    break_even = pd.DataFrame(
+        {
+            "initiative_name": work["initiative_name"],
+            "cost_per_tonne": work["cost_per_tonne"],
+            "capex": work["capex"].fillna(0.0),
+            "reduction_tonnes": full_reduction,
+        }
+    )
+    break_even["break_even_price"] = break_even_prices(
+        break_even["cost_per_tonne"].to_numpy(),
+        break_even["capex"].to_numpy(),
+        full_reduction,
+        discount_rate=discount_rate,
+        analysis_years=analysis_years,
+        annual_savings_growth=annual_savings_growth,
+    )
+
+    return TargetPriceCurve(
+        sorted_costs=work["cost_per_tonne"].to_numpy()[order],
+        initiative_names=work["initiative_name"].to_numpy()[order],
+        cumulative=cumulative,
+        baselines=baselines,
+        labels=labels,
+        break_even=break_even.sort_values("break_even_price").reset_index(drop=True),
+    )
+
+
+def solve_target_prices(
+    curve: TargetPriceCurve,
+    target_reduction_pcts: Iterable[float],
+    *,
+    level: str = "total",
+) -> pd.DataFrame:
+    if level not in curve.cumulative:
+        raise ValueError(f"Target price curve was not built for level: {level}")
+
+    targets = np.asarray(list(target_reduction_pcts), dtype=float)
+    cumulative = curve.cumulative[level]
+    baselines = curve.baselines[level]
+    frames = []
+    for group, segment in enumerate(curve.labels[level]):
+        needed = targets / 100.0 * baselines[group]
+        column = cumulative[:, group]
+        # Minimum number of initiatives (in cost order) whose cumulative reduction
+        # meets each target; side="left" picks the first prefix that reaches it.
+        prefix = np.searchsorted(column, needed - 1e-9 * max(baselines[group], 1.0), side="left")
+        attainable = prefix < len(column)
+        price = np.where(needed <= 0, 0.0, np.nan)
+        solvable = attainable & (needed > 0)
+        price[solvable] = curve.sorted_costs[prefix[solvable]]
+
+        adopted = np.searchsorted(curve.sorted_costs, np.nan_to_num(price, nan=-np.inf), side="right")
+        achieved = np.where(adopted > 0, column[np.maximum(adopted - 1, 0)] if len(column) else 0.0, 0.0)
+        frames.append(
+            pd.DataFrame(
+                {
+                    "level": level,
+                    "segment": segment,
+                    "target_reduction_pct": targets,
+                    "baseline_emissions": baselines[group],
+                    "attainable": attainable | (needed <= 0),
+                    "required_price": price,
+                    "initiatives_adopted": adopted,
+                    "achieved_reduction": achieved,
+                    "achieved_reduction_pct": (achieved / baselines[group] * 100.0) if baselines[group] > 0 else 0.0,
+                }
+            )
+        )
+
+    if not frames:
+        return pd.DataFrame(
+            columns=[
+                "level",
+                "segment",
+                "target_reduction_pct",
+                "baseline_emissions",
+                "attainable",
+                "required_price",
+                "initiatives_adopted",
+                "achieved_reduction",
+                "achieved_reduction_pct",
+            ]
+        )
+    return pd.concat(frames, ignore_index=True)
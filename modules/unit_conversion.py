@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from modules.utils import coerce_numeric, compress_keys, ensure_required_columns, factorize_labels, normalize_columns
+
+# unit alias -> (category, scale to the category's base unit)
+UNIT_SCALES: Dict[str, Tuple[str, float]] = {
+    "wh": ("energy", 0.001),
+    "kwh": ("energy", 1.0),
+    "mwh": ("energy", 1_000.0),
+    "gwh": ("energy", 1_000_000.0),
+    "mj": ("energy", 1.0 / 3.6),
+    "gj": ("energy", 1_000.0 / 3.6),
+    "therm": ("energy", 29.3071),
+    "therms": ("energy", 29.3071),
+    "mmbtu": ("energy", 293.071),
+    "ml": ("volume", 0.001),
+    "l": ("volume", 1.0),
+    "liter": ("volume", 1.0),
+    "liters": ("volume", 1.0),
+    "litre": ("volume", 1.0),
+    "litres": ("volume", 1.0),
+    "m3": ("volume", 1_000.0),
+    "gal": ("volume", 3.785411784),
+    "gallon": ("volume", 3.785411784),
+    "gallons": ("volume", 3.785411784),
+    "us_gal": ("volume", 3.785411784),
+    "imp_gal": ("volume", 4.54609),
+    "bbl": ("volume", 158.987294928),
+    "g": ("mass", 0.001),
+    "kg": ("mass", 1.0),
+    "t": ("mass", 1_000.0),
+    "tonne": ("mass", 1_000.0),
+    "tonnes": ("mass", 1_000.0),
+    "metric_ton": ("mass", 1_000.0),
+    "lb": ("mass", 0.45359237),
+    "lbs": ("mass", 0.45359237),
+    "short_ton": ("mass", 907.18474),
+    "m": ("distance", 0.001),
+    "km": ("distance", 1.0),
+    "mi": ("distance", 1.609344),
+    "mile": ("distance", 1.609344),
+    "miles": ("distance", 1.609344),
+    "tkm": ("freight", 1.0),
+    "ton_km": ("freight", 1.0),
+    "tonne_km": ("freight", 1.0),
+    "ton_mile": ("freight", 0.90718474 * 1.609344),
+}
+
+UNIT_CONVERSION_COLUMNS = {"activity", "unit", "scale"}
+
+
+def normalize_unit(unit: str) -> str:
+    return str(unit).strip().lower().replace(" ", "_").replace("-", "_")
+
+
+def _unit_lookup(units: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    categories = np.empty(len(units), dtype=object)
+    scales = np.full(len(units), np.nan)
+    for position, unit in enumerate(units):
+        category, scale = UNIT_SCALES.get(normalize_unit(unit), (None, np.nan))
+        categories[position] = category
+        scales[position] = scale
+    return categories, scales
+
+
+def _explicit_scales(conversions: pd.DataFrame | None) -> Dict[Tuple[str, str], float]:
+    if conversions is None or conversions.empty:
+        return {}
+    table = coerce_numeric(normalize_columns(conversions.copy()), ["scale"])
+    ensure_required_columns(table, UNIT_CONVERSION_COLUMNS, "Unit conversions")
+    if table["scale"].isna().any() or (table["scale"] <= 0).any():
+        raise ValueError("Unit conversions contains invalid scale values. scale must be a positive number.")
+    keys = zip(table["activity"].astype(str).str.strip().str.lower(), table["unit"].map(normalize_unit))
+    return dict(zip(keys, table["scale"].astype(float)))
+
+
+def unit_scale_factors(
+    activities: pd.DataFrame,
+    conversions: pd.DataFrame | None = None,
+    rows: np.ndarray | None = None,
+) -> Dict[str, np.ndarray | pd.DataFrame]:
+    # Conversion is decided once per distinct (activity, unit, factor_unit) key and
+    # broadcast back to rows through the factorized codes. Pre-aggregated inputs
+    # (one row per key, e.g. from a database GROUP BY) pass their row counts as rows.
+    flat, activity_labels = pd.factorize(activities["activity"], sort=False)
+    unit_codes, unit_labels = pd.factorize(activities["unit"], sort=False)
+    flat *= max(len(unit_labels), 1)
+    flat += unit_codes
+    del unit_codes
+    if "factor_unit" in activities.columns:
+        factor_codes, factor_labels = factorize_labels(activities["factor_unit"])
+        flat *= len(factor_labels)
+        flat += factor_codes
+        del factor_codes
+    else:
+        factor_labels = pd.Index([""])
+
+    shape = (max(len(activity_labels), 1), max(len(unit_labels), 1), len(factor_labels))
+    key_index, keys = compress_keys(flat, int(np.prod(shape)))
+    counts = np.bincount(key_index, weights=rows, minlength=len(keys))
+    if rows is not None:
+        counts = counts.astype(np.int64)
+    key_activity, key_unit, key_factor = np.unravel_index(keys, shape)
+
+    explicit = _explicit_scales(conversions)
+    activity_keys = np.array([str(label).lower() for label in activity_labels], dtype=object)
+    unit_keys = np.array([normalize_unit(label) for label in unit_labels], dtype=object)
+    unit_category, unit_base = _unit_lookup(unit_keys)
+
+    # Target unit: the row's own factor_unit, never inferred from other rows. Rows without
+    # one keep their amount and are flagged, unless the conversion table gives their scale.
+    target = np.array([normalize_unit(label) for label in factor_labels], dtype=object)[key_factor]
+    target = np.where(target == "nan", "", target)
+    target_category, target_base = _unit_lookup(target)
+
+    source_unit = unit_keys[key_unit]
+    same_unit = (source_unit == target) & (target != "")
+    compatible = (unit_category[key_unit] == target_category) & pd.notna(target_category)
+    key_scale = np.where(same_unit, 1.0, np.where(compatible, unit_base[key_unit] / target_base, np.nan))
+    for position, (activity_key, unit_key) in enumerate(zip(activity_keys[key_activity], source_unit)):
+        scale = explicit.get((activity_key, unit_key), explicit.get(("all", unit_key)))
+        if scale is not None:
+            key_scale[position] = scale
+
+    convertible = np.isfinite(key_scale)
+    summary = pd.DataFrame(
+        {
+            "activity": np.asarray(activity_labels, dtype=object)[key_activity],
+            "unit": np.asarray(unit_labels, dtype=object)[key_unit],
+            "factor_unit": target,
+            "scale": key_scale,
+            "convertible": convertible,
+            "rows": counts,
+        }
+    )
+    key_label = np.where(convertible & ~same_unit & (target != ""), target, np.asarray(unit_labels, dtype=object)[key_unit])
+    return {
+        "scale": np.where(convertible, key_scale, 1.0)[key_index],
+        "convertible": convertible[key_index],
+        "unit": key_label[key_index],
+        "summary": summary,
+    }
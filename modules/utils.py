@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import tracemalloc
 from pathlib import Path
-from typing import Iterable
+from typing import Any, Callable, Iterable, Tuple
 
+import numpy as np
 import pandas as pd
 
 
@@ -10,9 +12,18 @@ def normalize_column_name(name: str) -> str:
     return str(name).strip().lower().replace(" ", "_").replace("-", "_")
 
 
+def enable_copy_on_write() -> None:
+    # Default from pandas 3; on pandas 2.x it turns the shallow copies below into
+    # lazy copies, so derived frames never duplicate column data until written.
+    if int(pd.__version__.split(".")[0]) < 3:
+        pd.set_option("mode.copy_on_write", True)
+
+
 def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
-    renamed = {col: normalize_column_name(col) for col in df.columns}
-    return df.rename(columns=renamed)
+    # Shallow copy: only the column index is new, column data is shared.
+    out = df.copy(deep=False)
+    out.columns = [normalize_column_name(col) for col in df.columns]
+    return out
 
 
 def ensure_required_columns(df: pd.DataFrame, required: Iterable[str], frame_name: str) -> None:
@@ -23,13 +34,74 @@ def ensure_required_columns(df: pd.DataFrame, required: Iterable[str], frame_nam
 
 
 def coerce_numeric(df: pd.DataFrame, columns: Iterable[str]) -> pd.DataFrame:
-    out = df.copy()
+    # Column assignment replaces the column on the shallow copy, leaving df untouched.
+    out = df.copy(deep=False)
     for col in columns:
-        if col in out.columns:
+        if col in out.columns and not pd.api.types.is_float_dtype(out[col].dtype):
             out[col] = pd.to_numeric(out[col], errors="coerce")
     return out
 
 
+def _stripped_uniques(values: pd.Series) -> Tuple[np.ndarray, pd.Index, pd.Index]:
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    uniques = pd.Index(uniques)
+    # Missing values become the text "nan" (pandas 3 keeps them missing through astype(str),
+    # and a missing label would factorize to -1 and wrap around in take()).
+    stripped = uniques.astype(str).str.strip()
+    return codes, uniques, stripped.where(pd.notna(stripped), "nan")
+
+
+def factorize_labels(values: pd.Series) -> Tuple[np.ndarray, pd.Index]:
+    # Strip text labels once per distinct value instead of once per row; labels
+    # that only differed by surrounding whitespace are merged.
+    codes, _, stripped = _stripped_uniques(values)
+    label_codes, labels = pd.factorize(stripped)
+    return label_codes[codes], pd.Index(labels)
+
+
+def clean_labels(values: pd.Series, transform: Callable[[str], str] | None = None) -> pd.Series:
+    codes, uniques, stripped = _stripped_uniques(values)
+    if transform is not None:
+        stripped = pd.Index([transform(label) for label in stripped])
+    if stripped.equals(uniques):
+        # Already clean text: keep the existing column instead of rebuilding it.
+        return values
+    label_codes, labels = pd.factorize(stripped)
+    return pd.Series(labels.to_numpy(dtype=object)[label_codes[codes]], index=values.index, name=values.name)
+
+
+def compress_keys(flat: np.ndarray, key_space: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Maps combined integer keys to dense group ids *in place* (flat is reused as
+    # the output) and returns (group ids, sorted distinct keys). Small key spaces
+    # use a counting pass instead of sorting every row.
+    if key_space <= max(4 * len(flat), 1 << 20):
+        counts = np.bincount(flat, minlength=key_space)
+        keys = np.flatnonzero(counts)
+        remap = np.zeros(key_space, dtype=flat.dtype)
+        remap[keys] = np.arange(len(keys))
+        # mode="clip" skips the bounds-check buffer, so the lookup really is in place.
+        np.take(remap, flat, out=flat, mode="clip")
+        return flat, keys
+    keys, inverse = np.unique(flat, return_inverse=True)
+    return inverse.reshape(-1), keys
+
+
+def peak_memory(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[Any, int]:
+    # Peak bytes allocated while func runs (numpy and Python allocations).
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    try:
+        result = func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    return result, peak - baseline
+
+
 def clamp(value: float, minimum: float, maximum: float) -> float:
     return max(minimum, min(maximum, value))
 
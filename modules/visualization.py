@@ -1,9 +1,24 @@
 from __future__ import annotations
 
+import functools
+from typing import Any, Callable
+
+import numpy as np
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
+
+from modules.memo import MemoCache, memoize
 
 PALETTE = ["#0f766e", "#14b8a6", "#0284c7", "#22c55e", "#f59e0b", "#ef4444"]
+# Point-level traces switch to WebGL above this size; category charts keep the
+# top entries and fold the rest into one "Other" bar.
+WEBGL_THRESHOLD = 1_000
+MAX_CATEGORIES = 30
+MAX_MACC_SEGMENTS = 1_500
+MAX_LINE_POINTS = 2_000
+
+_FIGURE_CACHE = MemoCache(max_entries=128)
 
 
 def style_figure(fig):
@@ -41,6 +56,85 @@ def style_figure(fig):
     return fig
 
 
+def _cached_figure(build: Callable[..., go.Figure]) -> Callable[..., go.Figure]:
+    cached = memoize(build, cache=_FIGURE_CACHE)
+
+    @functools.wraps(build)
+    def wrapper(*args: Any, **kwargs: Any) -> go.Figure:
+        # Callers restyle figures in place, so each call gets its own copy of the cached one.
+        return go.Figure(cached(*args, **kwargs))
+
+    return wrapper
+
+
+def figure_cache() -> MemoCache:
+    return _FIGURE_CACHE
+
+
+def _render_mode(points: int) -> str:
+    return "webgl" if points > WEBGL_THRESHOLD else "svg"
+
+
+def top_n_with_other(
+    df: pd.DataFrame,
+    label: str,
+    value: str,
+    n: int = MAX_CATEGORIES,
+    *,
+    largest: bool = True,
+    agg: str = "sum",
+) -> pd.DataFrame:
+    if len(df) <= n:
+        return df
+    magnitude = df[value].abs()
+    keep = magnitude.nlargest(n).index if largest else magnitude.nsmallest(n).index
+    rest = df.drop(index=keep)
+    other = {column: rest[column].agg(agg) for column in df.columns if column != label and pd.api.types.is_numeric_dtype(df[column])}
+    other[label] = f"Other ({len(rest):,})"
+    return pd.concat([df.loc[keep], pd.DataFrame([other])], ignore_index=True)
+
+
+def _downsample_rows(df: pd.DataFrame, max_points: int) -> pd.DataFrame:
+    if len(df) <= max_points:
+        return df
+    # Evenly spaced rows, always keeping the last one so curve end points are exact.
+    positions = np.unique(np.append(np.linspace(0, len(df) - 1, max_points).astype(int), len(df) - 1))
+    return df.iloc[positions]
+
+
+def macc_segments(df: pd.DataFrame, max_segments: int = MAX_MACC_SEGMENTS) -> pd.DataFrame:
+    # One row per MACC block in cost order; past max_segments, adjacent initiatives
+    # are merged into bins of equal abatement with reduction-weighted mean cost.
+    work = df[["initiative_name", "reduction_tonnes", "cost_per_tonne"]].copy()
+    work["reduction_tonnes"] = pd.to_numeric(work["reduction_tonnes"], errors="coerce").fillna(0.0).clip(lower=0.0)
+    work["cost_per_tonne"] = pd.to_numeric(work["cost_per_tonne"], errors="coerce")
+    work = work[(work["reduction_tonnes"] > 0) & work["cost_per_tonne"].notna()]
+    work = work.sort_values("cost_per_tonne", kind="stable").reset_index(drop=True)
+    work["initiatives"] = 1
+    if len(work) > max_segments:
+        end = work["reduction_tonnes"].cumsum().to_numpy()
+        start = end - work["reduction_tonnes"].to_numpy()
+        bins = np.minimum((start / end[-1] * max_segments).astype(int), max_segments - 1)
+        work["weighted_cost"] = work["cost_per_tonne"] * work["reduction_tonnes"]
+        grouped = work.groupby(bins, sort=True)
+        work = grouped.agg(
+            reduction_tonnes=("reduction_tonnes", "sum"),
+            weighted_cost=("weighted_cost", "sum"),
+            initiatives=("initiatives", "sum"),
+            initiative_name=("initiative_name", "first"),
+        ).reset_index(drop=True)
+        work["cost_per_tonne"] = work["weighted_cost"] / work["reduction_tonnes"]
+        work["initiative_name"] = np.where(
+            work["initiatives"] > 1,
+            work["initiative_name"].astype(str) + " +" + (work["initiatives"] - 1).astype(str) + " more",
+            work["initiative_name"].astype(str),
+        )
+        work = work.drop(columns="weighted_cost")
+    work["end_reduction"] = work["reduction_tonnes"].cumsum()
+    work["start_reduction"] = work["end_reduction"] - work["reduction_tonnes"]
+    return work[["initiative_name", "initiatives", "start_reduction", "end_reduction", "reduction_tonnes", "cost_per_tonne"]]
+
+
 def pricing_cost_curve(df: pd.DataFrame):
     fig = px.line(df, x="carbon_price", y="carbon_cost", markers=True, title="Carbon Cost Curve")
     return style_figure(fig)
@@ -52,12 +146,23 @@ def emissions_vs_price(df: pd.DataFrame):
 
 
 def fee_distribution(df: pd.DataFrame):
-    fig = px.bar(df, x="department", y="fee_cost", title="Department Fee Distribution")
+    return _fee_distribution(df[["department", "fee_cost"]])
+
+
+@_cached_figure
+def _fee_distribution(df: pd.DataFrame):
+    view = top_n_with_other(df, "department", "fee_cost")
+    fig = px.bar(view, x="department", y="fee_cost", title="Department Fee Distribution")
     return style_figure(fig)
 
 
 def behavior_response(df: pd.DataFrame):
-    view = df[["department", "emissions_tonnes", "adjusted_emissions"]].melt(
+    return _behavior_response(df[["department", "emissions_tonnes", "adjusted_emissions"]])
+
+
+@_cached_figure
+def _behavior_response(df: pd.DataFrame):
+    view = top_n_with_other(df, "department", "emissions_tonnes").melt(
         id_vars="department",
         var_name="series",
         value_name="value",
@@ -66,38 +171,99 @@ def behavior_response(df: pd.DataFrame):
     return style_figure(fig)
 
 
-def macc_curve(df: pd.DataFrame):
-    fig = px.bar(
+def emissions_over_time(df: pd.DataFrame, split: str, value: str = "emissions_tonnes"):
+    title = "Rolling 12-Month Emissions" if value == "rolling_12m_emissions" else "Emissions by Period"
+    fig = px.line(df, x="period", y=value, color=split, markers=True, title=title)
+    return style_figure(fig)
+
+
+def fee_revenue_curve(df: pd.DataFrame):
+    fig = px.line(
         df,
-        x="initiative_name",
-        y="reduction_tonnes",
-        color="cost_per_tonne",
-        title="MAC Curve",
-        color_continuous_scale="Teal",
+        x="total_reduction",
+        y="total_revenue",
+        hover_data=["fee_rate"],
+        markers=True,
+        title="Fee Revenue vs Emissions Reduction",
     )
     return style_figure(fig)
 
 
+def macc_curve(df: pd.DataFrame):
+    return _macc_curve(df[["initiative_name", "reduction_tonnes", "cost_per_tonne"]])
+
+
+@_cached_figure
+def _macc_curve(df: pd.DataFrame):
+    # Variable-width MACC drawn as one filled step outline: block widths are the
+    # abatement volume and heights the cost per tonne.
+    segments = macc_segments(df)
+    x = np.column_stack([segments["start_reduction"], segments["end_reduction"]]).ravel()
+    y = np.repeat(segments["cost_per_tonne"].to_numpy(), 2)
+    customdata = np.repeat(segments[["initiative_name", "reduction_tonnes", "initiatives"]].to_numpy(dtype=object), 2, axis=0)
+    trace = go.Scattergl if len(x) > WEBGL_THRESHOLD else go.Scatter
+    fig = go.Figure(
+        trace(
+            x=x,
+            y=y,
+            customdata=customdata,
+            mode="lines",
+            fill="tozeroy",
+            line={"color": PALETTE[0], "width": 1.5},
+            hovertemplate="%{customdata[0]}<br>Cost: %{y:,.2f} / tCO2e<br>Reduction: %{customdata[1]:,.2f} tCO2e<br>Initiatives: %{customdata[2]}<extra></extra>",
+            name="MACC",
+        )
+    )
+    fig.update_layout(title="MAC Curve", xaxis_title="Cumulative reduction (tCO2e)", yaxis_title="Cost per tonne")
+    return style_figure(fig)
+
+
 def cumulative_reduction(df: pd.DataFrame):
-    fig = px.line(df, x="initiative_name", y="cumulative_reduction", markers=True, title="Cumulative Reduction")
+    return _cumulative_reduction(df[["initiative_name", "cumulative_reduction"]])
+
+
+@_cached_figure
+def _cumulative_reduction(df: pd.DataFrame):
+    if len(df) <= MAX_CATEGORIES:
+        fig = px.line(df, x="initiative_name", y="cumulative_reduction", markers=True, title="Cumulative Reduction")
+        return style_figure(fig)
+    # Large portfolios plot against merit-order rank; the curve is monotone, so even sampling keeps its shape.
+    view = _downsample_rows(df.reset_index(drop=True).rename_axis("initiative_rank").reset_index(), MAX_LINE_POINTS)
+    fig = px.line(
+        view,
+        x="initiative_rank",
+        y="cumulative_reduction",
+        hover_data=["initiative_name"],
+        title="Cumulative Reduction",
+        render_mode=_render_mode(len(view)),
+    )
     return style_figure(fig)
 
 
 def roi_timeline(df: pd.DataFrame):
-    roi_df = df.copy()
-    roi_df["roi_years"] = pd.to_numeric(roi_df["roi_years"], errors="coerce")
-    roi_df = roi_df.dropna(subset=["roi_years"])
+    return _roi_timeline(df[["initiative_name"]].assign(roi_years=pd.to_numeric(df["roi_years"], errors="coerce")))
+
+
+@_cached_figure
+def _roi_timeline(df: pd.DataFrame):
+    roi_df = df.dropna(subset=["roi_years"])
     if roi_df.empty:
         roi_df = pd.DataFrame({"initiative_name": [], "roi_years": []})
+    # Shortest paybacks are shown individually; the rest as their mean.
+    roi_df = top_n_with_other(roi_df, "initiative_name", "roi_years", largest=False, agg="mean")
     fig = px.bar(roi_df, x="initiative_name", y="roi_years", title="ROI Timeline (Years)")
     return style_figure(fig)
 
 
 def npv_by_initiative(df: pd.DataFrame):
-    npv_df = df.copy()
-    npv_df["npv"] = pd.to_numeric(npv_df["npv"], errors="coerce")
-    npv_df = npv_df.dropna(subset=["npv"])
+    return _npv_by_initiative(df[["initiative_name"]].assign(npv=pd.to_numeric(df["npv"], errors="coerce")))
+
+
+@_cached_figure
+def _npv_by_initiative(df: pd.DataFrame):
+    npv_df = df.dropna(subset=["npv"])
     if npv_df.empty:
         npv_df = pd.DataFrame({"initiative_name": [], "npv": []})
+    npv_df = top_n_with_other(npv_df, "initiative_name", "npv")
     fig = px.bar(npv_df, x="initiative_name", y="npv", title="NPV by Initiative")
     return style_figure(fig)
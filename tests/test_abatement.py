@@ -1,4 +1,5 @@
 import pandas as pd
+import pytest
 
 from modules.abatement import evaluate_abatement
 
@@ -46,3 +47,31 @@ def test_abatement_adoption_logic():
     assert "npv" in macc.columns
     assert "irr" in macc.columns
     assert result["total_npv"] is not None
+
+
+def test_sequential_reductions_share_segment_emissions():
+    initiatives = pd.DataFrame(
+        [
+            {"initiative_name": "a", "max_reduction_pct": 60, "cost_per_tonne": 10, "capex": 0, "target_scope": "scope1", "department": "all"},
+            {"initiative_name": "b", "max_reduction_pct": 70, "cost_per_tonne": 20, "capex": 0, "target_scope": "scope1", "department": "x"},
+            {"initiative_name": "c", "max_reduction_pct": 50, "cost_per_tonne": 30, "capex": 0, "target_scope": "all", "department": "x"},
+        ]
+    )
+    baseline = pd.DataFrame(
+        [
+            {"department": "x", "scope": "scope1", "emissions_tonnes": 100},
+            {"department": "y", "scope": "scope1", "emissions_tonnes": 50},
+            {"department": "x", "scope": "scope2", "emissions_tonnes": 40},
+        ]
+    )
+
+    independent = evaluate_abatement(initiatives, baseline, carbon_price=50)
+    sequential = evaluate_abatement(initiatives, baseline, carbon_price=50, sequential=True)
+    macc = sequential["macc"].set_index("initiative_name")
+
+    assert independent["total_reduction"] == pytest.approx(90 + 70 + 70)
+    assert macc.loc["a", "reduction_tonnes"] == pytest.approx(90)
+    assert macc.loc["b", "reduction_tonnes"] == pytest.approx(28)
+    assert macc.loc["c", "available_segment_emissions"] == pytest.approx(12 + 40)
+    assert macc.loc["c", "reduction_tonnes"] == pytest.approx(26)
+    assert sequential["total_reduction"] <= float(baseline["emissions_tonnes"].sum())
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.abatement import evaluate_abatement
+from modules.abatement_timeline import adoption_timeline, adoption_timeline_paths
+
+
+def _baseline() -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {"department": "plant", "scope": "scope1", "emissions_tonnes": 1000.0},
+            {"department": "office", "scope": "scope2", "emissions_tonnes": 500.0},
+        ]
+    )
+
+
+def _initiatives() -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {"initiative_name": "boiler", "max_reduction_pct": 20, "cost_per_tonne": 40, "capex": 5000, "target_scope": "scope1", "department": "plant"},
+            {"initiative_name": "ppa", "max_reduction_pct": 50, "cost_per_tonne": 90, "capex": 0, "target_scope": "scope2", "department": "all"},
+        ]
+    )
+
+
+def test_flat_price_path_matches_static_evaluation():
+    timeline = adoption_timeline(_initiatives(), _baseline(), [60.0] * 10, discount_rate=0.08)
+    static = evaluate_abatement(_initiatives(), _baseline(), 60.0, discount_rate=0.08, analysis_years=10)
+
+    assert pytest.approx(timeline["total_npv"]) == static["total_npv"]
+    assert pytest.approx(timeline["cash_flows"]) == static["portfolio_cash_flows"]
+    table = timeline["initiatives"].set_index("initiative_name")
+    assert table.loc["boiler", "adoption_year"] == 1
+    assert not table.loc["ppa", "adopted"]
+
+
+def test_rising_path_and_learning_curve_set_adoption_year():
+    prices = pd.Series(np.linspace(50.0, 95.0, 10), index=range(2026, 2036))
+    timeline = adoption_timeline(_initiatives(), _baseline(), prices, cost_decline_rates=[0.0, 0.05])
+
+    table = timeline["initiatives"].set_index("initiative_name")
+    assert table.loc["boiler", "adoption_year"] == 2026
+    assert table.loc["ppa", "adoption_year"] == 2031
+    yearly = timeline["timeline"].set_index("year")
+    assert yearly.loc[2030, "reduction_tonnes"] == pytest.approx(200.0)
+    assert yearly.loc[2031, "emissions_tonnes"] == pytest.approx(1500.0 - 450.0)
+
+
+def test_path_chunking_is_consistent():
+    rng = np.random.default_rng(7)
+    paths = np.cumsum(rng.uniform(0.0, 15.0, size=(12, 8)), axis=1)
+    whole = adoption_timeline_paths(_initiatives(), _baseline(), paths)
+    chunked = adoption_timeline_paths(_initiatives(), _baseline(), paths, max_cells=16)
+    assert np.allclose(whole["portfolio_npv"], chunked["portfolio_npv"])
+    assert np.array_equal(whole["adoption_year"], chunked["adoption_year"])
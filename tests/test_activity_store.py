@@ -0,0 +1,74 @@
+import io
+import os
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from modules import activity_store
+from modules.activity_store import ActivityStore
+from modules.emissions_engine import calculate_emissions
+
+
+def _activities(amount: float = 100.0) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "department": ["Ops", "IT", "Ops"],
+            "scope": ["scope1", "scope2", "scope2"],
+            "activity": ["gas", "power", "power"],
+            "amount": [amount, 50.0, 25.0],
+            "unit": ["kwh", "kwh", "kwh"],
+            "emission_factor": [0.2, 0.4, 0.4],
+            "source": ["meter", "bill", "bill"],
+            "date": ["2024-01-01", "2024-02-01", "2024-02-01"],
+        }
+    )
+
+
+def test_restart_maps_stored_inputs_and_baseline(tmp_path):
+    source = tmp_path / "activities.csv"
+    _activities().to_csv(source, index=False)
+
+    built = ActivityStore(tmp_path / "store").load_or_build(source)
+    # A fresh store object stands in for a restarted process.
+    mapped = ActivityStore(tmp_path / "store").load_or_build(source)
+    assert not built.from_store and mapped.from_store and mapped.key == built.key
+
+    pd.testing.assert_frame_equal(mapped.parsed.activities, built.parsed.activities.reset_index(drop=True))
+    assert not mapped.baseline["detailed"]["amount"].to_numpy().flags.owndata
+    expected = calculate_emissions(built.activities)
+    assert mapped.baseline["total_emissions"] == pytest.approx(expected["total_emissions"])
+    pd.testing.assert_frame_equal(mapped.baseline["by_period"], expected["by_period"])
+
+    upload = io.BytesIO(source.read_bytes())
+    upload.name = "upload.csv"
+    assert ActivityStore(tmp_path / "store").load_or_build(upload).key == built.key
+
+
+def test_changed_source_invalidates_its_entry(tmp_path):
+    source = tmp_path / "activities.csv"
+    _activities().to_csv(source, index=False)
+    store = ActivityStore(tmp_path / "store")
+    first = store.load_or_build(source)
+
+    _activities(amount=400.0).to_csv(source, index=False)
+    os.utime(source, ns=(1, 1))
+    second = store.load_or_build(source)
+
+    assert second.key != first.key and not second.from_store
+    assert second.baseline["total_emissions"] == pytest.approx(first.baseline["total_emissions"] + 60.0)
+    assert store.entries()["key"].tolist() == [second.key]
+
+
+def test_engine_change_rebuilds_entries(tmp_path, monkeypatch):
+    source = tmp_path / "activities.csv"
+    _activities().to_csv(source, index=False)
+    store = ActivityStore(tmp_path / "store")
+    assert not store.load_or_build(source).from_store
+    assert store.load_or_build(source).from_store
+
+    monkeypatch.setattr(activity_store, "_engine_digest", lambda: "changed-conversions")
+    rebuilt = store.load_or_build(source)
+    assert not rebuilt.from_store
+    assert store.load_or_build(source).from_store
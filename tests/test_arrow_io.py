@@ -0,0 +1,60 @@
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from modules.abatement import evaluate_abatement
+from modules.arrow_io import build_arrow_report, read_ipc, result_to_arrow, write_ipc
+from modules.emissions_engine import calculate_emissions
+
+
+def _activities() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "department": ["Ops", "IT", "Ops"],
+            "scope": ["scope1", "scope2", "scope2"],
+            "activity": ["gas", "power", "power"],
+            "amount": [100.0, 50.0, 25.0],
+            "unit": ["kwh", "kwh", "kwh"],
+            "emission_factor": [0.2, 0.4, 0.4],
+            "source": ["meter", "bill", "bill"],
+        }
+    )
+
+
+def test_engines_accept_arrow_tables_and_emit_typed_tables():
+    activities = _activities()
+    from_arrow = calculate_emissions(pa.Table.from_pandas(activities))
+    assert from_arrow["total_emissions"] == pytest.approx(calculate_emissions(activities)["total_emissions"])
+
+    initiatives = pd.DataFrame(
+        {
+            "initiative_name": ["LED"],
+            "max_reduction_pct": [20.0],
+            "cost_per_tonne": [10.0],
+            "capex": [500.0],
+            "target_scope": ["scope2"],
+            "department": ["IT"],
+        }
+    )
+    result = evaluate_abatement(pa.RecordBatch.from_pandas(initiatives), from_arrow["detailed"], 50.0)
+    tables = result_to_arrow(result)
+    assert tables["macc"].schema.field("reduction_tonnes").type == pa.float64()
+    assert float(tables["macc"].schema.metadata[b"total_reduction"]) == pytest.approx(result["total_reduction"])
+
+
+def test_ipc_files_round_trip_through_memory_map_and_export_zip(tmp_path):
+    activities = _activities()
+    path = tmp_path / "activities.arrow"
+    write_ipc(activities, path)
+
+    loaded = read_ipc(path)
+    pd.testing.assert_frame_equal(loaded, activities)
+    assert not loaded["amount"].to_numpy().flags.owndata
+
+    archive = zipfile.ZipFile(io.BytesIO(build_arrow_report({"activities": activities, "missing": None})))
+    assert archive.namelist() == ["activities.arrow"]
+    assert pa.ipc.open_file(pa.py_buffer(archive.read("activities.arrow"))).read_all().num_rows == 3
@@ -1,4 +1,17 @@
-from modules.cap_and_trade import CapTradeConfig, simulate_cap_and_trade
+from dataclasses import replace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.cap_and_trade import (
+    CapTradeConfig,
+    MarketStabilityReserve,
+    StochasticETSConfig,
+    clearing_price,
+    simulate_cap_and_trade,
+    simulate_ets_paths,
+)
 
 
 def test_cap_and_trade_buy_required_when_deficit():
@@ -15,3 +28,58 @@ def test_cap_and_trade_buy_required_when_deficit():
     )
     assert result["allowances_to_buy"] > 0
     assert result["compliance_cost"] > 0
+
+
+def _schedule() -> pd.DataFrame:
+    return pd.DataFrame(
+        {"year": [2026, 2027, 2028], "allocated_allowances": [700, 650, 600], "initial_cap": [800, 760, 720]}
+    )
+
+
+def _config() -> CapTradeConfig:
+    return CapTradeConfig(
+        annual_cap=800,
+        free_allocations=700,
+        trading_limit_pct=1.0,
+        offset_limit_pct=0.1,
+        base_price=50,
+        scarcity_factor=1.0,
+    )
+
+
+def test_ets_paths_without_volatility_match_clearing_price():
+    stochastic = StochasticETSConfig(n_paths=4, emissions_volatility=0.0, supply_volatility=0.0, seed=1)
+    result = simulate_ets_paths(1000, _schedule(), _config(), stochastic)
+    first_year = result["yearly"].iloc[0]
+    assert first_year["price_p50"] == pytest.approx(clearing_price(1000, 800, 50, 1.0))
+    deterministic = simulate_cap_and_trade(1000, _config())
+    assert result["paths"]["net_compliance_cost"][0, 0] == pytest.approx(deterministic["net_compliance_cost"])
+
+
+def test_market_bank_is_separate_from_the_firms_bank():
+    stochastic = StochasticETSConfig(n_paths=2, emissions_volatility=0.0, supply_volatility=0.0, seed=1)
+    firm_banked = simulate_ets_paths(1000, _schedule(), replace(_config(), bank_balance=500), stochastic)
+    assert firm_banked["yearly"]["price_p50"].iloc[0] == pytest.approx(clearing_price(1000, 800, 50, 1.0))
+    assert firm_banked["yearly"]["market_bank_p50"].iloc[0] == 0.0
+
+    market_banked = simulate_ets_paths(1000, _schedule(), _config(), replace(stochastic, initial_market_bank=300))
+    assert market_banked["yearly"]["price_p50"].iloc[0] == pytest.approx(clearing_price(1000, 1100, 50, 1.0))
+    assert market_banked["yearly"]["market_bank_p50"].iloc[0] == pytest.approx(100.0)
+
+
+def test_ets_paths_are_seeded_and_chunking_is_stable():
+    base = StochasticETSConfig(n_paths=500, seed=42, chunk_size=100)
+    a = simulate_ets_paths(1000, _schedule(), _config(), base)
+    b = simulate_ets_paths(1000, _schedule(), _config(), replace(base, max_workers=2))
+    assert np.allclose(a["path_compliance_cost"], b["path_compliance_cost"])
+    assert a["compliance_cost_quantiles"]["p05"] <= a["compliance_cost_quantiles"]["p95"]
+
+
+def test_reserve_withdraws_surplus_and_raises_prices():
+    loose = pd.DataFrame({"year": [2026, 2027, 2028], "allocated_allowances": [900] * 3, "initial_cap": [1500] * 3})
+    stochastic = StochasticETSConfig(n_paths=50, emissions_volatility=0.0, supply_volatility=0.0, seed=3)
+    reserve = MarketStabilityReserve(upper_threshold=200, lower_threshold=0, intake_rate=0.5)
+    without = simulate_ets_paths(1000, loose, _config(), stochastic)
+    with_reserve = simulate_ets_paths(1000, loose, _config(), stochastic, reserve)
+    assert with_reserve["yearly"]["reserve_p50"].iloc[-1] > 0
+    assert with_reserve["yearly"]["price_p50"].iloc[-1] > without["yearly"]["price_p50"].iloc[-1]
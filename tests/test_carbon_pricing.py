@@ -1,6 +1,13 @@
+import numpy as np
+import pandas as pd
 import pytest
 
-from modules.carbon_pricing import CarbonPricingConfig, run_price_scenarios
+from modules.carbon_pricing import (
+    CarbonPricingConfig,
+    run_price_scenarios,
+    run_segment_price_scenarios,
+    segment_detail_at_price,
+)
 
 
 def test_price_scenarios_cost_growth_without_reduction():
@@ -15,3 +22,39 @@ def test_price_scenarios_elasticity_reduces_emissions():
     df = run_price_scenarios(1000.0, [100], cfg)
     adjusted = df.loc[0, "adjusted_emissions"]
     assert pytest.approx(adjusted) == 800.0
+
+
+def _detailed() -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {"department": "plant", "scope": "scope1", "emissions_tonnes": 600.0},
+            {"department": "plant", "scope": "scope2", "emissions_tonnes": 300.0},
+            {"department": "office", "scope": "scope2", "emissions_tonnes": 100.0},
+        ]
+    )
+
+
+def test_segment_scenarios_match_scalar_model_without_table():
+    cfg = CarbonPricingConfig(elasticity=0.2, fuel_switching_factor=0.05, energy_efficiency_factor=0.05)
+    prices = [0, 50, 100, 250]
+    scalar = run_price_scenarios(1000.0, prices, cfg)
+    segmented = run_segment_price_scenarios(_detailed(), prices, cfg)["totals"]
+    assert np.allclose(segmented["adjusted_emissions"], scalar["adjusted_emissions"])
+    assert np.allclose(segmented["carbon_cost"], scalar["carbon_cost"])
+
+
+def test_segment_elasticity_table_precedence():
+    cfg = CarbonPricingConfig(elasticity=0.1)
+    table = pd.DataFrame(
+        [
+            {"scope": "Scope 2", "department": "all", "elasticity": 0.5},
+            {"scope": "scope2", "department": "Office", "elasticity": 0.0},
+        ]
+    )
+    result = run_segment_price_scenarios(_detailed(), [100], cfg, elasticity_table=table)
+    detail = segment_detail_at_price(result, 100).set_index(["department", "scope"])
+
+    assert detail.loc[("plant", "scope1"), "adjusted_emissions"] == pytest.approx(540.0)
+    assert detail.loc[("plant", "scope2"), "adjusted_emissions"] == pytest.approx(150.0)
+    assert detail.loc[("office", "scope2"), "adjusted_emissions"] == pytest.approx(100.0)
+    assert detail.loc[("office", "scope2"), "elasticity_rule"] == "department+scope"
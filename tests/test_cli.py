@@ -1,6 +1,10 @@
 from unittest.mock import patch
 
+import pandas as pd
+import pytest
+
 from carbon_pricing_x.cli import main
+from modules.sql_backend import SQLiteActivityBackend
 
 
 def test_cli_run_builds_streamlit_command():
@@ -14,3 +18,30 @@ def test_cli_run_builds_streamlit_command():
     assert "--server.port" in cmd
     assert "8600" in cmd
     assert "--server.headless" in cmd
+
+
+def test_cli_ingest_merges_folder(tmp_path):
+    row = {"department": "site", "scope": "scope1", "activity": "gas", "amount": 1, "unit": "kwh", "emission_factor": 0.2, "source": "meter"}
+    pd.DataFrame([row]).to_csv(tmp_path / "a.csv", index=False)
+    pd.DataFrame([row]).to_csv(tmp_path / "b.csv", index=False)
+    output = tmp_path / "merged.csv"
+
+    code = main(["ingest", str(tmp_path / "*.csv"), "--output", str(output), "--workers", "1"])
+
+    assert code == 0
+    assert pd.read_csv(output)["source_file"].tolist() == ["a.csv", "b.csv"]
+
+
+def test_cli_ingest_into_a_database_needs_append_to_add_rows(tmp_path):
+    row = {"department": "site", "scope": "scope1", "activity": "gas", "amount": 1, "unit": "kwh", "emission_factor": 0.2, "source": "meter"}
+    pd.DataFrame([row]).to_csv(tmp_path / "a.csv", index=False)
+    output = tmp_path / "activities.db"
+    args = ["ingest", str(tmp_path / "*.csv"), "--output", str(output), "--workers", "1"]
+
+    assert main(args) == 0
+    with pytest.raises(SystemExit):
+        main(args)
+    assert main([*args, "--append"]) == 0
+    backend = SQLiteActivityBackend(output)
+    assert len(backend) == 2
+    backend.close()
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.cap_and_trade import CapTradeConfig
+from modules.compliance import build_compliance_curve, solve_compliance, solve_compliance_batch
+
+
+def _curve() -> pd.DataFrame:
+    initiatives = pd.DataFrame(
+        [
+            {"initiative_name": "cheap", "max_reduction_pct": 10, "cost_per_tonne": 10, "capex": 0, "target_scope": "scope1", "department": "all"},
+            {"initiative_name": "pricey", "max_reduction_pct": 20, "cost_per_tonne": 90, "capex": 0, "target_scope": "scope1", "department": "all"},
+        ]
+    )
+    baseline = pd.DataFrame([{"department": "plant", "scope": "scope1", "emissions_tonnes": 1000.0}])
+    lots = pd.DataFrame(
+        [{"project": "forest", "vintage": 2024, "project_type": "forestry", "volume": 500, "price": 24, "integrity_score": 80}]
+    )
+    return build_compliance_curve(
+        1000.0,
+        initiatives=initiatives,
+        baseline_detailed=baseline,
+        offset_lots=lots,
+        offset_limit_pct=0.05,
+    )
+
+
+def test_least_cost_mix_uses_cheapest_sources_first():
+    config = CapTradeConfig(
+        annual_cap=1000,
+        free_allocations=700,
+        trading_limit_pct=0.1,
+        offset_limit_pct=0.05,
+        base_price=50,
+        scarcity_factor=1.0,
+    )
+    plan = solve_compliance(_curve(), 1000.0, config)
+    mix = plan["mix"].set_index("source")
+
+    assert plan["compliance_deficit"] == pytest.approx(300)
+    assert mix.loc["abatement", "volume"] == pytest.approx(100 + 50)
+    assert mix.loc["offsets", "volume"] == pytest.approx(50)
+    assert mix.loc["allowances", "volume"] == pytest.approx(100)
+    assert plan["marginal_compliance_price"] == pytest.approx(90)
+    assert plan["total_compliance_cost"] == pytest.approx(100 * 10 + 50 * 30 + 100 * 50 + 50 * 90)
+
+
+def test_batch_matches_greedy_fill():
+    curve = _curve()
+    rng = np.random.default_rng(3)
+    deficits = rng.uniform(0, 600, 50)
+    prices = rng.uniform(0, 120, 50)
+    volumes = rng.uniform(0, 200, 50)
+    batch = solve_compliance_batch(curve, deficits, prices, volumes)
+
+    for i in range(50):
+        blocks = list(zip(curve["unit_cost"], curve["volume"])) + [(prices[i], volumes[i])]
+        remaining, cost = deficits[i], 0.0
+        for unit_cost, volume in sorted(blocks, key=lambda b: b[0]):
+            take = min(remaining, volume)
+            cost += take * unit_cost
+            remaining -= take
+        assert batch["total_cost"][i] == pytest.approx(cost)
+        assert batch["unmet"][i] == pytest.approx(remaining, abs=1e-9)
@@ -0,0 +1,41 @@
+import gc
+
+import pandas as pd
+
+from modules.dataset_registry import DatasetRegistry, content_key
+
+
+def _frame() -> pd.DataFrame:
+    return pd.DataFrame({"department": ["Ops", "IT"], "amount": [10.0, 20.0]})
+
+
+def test_identical_content_is_shared_and_derived_once():
+    registry = DatasetRegistry()
+    first = registry.lease(_frame())
+    second = registry.lease(_frame())
+    calls = []
+
+    def compute(frame):
+        calls.append(1)
+        return frame["amount"].sum()
+
+    assert first.key == second.key == content_key(_frame())
+    assert second.frame is first.frame
+    assert first.derived("total", compute) == second.derived("total", compute) == 30.0
+    assert len(calls) == 1
+    stats = registry.stats()
+    assert stats["refcount"].tolist() == [2]
+    assert stats["frame_bytes"].iloc[0] > 0
+
+
+def test_unreferenced_entries_are_evicted_over_idle_budget():
+    registry = DatasetRegistry(max_idle_bytes=0)
+    lease = registry.lease(_frame())
+    other = registry.lease(_frame().assign(amount=[1.0, 2.0]))
+    lease.release()
+    assert len(registry.stats()) == 1
+
+    del other
+    gc.collect()
+    assert registry.stats().empty
+    assert registry.total_bytes == 0
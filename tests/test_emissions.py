@@ -1,7 +1,11 @@
+import numpy as np
 import pandas as pd
 import pytest
 
-from modules.emissions_engine import calculate_emissions
+from modules.abatement import evaluate_abatement
+from modules.carbon_pricing import CarbonPricingConfig, run_segment_price_scenarios
+from modules.emissions_engine import calculate_emissions, validate_activities
+from modules.utils import peak_memory
 
 
 def test_calculate_emissions_totals():
@@ -48,3 +52,44 @@ def test_calculate_emissions_invalid_negative_amount():
     )
     with pytest.raises(ValueError):
         calculate_emissions(df)
+
+
+def test_pipeline_peak_memory_stays_below_twice_the_input():
+    rng = np.random.default_rng(0)
+    rows = 200_000
+    df = pd.DataFrame(
+        {
+            "department": rng.choice([f"dept_{i}" for i in range(40)], rows),
+            "scope": rng.choice(["scope1", "Scope 2", "s3"], rows),
+            "activity": rng.choice(["electricity", "diesel", "natural_gas"], rows),
+            "amount": rng.random(rows),
+            "unit": rng.choice(["kWh", "MWh", "liters"], rows),
+            "emission_factor": 0.0004,
+            "source": "meter",
+        }
+    ).astype({"department": object, "scope": object, "activity": object, "unit": object, "source": object})
+    before = df.copy()
+    # Buffers a copy of the frame would duplicate (string objects are shared, not copied).
+    input_bytes = df.memory_usage(deep=False).sum()
+
+    initiatives = pd.DataFrame(
+        [
+            {"initiative_name": "retrofit", "max_reduction_pct": 20, "cost_per_tonne": 30, "capex": 1000, "target_scope": "scope2", "department": "all"},
+            {"initiative_name": "fleet", "max_reduction_pct": 10, "cost_per_tonne": 80, "capex": 0, "target_scope": "scope1", "department": "dept_1"},
+        ]
+    )
+    for stage in (validate_activities, calculate_emissions):
+        _, peak = peak_memory(stage, df)
+        assert peak < 2 * input_bytes, stage.__name__
+
+    # Downstream stages read the row-level detailed frame the emissions stage returns.
+    detailed = calculate_emissions(df)["detailed"]
+    stages = {
+        "abatement": lambda: evaluate_abatement(initiatives, detailed, 50.0),
+        "pricing": lambda: run_segment_price_scenarios(detailed, range(0, 251, 10), CarbonPricingConfig(elasticity=0.1)),
+    }
+    for name, stage in stages.items():
+        _, peak = peak_memory(stage)
+        assert peak < 2 * input_bytes, name
+
+    pd.testing.assert_frame_equal(df, before)
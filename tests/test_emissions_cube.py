@@ -0,0 +1,60 @@
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from modules.abatement import segment_emissions
+from modules.emissions_cube import EmissionsCube
+
+
+def _detailed() -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {"department": "Plant", "scope": "scope1", "activity": "gas", "source": "meter", "unit": "kwh", "amount": 100, "emissions_tonnes": 20.0},
+            {"department": "Plant", "scope": "scope1", "activity": "gas", "source": "meter", "unit": "kwh", "amount": 50, "emissions_tonnes": 10.0},
+            {"department": "Plant", "scope": "scope2", "activity": "power", "source": "grid", "unit": "kwh", "amount": 80, "emissions_tonnes": 8.0},
+            {"department": "Office", "scope": "scope2", "activity": "power", "source": "grid", "unit": "kwh", "amount": 40, "emissions_tonnes": 4.0},
+            {"department": "Office", "scope": "scope3", "activity": "travel", "source": "invoice", "unit": "km", "amount": 300, "emissions_tonnes": 3.0},
+        ]
+    )
+
+
+def test_cube_slices_with_wildcards_and_case_insensitive_keys():
+    cube = EmissionsCube.from_detailed(_detailed())
+
+    assert cube.n_cells == 4
+    assert cube.total() == pytest.approx(45.0)
+    assert cube.total(department="plant") == pytest.approx(38.0)
+    assert cube.total(department="all", scope="scope2") == pytest.approx(12.0)
+    assert cube.total(scope=["scope2", "scope3"], unit="kwh") == pytest.approx(12.0)
+    assert cube.total("amount", activity="gas") == pytest.approx(150.0)
+    assert cube.total(department="warehouse") == 0.0
+    with pytest.raises(ValueError):
+        cube.total(region="north")
+
+
+def test_cube_rollups_match_groupby():
+    detailed = _detailed()
+    cube = EmissionsCube.from_detailed(detailed)
+
+    by_dept_scope = cube.rollup(["department", "scope"])
+    expected = detailed.groupby(["department", "scope"], as_index=False)["emissions_tonnes"].sum()
+    pd.testing.assert_frame_equal(by_dept_scope, expected, check_dtype=False)
+
+    scope2 = cube.rollup("department", scope="scope2").set_index("department")["emissions_tonnes"]
+    assert scope2.to_dict() == {"Office": 4.0, "Plant": 8.0}
+    pd.testing.assert_frame_equal(segment_emissions(cube), segment_emissions(detailed))
+
+
+def test_shared_cube_fills_its_memo_once_and_pickles():
+    cube = EmissionsCube.from_detailed(_detailed())
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        totals = list(pool.map(lambda _: cube.total(department="plant", scope="scope1"), range(64)))
+        segments = list(pool.map(lambda _: cube.segments(), range(8)))
+
+    assert totals == [pytest.approx(30.0)] * 64
+    assert all(frame.equals(segments[0]) for frame in segments)
+    restored = pickle.loads(pickle.dumps(cube))
+    assert restored.total(department="office") == pytest.approx(7.0)
+    pd.testing.assert_frame_equal(restored.segments(), segments[0])
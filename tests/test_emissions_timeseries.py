@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.emissions_engine import calculate_emissions
+from modules.emissions_timeseries import emissions_by_period, rolling_12_month, year_over_year
+
+
+def _monthly_activities() -> pd.DataFrame:
+    months = pd.date_range("2023-01-01", periods=24, freq="MS")
+    rows = []
+    for i, month in enumerate(months):
+        rows.append({"department": "Plant", "scope": "scope1", "activity": "gas", "amount": 10 + i, "unit": "kwh", "emission_factor": 1.0, "source": "meter", "date": month.strftime("%Y-%m-%d")})
+        if i % 2 == 0:
+            rows.append({"department": "Office", "scope": "scope2", "activity": "power", "amount": 5, "unit": "kwh", "emission_factor": 1.0, "source": "grid", "date": month.strftime("%Y-%m")})
+    return pd.DataFrame(rows)
+
+
+def test_period_column_builds_calendar_rollups():
+    result = calculate_emissions(_monthly_activities())
+    cube = result["cube"]
+
+    assert len(result["by_period"]) == 24
+    assert result["by_period"]["emissions_tonnes"].iloc[0] == pytest.approx(15.0)
+    quarterly = emissions_by_period(cube, "Q", by=["department"])
+    office = quarterly[quarterly["department"] == "Office"]
+    assert office["emissions_tonnes"].tolist() == pytest.approx([10.0, 5.0, 10.0, 5.0, 10.0, 5.0, 10.0, 5.0])
+    annual = emissions_by_period(cube, "Y")
+    assert annual["period"].tolist() == ["2023", "2024"]
+    assert annual["emissions_tonnes"].sum() == pytest.approx(result["total_emissions"])
+
+
+def test_year_over_year_and_rolling_twelve_months():
+    cube = calculate_emissions(_monthly_activities())["cube"]
+
+    yoy = year_over_year(cube, "Y", by=["department", "scope"]).set_index(["department", "period"])
+    assert yoy.loc[("Plant", "2024"), "yoy_change"] == pytest.approx(144.0)
+    assert np.isnan(yoy.loc[("Plant", "2023"), "prior_year_emissions"])
+
+    rolling = rolling_12_month(cube, by=["department"])
+    plant = rolling[rolling["department"] == "Plant"].reset_index(drop=True)
+    assert plant["rolling_12m_emissions"].iloc[:11].isna().all()
+    assert plant["rolling_12m_emissions"].iloc[11] == pytest.approx(sum(range(10, 22)))
+    assert plant["rolling_12m_emissions"].iloc[23] == pytest.approx(sum(range(22, 34)))
+
+
+def test_unreadable_dates_are_reported_and_explicit_periods_must_parse():
+    df = _monthly_activities()
+    df.loc[3, "date"] = "n/a"
+    df.loc[4, "date"] = None
+    result = calculate_emissions(df)
+    assert result["period_issues"][["value", "rows"]].values.tolist() == [["n/a", 1], ["", 1]]
+    assert result["by_period"]["emissions_tonnes"].sum() == pytest.approx(
+        result["total_emissions"] - df.loc[[3, 4], "amount"].mul(df.loc[[3, 4], "emission_factor"]).sum()
+    )
+
+    with pytest.raises(ValueError):
+        calculate_emissions(df.rename(columns={"date": "period"}))
@@ -2,7 +2,7 @@ from pathlib import Path
 
 import pandas as pd
 
-from modules.excel_parser import parse_path
+from modules.excel_parser import parse_path, parse_paths
 
 
 def test_parse_sample_xlsx():
@@ -33,3 +33,52 @@ def test_parse_abatement_only_sheet_with_reduction_pct_alias(tmp_path: Path):
     assert parsed.activities.empty
     assert not parsed.abatement.empty
     assert "max_reduction_pct" in parsed.abatement.columns
+
+
+def _activity_rows(department: str, amount: object) -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {
+                "department": department,
+                "scope": "scope2",
+                "activity": "electricity",
+                "amount": amount,
+                "unit": "kwh",
+                "emission_factor": 0.0004,
+                "source": "meter",
+            }
+        ]
+    )
+
+
+def test_parse_paths_merges_site_files_and_reports_failures(tmp_path: Path):
+    _activity_rows("site_a", 100).to_csv(tmp_path / "site_a.csv", index=False)
+    _activity_rows("site_b", "250").to_csv(tmp_path / "site_b.csv", index=False)
+    with pd.ExcelWriter(tmp_path / "site_c.xlsx", engine="openpyxl") as writer:
+        _activity_rows("site_c", 40.5).to_excel(writer, sheet_name="Activities", index=False)
+    pd.DataFrame({"unrelated": [1]}).to_csv(tmp_path / "broken.csv", index=False)
+    (tmp_path / "notes.txt").write_text("ignored")
+
+    for workers in (1, 2):
+        batch = parse_paths(tmp_path, max_workers=workers)
+        activities = batch.parsed.activities
+
+        assert activities["source_file"].tolist() == ["site_a.csv", "site_b.csv", "site_c.xlsx"]
+        assert activities["amount"].tolist() == [100.0, 250.0, 40.5]
+        assert batch.failures["file"].tolist() == ["broken.csv"]
+        assert "missing required columns" in batch.failures["error"].iloc[0]
+
+
+def test_xlsx_loads_only_recognized_sheets_and_columns(tmp_path: Path):
+    workbook = tmp_path / "finance.xlsx"
+    activities = _activity_rows("site_a", 10).assign(notes="checked", period="2025-01")
+    with pd.ExcelWriter(workbook, engine="openpyxl") as writer:
+        pd.DataFrame({"quarter": ["Q1", "Q2"], "revenue": [1, 2]}).to_excel(writer, sheet_name="Pivot", index=False)
+        activities.to_excel(writer, sheet_name="Site data", index=False)
+
+    parsed = parse_path(workbook)
+
+    assert sorted(parsed.activities.columns) == sorted(
+        ["department", "scope", "activity", "amount", "unit", "emission_factor", "source", "period"]
+    )
+    assert parsed.activities["amount"].tolist() == [10]
@@ -0,0 +1,47 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from modules.export_pdf import build_pdf_report
+
+
+def _page_count(pdf: bytes) -> int:
+    return len(re.findall(rb"/Type /Page\b(?!s)", pdf))
+
+
+def test_report_draws_charts_and_paginates_large_macc_appendix():
+    rng = np.random.default_rng(3)
+    rows = 2_000
+    macc = pd.DataFrame(
+        {
+            "initiative_name": [f"Initiative {i}" for i in range(rows)],
+            "department": rng.choice(["Operations", "IT", "Logistics"], rows),
+            "cost_per_tonne": np.sort(rng.normal(40.0, 30.0, rows)),
+            "reduction_tonnes": rng.uniform(1.0, 50.0, rows),
+            "npv": np.where(rng.random(rows) < 0.2, None, rng.normal(0.0, 1e4, rows)),
+        }
+    )
+    macc["cumulative_reduction"] = macc["reduction_tonnes"].cumsum()
+    pricing = pd.DataFrame({"carbon_price": [0.0, 50.0, 100.0], "carbon_cost": [0.0, 5e4, 1e5], "adjusted_emissions": [1e3, 900.0, 800.0]})
+    payload = {
+        "summary": {"total_emissions": 1000.0},
+        "data": {
+            "pricing": pricing.to_dict(orient="records"),
+            "macc": macc,
+            "department_emissions": pd.DataFrame({"department": ["IT", "Operations"], "emissions_tonnes": [10.0, 20.0]}),
+        },
+    }
+
+    pdf = build_pdf_report(payload)
+    assert pdf.startswith(b"%PDF")
+    # Charts take a couple of pages; the appendix needs one page per ~53 rows.
+    assert 2_000 // 53 < _page_count(pdf) < 2_000 // 40 + 4
+
+    capped = build_pdf_report(payload, max_table_rows=100)
+    assert _page_count(capped) < 8
+
+
+def test_macc_without_table_columns_skips_the_appendix():
+    pdf = build_pdf_report({"data": {"macc": pd.DataFrame({"foo": [1]})}})
+    assert pdf.startswith(b"%PDF") and _page_count(pdf) == 1
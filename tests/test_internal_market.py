@@ -1,6 +1,7 @@
 import pandas as pd
+import pytest
 
-from modules.internal_market import InternalFeeConfig, simulate_internal_fee
+from modules.internal_market import InternalFeeConfig, fee_table_at_rate, simulate_internal_fee, sweep_internal_fees
 
 
 def test_internal_fee_simulation_outputs():
@@ -13,3 +14,35 @@ def test_internal_fee_simulation_outputs():
     result = simulate_internal_fee(dept, InternalFeeConfig(internal_fee_rate=20, response_factor=0.1))
     assert result["total_fee_cost"] == 3000
     assert "adjusted_emissions" in result["table"].columns
+
+
+def test_fee_sweep_matches_single_rate_simulation():
+    dept = pd.DataFrame(
+        [
+            {"department": "A", "emissions_tonnes": 100.0},
+            {"department": "B", "emissions_tonnes": 50.0},
+        ]
+    )
+    sweep = sweep_internal_fees(dept, range(0, 301), response_factors=0.1)
+    single = simulate_internal_fee(dept, InternalFeeConfig(internal_fee_rate=20, response_factor=0.1))
+    table = fee_table_at_rate(sweep, 20)
+
+    assert sweep["fee_cost"].shape == (2, 301)
+    assert table["fee_cost"].sum() == pytest.approx(single["total_fee_cost"])
+    assert table["adjusted_emissions"].sum() == pytest.approx(single["total_adjusted_emissions"])
+
+
+def test_fee_sweep_per_department_exponential_optimum():
+    dept = pd.DataFrame(
+        [
+            {"department": "A", "emissions_tonnes": 100.0},
+            {"department": "B", "emissions_tonnes": 50.0},
+        ]
+    )
+    sweep = sweep_internal_fees(
+        dept,
+        range(0, 301),
+        response_factors={"a": 0.5, "b": 0.5},
+        response_curve="exponential",
+    )
+    assert sweep["revenue_maximizing_fee_rate"] == pytest.approx(200.0)
@@ -0,0 +1,41 @@
+import threading
+
+import pandas as pd
+
+from modules.jobs import JobExecutor, job_key
+
+
+def _total(frame: pd.DataFrame) -> float:
+    return float(frame["amount"].sum())
+
+
+def test_identical_submission_reuses_finished_result():
+    executor = JobExecutor(max_workers=2)
+    frame = pd.DataFrame({"amount": [1.0, 2.0, 3.0]})
+    job = executor.submit(_total, frame).wait(5)
+    assert job.state == "done" and job.result == 6.0 and job.progress == 1.0
+
+    again = executor.submit(_total, frame.copy())
+    assert again is job
+    assert job_key(_total, frame) != job_key(_total, frame.assign(amount=[1.0, 2.0, 4.0]))
+    executor.shutdown()
+
+
+def test_cancellation_and_timeout_stop_cooperative_jobs():
+    executor = JobExecutor(max_workers=2)
+    release = threading.Event()
+
+    def slow(context, steps):
+        for step in range(steps):
+            context.progress(step / steps, f"step {step}")
+            release.wait(0.01)
+        return steps
+
+    cancelled = executor.submit(slow, 10_000, pass_context=True)
+    cancelled.cancel()
+    assert cancelled.wait(5).state == "cancelled"
+
+    timed_out = executor.submit(slow, 20_000, pass_context=True, timeout=0.05)
+    assert timed_out.wait(5).state == "timed_out"
+    assert executor.submit(slow, 3, pass_context=True).wait(5).result == 3
+    executor.shutdown()
@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+
+from modules.carbon_pricing import CarbonPricingConfig
+from modules import memo
+from modules.memo import MemoCache, fingerprint, memoize
+
+
+def test_memoized_engine_reuses_results_by_content_and_config():
+    cache = MemoCache()
+    calls = []
+
+    @memoize(cache=cache)
+    def total(frame: pd.DataFrame, config: CarbonPricingConfig, scale: float = 1.0) -> pd.DataFrame:
+        calls.append(1)
+        return frame.assign(adjusted=frame["amount"] * (1.0 - config.elasticity) * scale)
+
+    frame = pd.DataFrame({"amount": [1.0, 2.0]})
+    first = total(frame, CarbonPricingConfig(elasticity=0.5))
+    first["adjusted"] = 0.0
+    again = total(frame.copy(), config=CarbonPricingConfig(elasticity=0.5), scale=1.0)
+
+    assert len(calls) == 1
+    assert again["adjusted"].tolist() == [0.5, 1.0]
+    total(frame, CarbonPricingConfig(elasticity=0.25))
+    assert len(calls) == 2
+    assert cache.stats()["hit_rate"] == pytest.approx(1 / 3)
+    assert hash(CarbonPricingConfig(0.5)) == hash(CarbonPricingConfig(0.5))
+    assert fingerprint(frame) != fingerprint(frame.assign(amount=[1.0, 3.0]))
+
+    # In-place edits change the key, so the edited frame is recomputed.
+    frame.loc[0, "amount"] = 10.0
+    assert total(frame, CarbonPricingConfig(elasticity=0.5))["adjusted"].tolist() == [5.0, 1.0]
+    assert len(calls) == 3
+
+
+def test_cache_respects_memory_limit_ttl_and_disk_persistence(tmp_path):
+    frame = pd.DataFrame({"value": range(1_000)}, dtype=float)
+    small = MemoCache(max_bytes=12_000)
+    small.put("a", frame)
+    small.put("b", frame)
+    assert small.stats()["entries"] == 1 and small.stats()["evictions"] == 1
+    assert small.get("a") == (False, None)
+
+    expired = MemoCache(ttl=0.0)
+    expired.put("a", 1.0)
+    assert expired.get("a") == (False, None)
+
+    MemoCache(directory=tmp_path).put("a", frame)
+    found, value = MemoCache(directory=tmp_path).get("a")
+    assert found and value.equals(frame)
+
+
+def test_disk_entries_are_keyed_by_code_version(tmp_path, monkeypatch):
+    calls = []
+
+    def double(value: float) -> float:
+        calls.append(1)
+        return value * 2
+
+    assert memoize(cache=MemoCache(directory=tmp_path))(double)(2.0) == 4.0
+    # A new process with the same code reads the stored result.
+    assert memoize(cache=MemoCache(directory=tmp_path))(double)(2.0) == 4.0
+    assert len(calls) == 1
+
+    monkeypatch.setattr(memo, "_code_version", lambda module_name: "upgraded")
+    assert memoize(cache=MemoCache(directory=tmp_path))(double)(2.0) == 4.0
+    assert len(calls) == 2
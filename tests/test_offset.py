@@ -1,4 +1,7 @@
-from modules.offset_engine import simulate_offsets
+import pandas as pd
+import pytest
+
+from modules.offset_engine import procure_offsets, simulate_offsets
 
 
 def test_offset_model_limits_and_residuals():
@@ -11,3 +14,40 @@ def test_offset_model_limits_and_residuals():
     )
     assert result["eligible_offsets"] == 200
     assert result["residual_emissions"] < 1000
+
+
+def test_offset_portfolio_merit_order_and_caps():
+    lots = pd.DataFrame(
+        [
+            {"project": "cheap_low_integrity", "vintage": 2019, "project_type": "wind", "volume": 100, "price": 3, "integrity_score": 20},
+            {"project": "forest_a", "vintage": 2023, "project_type": "forestry", "volume": 100, "price": 8, "integrity_score": 80},
+            {"project": "forest_b", "vintage": 2024, "project_type": "forestry", "volume": 100, "price": 9, "integrity_score": 90},
+            {"project": "biochar", "vintage": 2024, "project_type": "biochar", "volume": 100, "price": 50, "integrity_score": 100},
+        ]
+    )
+    result = procure_offsets(1000, lots, 0.2, type_caps={"forestry": 120})
+    schedule = result["schedule"].set_index("project")
+
+    assert list(result["schedule"]["project"][:2]) == ["forest_a", "forest_b"]
+    assert schedule.loc["forest_a", "procured_adjusted_tonnes"] == pytest.approx(80)
+    assert schedule.loc["forest_b", "procured_adjusted_tonnes"] == pytest.approx(40)
+    assert schedule.loc["cheap_low_integrity", "procured_adjusted_tonnes"] == pytest.approx(20)
+    assert schedule.loc["biochar", "procured_adjusted_tonnes"] == pytest.approx(60)
+    assert result["procured_adjusted_tonnes"] == pytest.approx(200)
+    assert result["marginal_offset_price"] == pytest.approx(50)
+
+
+def test_offset_caps_are_shared_in_merit_order_and_vintages_match_as_years():
+    lots = pd.DataFrame(
+        [
+            {"project": "forest", "vintage": 2019, "project_type": "forestry", "volume": 100, "price": 1, "integrity_score": 100},
+            {"project": "wind_old", "vintage": "2019.0", "project_type": "wind", "volume": 100, "price": 2, "integrity_score": 100},
+            {"project": "wind_new", "vintage": 2020, "project_type": "wind", "volume": 100, "price": 10, "integrity_score": 100},
+        ]
+    )
+    result = procure_offsets(1000, lots, 0.2, vintage_caps={2019: 100}, type_caps={"forestry": 30})
+    procured = result["schedule"].set_index("project")["procured_adjusted_tonnes"]
+
+    # The type cap clips forest to 30, so the cheaper 2019 wind lot gets the vintage headroom left.
+    assert procured.to_dict() == pytest.approx({"forest": 30, "wind_old": 70, "wind_new": 100})
+    assert result["total_offset_cost"] == pytest.approx(30 * 1 + 70 * 2 + 100 * 10)
@@ -0,0 +1,73 @@
+import pandas as pd
+import pytest
+
+from modules.internal_market import InternalFeeConfig
+from modules.revenue_recycling import RecyclingConfig, simulate_revenue_recycling
+
+
+def _baseline() -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {"department": "A", "scope": "scope1", "emissions_tonnes": 100.0},
+            {"department": "B", "scope": "scope1", "emissions_tonnes": 40.0},
+        ]
+    )
+
+
+def _initiatives() -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {"initiative_name": "retrofit", "max_reduction_pct": 50, "cost_per_tonne": 1, "capex": 1000, "target_scope": "scope1", "department": "a"},
+        ]
+    )
+
+
+def test_each_year_is_funded_by_the_previous_years_revenue():
+    result = simulate_revenue_recycling(
+        _initiatives(),
+        _baseline(),
+        InternalFeeConfig(internal_fee_rate=10, response_factor=0.0),
+        RecyclingConfig(recycling_share=1.0, years=3),
+    )
+    yearly = result["yearly"].set_index(["department", "year"])
+
+    # Year 1 raises 1,000 of the retrofit's 1,050 cost; year 2 emits what that funded share leaves.
+    assert yearly.loc[("A", 1), "emissions_tonnes"] == pytest.approx(100.0)
+    assert yearly.loc[("A", 2), "emissions_tonnes"] == pytest.approx(100.0 - 50.0 * 1000.0 / 1050.0)
+    assert yearly.loc[("A", 3), "emissions_tonnes"] == pytest.approx(50.0)
+    assert yearly.loc[("B", 3), "emissions_tonnes"] == pytest.approx(40.0)
+    assert result["funding"][["department", "first_funded_year"]].values.tolist() == [["A", 1]]
+    assert result["diagnostics"]["converged"]
+    assert result["diagnostics"]["iterations"] <= 4
+    assert result["diagnostics"]["residual"] == pytest.approx(0.0)
+
+
+def test_without_recycling_matches_fee_response():
+    result = simulate_revenue_recycling(
+        _initiatives(),
+        _baseline(),
+        InternalFeeConfig(internal_fee_rate=20, response_factor=0.5),
+        RecyclingConfig(recycling_share=0.0, years=3),
+    )
+    assert result["totals"]["emissions_tonnes"].tolist() == pytest.approx([126.0] * 3)
+    assert result["funding"]["funded_share"].iloc[0] == 0.0
+
+
+def test_only_initiatives_adopted_at_the_fee_are_funded():
+    initiatives = pd.concat(
+        [
+            _initiatives(),
+            pd.DataFrame(
+                [{"initiative_name": "ccs", "max_reduction_pct": 50, "cost_per_tonne": 80, "capex": 0, "target_scope": "scope1", "department": "b"}]
+            ),
+        ],
+        ignore_index=True,
+    )
+    result = simulate_revenue_recycling(
+        initiatives,
+        _baseline(),
+        InternalFeeConfig(internal_fee_rate=10, response_factor=0.0),
+        RecyclingConfig(recycling_share=1.0, years=3),
+    )
+    assert result["funding"]["initiative_name"].tolist() == ["retrofit"]
+    assert result["yearly"].set_index(["department", "year"]).loc[("B", 3), "emissions_tonnes"] == pytest.approx(40.0)
@@ -0,0 +1,86 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from modules.abatement import evaluate_abatement
+from modules.carbon_pricing import CarbonPricingConfig, run_price_scenarios
+from modules.dataset_registry import DatasetRegistry
+from modules.emissions_engine import calculate_emissions
+from modules.simulation_service import ServiceConfig, SimulationService, run_load_test
+
+ACTIVITIES = [
+    {"department": "Ops", "scope": "scope1", "activity": "natural_gas", "amount": 100, "unit": "kwh", "emission_factor": 0.2, "source": "meter"},
+    {"department": "IT", "scope": "scope2", "activity": "electricity", "amount": 50, "unit": "kwh", "emission_factor": 0.4, "source": "bill"},
+]
+
+
+def test_concurrent_requests_are_batched_per_dataset():
+    async def scenario():
+        service = SimulationService(ServiceConfig(batch_window=0.01), DatasetRegistry())
+        status, uploaded = await service.handle("POST", "/datasets", {"activities": ACTIVITIES})
+        assert status == 201
+        dataset = uploaded["dataset"]
+        assert (await service.handle("POST", "/datasets", {"activities": ACTIVITIES}))[1]["dataset"] == dataset
+
+        requests = [
+            service.handle("POST", "/price-scenarios", {"dataset": dataset, "prices": [price], "config": {"elasticity": 0.1}})
+            for price in (10, 50, 90)
+        ]
+        responses = await asyncio.gather(*requests)
+        return service, responses
+
+    service, responses = asyncio.run(scenario())
+    expected = run_price_scenarios(40.0, [10, 50, 90], CarbonPricingConfig(elasticity=0.1))
+    assert [response[1][0]["carbon_cost"] for response in responses] == expected["carbon_cost"].tolist()
+    assert service.stats()["batches"]["price-scenarios"] == {"batches": 1, "requests": 3, "mean_batch_size": 3.0}
+
+
+def test_http_round_trip_reports_errors_and_latency():
+    result = asyncio.run(run_load_test(pd.DataFrame(ACTIVITIES), requests=40, concurrency=4, config=ServiceConfig(port=0)))
+    assert result["requests"] == 40 and result["failures"] == 0
+    assert result["p99_ms"] >= result["p50_ms"] > 0
+
+    async def missing():
+        service = SimulationService(ServiceConfig(), DatasetRegistry())
+        return await service._respond("POST", "/offsets", b'{"dataset": "nope"}')
+
+    assert asyncio.run(missing())[0] == 404
+
+
+def test_abatement_prices_are_evaluated_in_one_batch_and_closed_forms_skip_the_batcher():
+    initiatives = [
+        {"initiative_name": "boiler", "max_reduction_pct": 20, "cost_per_tonne": 30, "capex": 50, "target_scope": "scope1", "department": "all"},
+        {"initiative_name": "ppa", "max_reduction_pct": 40, "cost_per_tonne": 60, "capex": 0, "target_scope": "scope2", "department": "it"},
+    ]
+
+    async def scenario():
+        service = SimulationService(ServiceConfig(batch_window=0.01), DatasetRegistry())
+        dataset = (await service.handle("POST", "/datasets", {"activities": ACTIVITIES}))[1]["dataset"]
+        responses = await asyncio.gather(
+            *(
+                service.handle("POST", "/abatement", {"dataset": dataset, "initiatives": initiatives, "carbon_price": price})
+                for price in (10, 45, 90, 45)
+            )
+        )
+        await service.handle("POST", "/offsets", {"dataset": dataset, "offset_price": 18.0, "offset_limit_pct": 0.15})
+        return service, responses
+
+    service, responses = asyncio.run(scenario())
+    baseline = calculate_emissions(pd.DataFrame(ACTIVITIES))["cube"]
+    for price, (_, result) in zip((10, 45, 90, 45), responses):
+        expected = evaluate_abatement(pd.DataFrame(initiatives), baseline, price)
+        assert result["total_reduction"] == pytest.approx(expected["total_reduction"])
+        assert result["total_npv"] == pytest.approx(expected["total_npv"])
+    assert service.stats()["batches"]["abatement"] == {"batches": 1, "requests": 4, "mean_batch_size": 4.0}
+    assert "offsets" not in service.stats()["batches"]
+
+
+def test_concurrent_uploads_of_one_dataset_keep_a_single_lease():
+    service = SimulationService(ServiceConfig(), DatasetRegistry())
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        keys = set(pool.map(lambda _: service.register_dataset({"activities": ACTIVITIES})["dataset"], range(16)))
+    assert len(keys) == 1 and service.stats()["datasets"] == 1
+    service.release_dataset(keys.pop())
+    assert service.registry.stats()[["refcount", "idle"]].values.tolist() == [[0, True]]
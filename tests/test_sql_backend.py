@@ -0,0 +1,111 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.abatement import evaluate_abatement
+from modules.emissions_engine import calculate_emissions
+from modules.sql_backend import SQLiteActivityBackend
+
+SAMPLE = Path(__file__).resolve().parents[1] / "data" / "sample_departments.csv"
+
+
+def _activities(rows: int = 3_000) -> pd.DataFrame:
+    rng = np.random.default_rng(5)
+    return pd.DataFrame(
+        {
+            "department": rng.choice(["Ops", " IT", "Logistics", "Sales"], rows),
+            "scope": rng.choice(["Scope 1", "s2", "scope3"], rows),
+            "activity": rng.choice(["electricity", "diesel"], rows),
+            "amount": rng.uniform(0.0, 100.0, rows),
+            "unit": rng.choice(["kWh", "MWh", "liters", "kg"], rows),
+            "emission_factor": rng.uniform(0.0, 1.0, rows),
+            "source": rng.choice(["meter", "bill"], rows),
+            "date": rng.choice(["2024-01-31", "2024-02", "2023-12-01", "n/a"], rows),
+        }
+    )
+
+
+@pytest.mark.parametrize("source", ["sample", "mixed_units"])
+def test_pushed_down_aggregates_match_in_memory_path(tmp_path, source):
+    activities = pd.read_csv(SAMPLE) if source == "sample" else _activities()
+    backend = SQLiteActivityBackend(tmp_path / "activities.db")
+    backend.append(activities.iloc[: len(activities) // 2])
+    backend.append(activities.iloc[len(activities) // 2 :])
+
+    expected = calculate_emissions(activities)
+    result = calculate_emissions(backend)
+    assert result["detailed"] is None
+    assert result["total_emissions"] == pytest.approx(expected["total_emissions"])
+    for name in ("by_period", "by_scope", "by_department", "unit_issues", "period_issues"):
+        pd.testing.assert_frame_equal(result[name].reset_index(drop=True), expected[name].reset_index(drop=True), rtol=1e-9)
+
+    cube = expected["cube"]
+    filters = {"department": ["Logistics", "logistics & shipping"]}
+    pd.testing.assert_frame_equal(
+        backend.rollup(["scope", "unit"], ["emissions_tonnes", "amount"], **filters),
+        cube.rollup(["scope", "unit"], ["emissions_tonnes", "amount"], **filters),
+        rtol=1e-9,
+    )
+    pd.testing.assert_frame_equal(backend.segments(), cube.segments(), rtol=1e-9)
+
+    initiatives = pd.DataFrame(
+        {
+            "initiative_name": ["LED", "Fleet"],
+            "max_reduction_pct": [20.0, 30.0],
+            "cost_per_tonne": [10.0, 60.0],
+            "capex": [500.0, 900.0],
+            "target_scope": ["scope2", "all"],
+            "department": ["all", "Ops"],
+        }
+    )
+    pd.testing.assert_frame_equal(
+        evaluate_abatement(initiatives, backend, 100.0, sequential=True)["macc"],
+        evaluate_abatement(initiatives, cube, 100.0, sequential=True)["macc"],
+        rtol=1e-9,
+    )
+
+
+def test_top_n_folds_the_rest_and_appends_invalidate_results():
+    activities = _activities()
+    backend = SQLiteActivityBackend()
+    backend.append(activities)
+
+    by_department = calculate_emissions(activities)["by_department"]
+    top = backend.top_n("department", 2, other=True)
+    assert top["department"].tolist()[:2] == by_department["department"].head(2).tolist()
+    assert top["department"].iloc[-1] == "Other (2)"
+    assert top["emissions_tonnes"].sum() == pytest.approx(by_department["emissions_tonnes"].sum())
+
+    before = calculate_emissions(backend)["total_emissions"]
+    backend.append(activities.head(10))
+    assert calculate_emissions(backend)["total_emissions"] == pytest.approx(
+        before + calculate_emissions(activities.head(10))["total_emissions"]
+    )
+
+
+def test_append_files_streams_each_file_whole_and_rebuilds_cells_for_old_databases(tmp_path):
+    activities = _activities(40)
+    activities.iloc[:25].to_csv(tmp_path / "a.csv", index=False)
+    activities.iloc[25:].to_excel(tmp_path / "b.xlsx", sheet_name="Activities", index=False)
+    # The second chunk of this file fails validation, so none of its rows may land.
+    broken = activities.iloc[:6].assign(amount=[1.0, 2.0, 3.0, 4.0, -5.0, 6.0])
+    broken.to_csv(tmp_path / "c.csv", index=False)
+
+    path = tmp_path / "activities.db"
+    backend = SQLiteActivityBackend(path)
+    files = backend.append_files(tmp_path, max_workers=1, chunksize=4)
+    assert files["status"].tolist() == ["ok", "ok", "failed"]
+    assert files["activity_rows"].tolist() == [25, 15, 0]
+    assert len(backend) == 40
+    expected = calculate_emissions(activities)["total_emissions"]
+    assert calculate_emissions(backend)["total_emissions"] == pytest.approx(expected)
+
+    with backend._conn:
+        backend._conn.execute("DELETE FROM cells")
+    backend.close()
+    reopened = SQLiteActivityBackend(path)
+    assert len(reopened) == 40
+    pd.testing.assert_frame_equal(reopened.segments(), calculate_emissions(activities)["cube"].segments(), rtol=1e-9)
+    reopened.close()
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.abatement import evaluate_abatement
+from modules.target_pricing import build_target_price_curve, solve_target_prices
+
+
+def _baseline() -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {"department": "plant", "scope": "scope1", "emissions_tonnes": 600.0},
+            {"department": "plant", "scope": "scope2", "emissions_tonnes": 200.0},
+            {"department": "office", "scope": "scope2", "emissions_tonnes": 200.0},
+        ]
+    )
+
+
+def _initiatives() -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {"initiative_name": "boiler", "max_reduction_pct": 50, "cost_per_tonne": 40, "capex": 1000, "target_scope": "scope1", "department": "plant"},
+            {"initiative_name": "ppa", "max_reduction_pct": 50, "cost_per_tonne": 20, "capex": 0, "target_scope": "scope2", "department": "all"},
+            {"initiative_name": "controls", "max_reduction_pct": 10, "cost_per_tonne": 80, "capex": 0, "target_scope": "all", "department": "office"},
+        ]
+    )
+
+
+def test_target_prices_by_level():
+    curve = build_target_price_curve(_initiatives(), _baseline())
+
+    total = solve_target_prices(curve, [0, 15, 40, 52, 90], level="total")
+    assert total["required_price"].iloc[:4].tolist() == [0.0, 20.0, 40.0, 80.0]
+    assert not total["attainable"].iloc[4]
+    assert np.isnan(total["required_price"].iloc[4])
+
+    by_department = solve_target_prices(curve, [50], level="department").set_index("segment")
+    assert by_department.loc["plant", "required_price"] == 40.0
+    assert by_department.loc["office", "required_price"] == 20.0
+
+
+def test_required_price_matches_evaluate_abatement():
+    curve = build_target_price_curve(_initiatives(), _baseline())
+    solved = solve_target_prices(curve, [35], level="total").iloc[0]
+    result = evaluate_abatement(_initiatives(), _baseline(), solved["required_price"])
+    assert result["total_reduction"] >= 0.35 * 1000.0
+    assert pytest.approx(result["total_reduction"]) == solved["achieved_reduction"]
+
+
+def test_break_even_price_zeroes_npv():
+    curve = build_target_price_curve(_initiatives(), _baseline(), discount_rate=0.08, analysis_years=10)
+    boiler = curve.break_even.set_index("initiative_name").loc["boiler"]
+    result = evaluate_abatement(_initiatives().iloc[[0]], _baseline(), boiler["break_even_price"])
+    assert pytest.approx(result["total_npv"], abs=1e-6) == 0.0
@@ -0,0 +1,87 @@
+from typing import Optional
+
+import pandas as pd
+import pytest
+
+from modules.emissions_engine import calculate_emissions
+from modules.sql_backend import SQLiteActivityBackend
+
+
+def _row(activity: str, amount: float, unit: str, factor: float = 1.0, factor_unit: Optional[str] = None, department: str = "plant") -> dict:
+    return {
+        "department": department,
+        "scope": "scope2",
+        "activity": activity,
+        "amount": amount,
+        "unit": unit,
+        "emission_factor": factor,
+        "source": "meter",
+        "factor_unit": factor_unit,
+    }
+
+
+def test_mixed_units_are_restated_in_the_factor_unit():
+    df = pd.DataFrame(
+        [
+            _row("electricity", 1000, "kWh", 0.001, "kWh"),
+            _row("electricity", 2, "MWh", 0.001, "kWh"),
+            _row("diesel", 10, "gallons", 0.01, "liters"),
+            _row("diesel", 10, "liters", 0.01, "liters"),
+            _row("steam", 5, "GJ", 1.0, "GJ"),
+            _row("steam", 1000, "kWh", 1.0, "GJ"),
+        ]
+    )
+    result = calculate_emissions(df)
+    detailed = result["detailed"]
+
+    assert detailed["amount"].tolist() == pytest.approx([1000, 2000, 37.85411784, 10, 5, 3.6])
+    assert detailed["unit"].tolist() == ["kWh", "kwh", "liters", "liters", "GJ", "gj"]
+    assert result["total_emissions"] == pytest.approx(3.0 + 0.3785411784 + 0.1 + 8.6)
+    assert result["unit_issues"].empty
+
+
+def test_rows_without_a_factor_unit_are_flagged_and_left_as_reported():
+    df = pd.DataFrame([_row("electricity", 100, "MWh", 0.35), _row("diesel", 100, "gallons", 0.0102)])
+
+    result = calculate_emissions(df)
+    assert result["detailed"]["amount"].tolist() == [100, 100]
+    assert result["detailed"]["unit_convertible"].tolist() == [False, False]
+    assert result["unit_issues"][["activity", "unit", "factor_unit"]].values.tolist() == [["electricity", "MWh", ""], ["diesel", "gallons", ""]]
+    assert result["total_emissions"] == pytest.approx(36.02)
+
+
+def test_other_rows_never_change_a_rows_conversion():
+    ops = pd.DataFrame([_row("electricity", 20, "MWh", 0.4, department="Ops")] * 3)
+    merged = pd.concat([ops, pd.DataFrame([_row("electricity", 1000, "kWh", 0.0004, department="IT")])], ignore_index=True)
+
+    def ops_total(result):
+        return result["cube"].total(department="Ops")
+
+    assert ops_total(calculate_emissions(ops)) == pytest.approx(24.0)
+    assert ops_total(calculate_emissions(merged)) == pytest.approx(24.0)
+
+    backend = SQLiteActivityBackend()
+    backend.append(ops)
+    backend.append(merged.tail(1))
+    assert backend.total(department="Ops") == pytest.approx(24.0)
+    backend.close()
+
+
+def test_unconvertible_units_are_flagged_and_explicit_table_wins():
+    df = pd.DataFrame(
+        [
+            _row("diesel", 100, "kg", 0.01, "liters"),
+            _row("diesel", 5, "liters", 0.01, "liters"),
+            _row("widgets", 3, "boxes", 1.0, "boxes"),
+        ]
+    )
+
+    result = calculate_emissions(df)
+    assert result["detailed"]["unit_convertible"].tolist() == [False, True, True]
+    assert result["unit_issues"][["activity", "unit", "rows"]].values.tolist() == [["diesel", "kg", 1]]
+    assert result["total_emissions"] == pytest.approx(1.0 + 0.05 + 3.0)
+
+    conversions = pd.DataFrame([{"activity": "diesel", "unit": "kg", "scale": 1.19}])
+    converted = calculate_emissions(df, unit_conversions=conversions)
+    assert converted["unit_issues"].empty
+    assert converted["detailed"]["amount"].iloc[0] == pytest.approx(119.0)
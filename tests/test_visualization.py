@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.visualization import figure_cache, macc_curve, macc_segments, npv_by_initiative, top_n_with_other
+
+
+def _portfolio(n: int) -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    return pd.DataFrame(
+        {
+            "initiative_name": [f"Initiative {i}" for i in range(n)],
+            "reduction_tonnes": rng.uniform(1.0, 100.0, n),
+            "cost_per_tonne": rng.normal(50.0, 40.0, n),
+            "npv": rng.normal(0.0, 1e5, n),
+        }
+    )
+
+
+def test_large_macc_is_one_bounded_webgl_trace_with_exact_totals():
+    df = _portfolio(20_000)
+    segments = macc_segments(df, max_segments=500)
+    assert len(segments) <= 500
+    assert segments["reduction_tonnes"].sum() == pytest.approx(df["reduction_tonnes"].sum())
+    assert segments["initiatives"].sum() == len(df)
+    assert segments["cost_per_tonne"].is_monotonic_increasing
+
+    fig = macc_curve(df)
+    assert len(fig.data) == 1 and fig.data[0].type == "scattergl"
+    assert len(fig.to_json()) < 500_000
+
+    hits = figure_cache().stats()["hits"]
+    fig.update_layout(title="Changed")
+    assert macc_curve(df.copy()).layout.title.text == "MAC Curve"
+    assert figure_cache().stats()["hits"] == hits + 1
+
+
+def test_category_charts_keep_top_entries_and_fold_the_rest():
+    df = _portfolio(100)
+    view = top_n_with_other(df[["initiative_name", "npv"]], "initiative_name", "npv", n=10)
+    assert len(view) == 11 and view["initiative_name"].iloc[-1] == "Other (90)"
+    assert view["npv"].sum() == pytest.approx(df["npv"].sum())
+    assert len(npv_by_initiative(df).data[0].x) == 31